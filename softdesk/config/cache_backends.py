@@ -0,0 +1,45 @@
+"""
+Backends de cache personnalisés.
+"""
+import os
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    Cache fichier partagé entre les processus (workers Gunicorn) d'une même machine.
+
+    Contrairement à FileBasedCache, qui supprime des entrées au hasard une fois
+    MAX_ENTRIES atteint, l'éviction retire les entrées les moins récemment lues :
+    chaque lecture réussie met à jour la date de modification du fichier.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        if value is not default:
+            try:
+                os.utime(self._key_to_file(key, version))
+            except OSError:
+                pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return  # return early if no culling is required
+        if self._cull_frequency == 0:
+            return self.clear()  # Clear the cache when CULL_FREQUENCY = 0
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except OSError:
+                return time.time()
+
+        # Supprime la fraction la moins récemment utilisée
+        filelist.sort(key=last_used)
+        for fname in filelist[:num_entries // self._cull_frequency]:
+            self._delete(fname)
@@ -0,0 +1,169 @@
+"""
+Requêtes GET conditionnelles (ETag / Last-Modified).
+
+Le validateur d'une réponse est calculé sans sérialiser les objets : pour un
+détail, à partir des updated_at et des compteurs dont dépend la
+représentation ; pour une liste, à partir de la version des projets
+(projects/cache.py), sans requête SQL. Un If-None-Match correspondant reçoit
+un 304 sans corps.
+"""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    ETag fort et Last-Modified pour les actions list et retrieve.
+
+    get_list_validator(queryset) et get_detail_validator(instance) retournent
+    (last_modified, parts) : la date de dernière modification et tout ce dont
+    dépend la représentation. Seul If-None-Match est évalué : une suppression
+    ne fait pas avancer max(updated_at), If-Modified-Since ne suffirait donc pas.
+
+    Une liste est validée par get_list_version() quand la vue la définit : la
+    version change à chaque écriture qui la concerne, et une interrogation
+    répétée ne refait pas d'agrégat sur toutes les lignes filtrées.
+
+    Les méthodes a* en sont les variantes des vues async (projects/async_views.py).
+    """
+
+    def get_list_version(self):
+        """Version des données de la liste, ou None pour un agrégat sur updated_at."""
+        return None
+
+    async def aget_list_version(self):
+        return None
+
+    def get_list_validator(self, queryset):
+        version = self.get_list_version()
+        if version is not None:
+            return None, [version]
+        stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return stats['last_modified'], [stats['count']]
+
+    async def aget_list_validator(self, queryset):
+        version = await self.aget_list_version()
+        if version is not None:
+            return None, [version]
+        stats = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return stats['last_modified'], [stats['count']]
+
+    def get_detail_validator(self, instance):
+        return instance.updated_at, [instance.pk]
+
+    async def aget_detail_validator(self, instance):
+        return self.get_detail_validator(instance)
+
+    def get_etag(self, request, parts):
+        """Le même validateur donne la même représentation pour un utilisateur, une URL et un format."""
+        key = ':'.join(str(part) for part in [
+            # Le nom du viewset synchrone : même ETag pour sa variante async
+            getattr(self, 'sync_viewset', type(self)).__name__,
+            self.action,
+            request.user.pk,
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            *parts,
+        ])
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+    def _not_modified(self, request, etag):
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        return etag in if_none_match or '*' in if_none_match
+
+    def _add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def conditional_response(self, request, validator, respond):
+        last_modified, parts = validator
+        etag = self.get_etag(request, [last_modified, *parts])
+
+        if self._not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = respond()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self._add_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, request, validator, respond):
+        last_modified, parts = validator
+        etag = self.get_etag(request, [last_modified, *parts])
+
+        if self._not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = await respond()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self._add_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            request,
+            self.get_list_validator(queryset),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return await self.aconditional_response(
+            request,
+            await self.aget_list_validator(queryset),
+            lambda: super(ConditionalGetMixin, self).alist(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request,
+            self.get_detail_validator(instance),
+            lambda: self.get_detail_response(instance)
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return await self.aconditional_response(
+            request,
+            await self.aget_detail_validator(instance),
+            lambda: self.aget_detail_response(instance)
+        )
+
+    def get_detail_response(self, instance):
+        # Les préchargements du plan de requête n'ont lieu que si la réponse est construite
+        if hasattr(self, 'prefetch_query_plan'):
+            self.prefetch_query_plan([instance])
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_detail_response(self, instance):
+        if hasattr(self, 'aprefetch_query_plan'):
+            await self.aprefetch_query_plan([instance])
+        return Response(self.get_serializer(instance).data)
+
+
+def latest_update(model, fk):
+    """Sous-requête : max(updated_at) des lignes de model rattachées à la ligne courante par fk."""
+    return Subquery(
+        model.objects
+        .filter(**{fk: OuterRef('pk')})
+        .order_by()
+        .values(fk)
+        .annotate(last=Max('updated_at'))
+        .values('last')[:1]
+    )
+
+
+def most_recent(*dates):
+    """La plus récente des dates non nulles."""
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
@@ -0,0 +1,331 @@
+"""
+Métriques au format Prometheus, par route et par méthode HTTP.
+
+La route est le basename du router (config/urls.py : projects,
+project-issues, issue-comments...) pour les viewsets, le nom de l'URL pour
+les autres vues. Sont comptés : requêtes par statut, rejets par limite de
+débit (429), et histogrammes de durée et de nombre de requêtes SQL.
+
+Chaque thread écrit dans ses propres dictionnaires, sans verrou
+(config/shards.py). Au plus
+toutes les METRICS_FLUSH_INTERVAL secondes, un worker fusionne ceux de ses
+threads et écrit le total dans METRICS_DIR/<ppid>-<pid>-<jeton>.json
+(écriture atomique par os.replace). L'endpoint additionne les fichiers de
+tous les workers : les compteurs d'un worker arrêté restent acquis tant que
+son processus parent (maître Gunicorn, autoreloader de runserver) tourne.
+Au démarrage, chaque worker supprime les fichiers des serveurs arrêtés,
+dont ni le worker ni le parent ne sont en vie.
+"""
+import hmac
+import json
+import os
+import threading
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+from time import monotonic, perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.renderers import BaseRenderer
+
+from .shards import ThreadShards
+from .timing import async_execute_wrapper
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class _Shard:
+    """Métriques d'un thread (lui seul y écrit), ou leur total."""
+
+    def __init__(self):
+        self.requests = {}
+        self.throttled = {}
+        # Histogrammes : [effectif de chaque intervalle..., au-delà du dernier, somme]
+        self.durations = {}
+        self.queries = {}
+
+
+_process = {'token': uuid.uuid4().hex[:8], 'next_flush': 0.0}
+
+
+def _reset_after_fork():
+    # Un worker forké a son propre fichier de métriques
+    _process['token'] = uuid.uuid4().hex[:8]
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _observe(histogram, key, buckets, value):
+    values = histogram.get(key)
+    if values is None:
+        values = histogram[key] = [0] * (len(buckets) + 2)
+    values[bisect_left(buckets, value)] += 1
+    values[-1] += value
+
+
+def observe(route, method, status, duration, queries):
+    """Enregistre une requête dans les métriques du thread courant."""
+    shard = _shards.local()
+    key = (route, method)
+    status_key = (route, method, status)
+    shard.requests[status_key] = shard.requests.get(status_key, 0) + 1
+    if status == 429:
+        shard.throttled[key] = shard.throttled.get(key, 0) + 1
+    _observe(shard.durations, key, DURATION_BUCKETS, duration)
+    _observe(shard.queries, key, QUERY_BUCKETS, queries)
+
+
+def route_name(request):
+    """Basename du router pour un viewset, nom de l'URL sinon."""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    if match.namespace:
+        return match.namespace
+    initkwargs = getattr(match.func, 'initkwargs', None) or {}
+    return initkwargs.get('basename') or match.url_name or 'unnamed'
+
+
+# Fusion et partage entre workers
+
+def _merge_counters(total, counters):
+    for key, value in counters.items():
+        total[key] = total.get(key, 0) + value
+
+
+def _merge_histograms(total, histograms):
+    for key, values in histograms.items():
+        current = total.get(key)
+        total[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+
+
+def _merge(total, shard):
+    # copy() est atomique : le thread propriétaire peut écrire pendant la fusion
+    _merge_counters(total.requests, shard.requests.copy())
+    _merge_counters(total.throttled, shard.throttled.copy())
+    _merge_histograms(total.durations, shard.durations.copy())
+    _merge_histograms(total.queries, shard.queries.copy())
+
+
+_shards = ThreadShards(_Shard, _merge)
+
+
+def process_snapshot():
+    """Métriques du processus, threads terminés compris."""
+    return _shards.snapshot()
+
+
+def _serialize(shard):
+    return {
+        'requests': [[*key, value] for key, value in shard.requests.items()],
+        'throttled': [[*key, value] for key, value in shard.throttled.items()],
+        'durations': [[*key, values] for key, values in shard.durations.items()],
+        'queries': [[*key, values] for key, values in shard.queries.items()],
+    }
+
+
+def _deserialize(data):
+    shard = _Shard()
+    shard.requests = {tuple(item[:-1]): item[-1] for item in data['requests']}
+    shard.throttled = {tuple(item[:-1]): item[-1] for item in data['throttled']}
+    shard.durations = {tuple(item[:-1]): item[-1] for item in data['durations']}
+    shard.queries = {tuple(item[:-1]): item[-1] for item in data['queries']}
+    return shard
+
+
+def flush():
+    """Écrit les métriques du processus dans METRICS_DIR."""
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{os.getppid()}-{os.getpid()}-{_process['token']}.json"
+    temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+    temporary.write_text(json.dumps(_serialize(process_snapshot())))
+    os.replace(temporary, path)
+
+
+def collect():
+    """Métriques de tous les workers, après écriture de celles du processus courant."""
+    flush()
+    total = _Shard()
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            _merge(total, _deserialize(json.loads(path.read_text())))
+        except (OSError, ValueError, KeyError):
+            # Fichier en cours de remplacement ou illisible : ignoré pour cette lecture
+            continue
+    return total
+
+
+def _alive(pid):
+    if os.name == 'nt':
+        # os.kill() y terminerait le processus : ses fichiers sont conservés
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur
+        pass
+    return True
+
+
+def expire():
+    """Supprime les fichiers des serveurs arrêtés : ni le worker ni son parent ne sont en vie."""
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            parent, pid, _ = path.stem.split('-')
+            # Parent 0 ou 1 : processus détaché, seul le worker compte
+            stale = not _alive(int(pid)) and (int(parent) <= 1 or not _alive(int(parent)))
+        except ValueError:
+            # Fichier d'un ancien format
+            stale = True
+        if stale:
+            path.unlink(missing_ok=True)
+
+
+# Format d'exposition texte de Prometheus
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name, histograms, buckets):
+    for (route, method), values in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(buckets, values):
+            cumulative += count
+            yield f'{name}_bucket{_labels(route=route, method=method, le=bound)} {cumulative}'
+        count = cumulative + values[len(buckets)]
+        yield f'{name}_bucket{_labels(route=route, method=method, le="+Inf")} {count}'
+        yield f'{name}_sum{_labels(route=route, method=method)} {values[-1]}'
+        yield f'{name}_count{_labels(route=route, method=method)} {count}'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def render_prometheus(metrics):
+    lines = [
+        '# HELP softdesk_http_requests_total Requêtes HTTP par route, méthode et statut.',
+        '# TYPE softdesk_http_requests_total counter',
+    ]
+    lines += [
+        f'softdesk_http_requests_total{_labels(route=route, method=method, status=status)} {value}'
+        for (route, method, status), value in sorted(metrics.requests.items())
+    ]
+    lines += [
+        '# HELP softdesk_http_throttled_total Requêtes rejetées par une limite de débit (429).',
+        '# TYPE softdesk_http_throttled_total counter',
+    ]
+    lines += [
+        f'softdesk_http_throttled_total{_labels(route=route, method=method)} {value}'
+        for (route, method), value in sorted(metrics.throttled.items())
+    ]
+    lines += [
+        '# HELP softdesk_http_request_duration_seconds Durée des requêtes HTTP.',
+        '# TYPE softdesk_http_request_duration_seconds histogram',
+        *_histogram_lines('softdesk_http_request_duration_seconds', metrics.durations, DURATION_BUCKETS),
+        '# HELP softdesk_db_queries_per_request Nombre de requêtes SQL par requête HTTP.',
+        '# TYPE softdesk_db_queries_per_request histogram',
+        *_histogram_lines('softdesk_db_queries_per_request', metrics.queries, QUERY_BUCKETS),
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Compte chaque requête (désactivé par défaut : METRICS_ENABLED). Le nombre de
+    requêtes SQL est repris de RequestTimingMiddleware quand il la précède.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.flush_interval = settings.METRICS_FLUSH_INTERVAL
+        expire()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = perf_counter()
+        counter = getattr(request, 'timing', None)
+        if counter is None:
+            counter = _QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        return self.record(request, response, perf_counter() - start, counter.queries)
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        counter = getattr(request, 'timing', None)
+        if counter is None:
+            counter = _QueryCounter()
+            async with async_execute_wrapper(counter):
+                response = await self.get_response(request)
+        else:
+            response = await self.get_response(request)
+        return self.record(request, response, perf_counter() - start, counter.queries)
+
+    def record(self, request, response, duration, queries):
+        observe(route_name(request), request.method, response.status_code, duration, queries)
+
+        now = monotonic()
+        if now >= _process['next_flush']:
+            # Deux threads peuvent écrire en même temps : l'écriture est atomique, le résultat identique
+            _process['next_flush'] = now + self.flush_interval
+            flush()
+        return response
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    Authentifie un collecteur par Authorization: Bearer <METRICS_TOKEN>. Un
+    autre token est laissé à l'authentification JWT.
+    """
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        # Comparaison en temps constant : la durée ne renseigne pas sur le token
+        if token and hmac.compare_digest(get_authorization_header(request), f'Bearer {token}'.encode()):
+            return AnonymousUser(), 'metrics'
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Réponse d'erreur (401, 403)
+            data = f"# {data.get('detail', data)}\n"
+        return data.encode(self.charset)
@@ -1,4 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class UserPagination(PageNumberPagination):
@@ -23,3 +36,360 @@ class CommentPagination(PageNumberPagination):
     page_size = 2  # Commentaires par page
     page_size_query_param = 'page_size'
     max_page_size = 10
+
+
+async def apaginate_page_number(pagination, queryset, request, view=None):
+    """
+    PageNumberPagination.paginate_queryset() par l'ORM async : le nombre de
+    lignes et la page sont lus avant que le Paginator de Django ne s'en serve.
+    """
+    pagination.request = request
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        msg = pagination.invalid_page_message.format(page_number=page_number, message=str(exc))
+        raise NotFound(msg)
+
+    if paginator.num_pages > 1 and pagination.template is not None:
+        pagination.display_page_controls = True
+
+    pagination.page.object_list = [obj async for obj in pagination.page.object_list]
+    return list(pagination.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset).
+
+    Chaque page reprend après la dernière ligne de la précédente
+    (WHERE (created_at, id) < (...)) au lieu de parcourir un OFFSET :
+    le coût d'une page ne dépend pas de sa profondeur. La clé primaire
+    termine toujours l'ordre pour le rendre stable. Le curseur est opaque.
+    Le nombre total n'est calculé que sur demande (?count=true) et mis en cache.
+    apaginate_queryset() en est la variante par l'ORM async.
+    """
+    ordering = ('pk',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = None
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_cache_timeout = 60
+    invalid_cursor_message = "Curseur invalide."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._prepare(queryset, request, view)
+        self.count = self.get_count(queryset) if self.count_requested(request) else None
+        return self._page(list(page_queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._prepare(queryset, request, view)
+        self.count = await self.aget_count(queryset) if self.count_requested(request) else None
+        return self._page([obj async for obj in page_queryset[:self.page_size + 1]])
+
+    def _prepare(self, queryset, request, view):
+        """Lit la requête et retourne le queryset de la page (une ligne de plus que la page)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        self.reverse = bool(self.cursor and self.cursor['r'])
+        order = [self._order_by(field, desc != self.reverse) for field, desc in self.fields]
+        page_queryset = queryset.order_by(*order)
+        if self.cursor:
+            page_queryset = page_queryset.filter(self._after(queryset.model, self.cursor['p'], self.reverse))
+        return page_queryset
+
+    def _page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        # En remontant (curseur 'previous'), il reste une page suivante par construction
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = bool(self.cursor) if not self.reverse else has_more
+        self.first_position = self._position(results[0]) if results else None
+        self.last_position = self._position(results[-1]) if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @property
+    def is_first_page(self):
+        return not self.cursor
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size) if self.max_page_size else size
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Retourne [(champ, décroissant), ...] terminé par la clé primaire.
+        Un filtre de la vue peut imposer son ordre via get_ordering().
+        """
+        ordering = self.ordering
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view) or ordering
+
+        fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        if fields[-1][0] not in ('pk', 'id'):
+            fields.append(('pk', fields[0][1]))
+        return fields
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def _count_key(self, queryset):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        return 'pagination:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+
+    def get_count(self, queryset):
+        """Nombre total de lignes, mis en cache quelques secondes par requête SQL."""
+        queryset = queryset.order_by()
+        key = self._count_key(queryset)
+        if key is None:
+            return 0
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    async def aget_count(self, queryset):
+        # Cache local au processus : lu sans passer par un thread
+        queryset = queryset.order_by()
+        key = self._count_key(queryset)
+        if key is None:
+            return 0
+        count = cache.get(key)
+        if count is None:
+            count = await queryset.acount()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if len(data['p']) != len(self.fields):
+                raise ValueError
+            return {'p': data['p'], 'r': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _order_by(self, field, desc):
+        return f'-{field}' if desc else field
+
+    def _position(self, obj):
+        position = []
+        for field, _ in self.fields:
+            value = obj.pk if field == 'pk' else getattr(obj, field)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def _after(self, model, position, reverse):
+        """
+        Condition « strictement après position » pour l'ordre lexicographique :
+        (a < x) OU (a = x ET b < y) OU ...
+        """
+        try:
+            values = [
+                (model._meta.pk if field == 'pk' else model._meta.get_field(field)).to_python(value)
+                for (field, _), value in zip(self.fields, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = {}
+        for (field, desc), value in zip(self.fields, values):
+            lookup = 'lt' if desc != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+
+class HybridPagination(BasePagination):
+    """
+    Pagination par numéro de page par défaut (avec 'count'), par curseur sur
+    demande : paramètre 'cursor' (liens next / previous) ou mode=cursor pour
+    la première page.
+    """
+    page_number_class = PageNumberPagination
+    keyset_class = KeysetPagination
+    mode_query_param = 'mode'
+
+    def cursor_requested(self, request):
+        return (
+            self.keyset_class.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_requested(request):
+            self.delegate = self.keyset_class()
+        else:
+            self.delegate = self.page_number_class()
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.cursor_requested(request):
+            self.delegate = self.keyset_class()
+            return await self.delegate.apaginate_queryset(queryset, request, view)
+        self.delegate = self.page_number_class()
+        return await apaginate_page_number(self.delegate, queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_class().get_paginated_response_schema(schema)
+
+    @property
+    def is_first_page(self):
+        # En mode page, seule la première page peut être vide (les autres lèvent NotFound)
+        return getattr(self.delegate, 'is_first_page', True)
+
+    @property
+    def display_page_controls(self):
+        return getattr(getattr(self, 'delegate', None), 'display_page_controls', False)
+
+    def to_html(self):
+        return self.delegate.to_html()
+
+
+class ProjectCursorPagination(KeysetPagination):
+    ordering = ('pk',)
+    page_size = ProjectPagination.page_size
+    max_page_size = ProjectPagination.max_page_size
+
+
+class ContributorCursorPagination(KeysetPagination):
+    ordering = ('pk',)
+    page_size = UserPagination.page_size
+    max_page_size = UserPagination.max_page_size
+
+
+class IssueCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-pk')
+    page_size = IssuePagination.page_size
+    max_page_size = IssuePagination.max_page_size
+
+
+class CommentCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-pk')
+    page_size = CommentPagination.page_size
+    max_page_size = CommentPagination.max_page_size
+
+
+class ProjectHybridPagination(HybridPagination):
+    page_number_class = ProjectPagination
+    keyset_class = ProjectCursorPagination
+
+
+class ContributorHybridPagination(HybridPagination):
+    page_number_class = UserPagination
+    keyset_class = ContributorCursorPagination
+
+
+class IssueHybridPagination(HybridPagination):
+    page_number_class = IssuePagination
+    keyset_class = IssueCursorPagination
+
+
+class CommentHybridPagination(HybridPagination):
+    page_number_class = CommentPagination
+    keyset_class = CommentCursorPagination
+
+
+class EmptyListMessageMixin:
+    """
+    Remplace une première page vide par un message, sans requête
+    supplémentaire (auparavant un queryset.exists() précédait chaque liste).
+    """
+    empty_list_message = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._list_response(queryset, self.paginate_queryset(queryset))
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is None:
+            queryset = [obj async for obj in queryset]
+        return self._list_response(queryset, page)
+
+    def _list_response(self, queryset, page):
+        if page is not None:
+            if not page and self.empty_list_message and self.paginator.is_first_page:
+                return Response({"message": self.empty_list_message})
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        if not serializer.data and self.empty_list_message:
+            return Response({"message": self.empty_list_message})
+        return Response(serializer.data)
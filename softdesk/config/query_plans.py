@@ -0,0 +1,63 @@
+"""
+Plans de requête déclaratifs, par action de viewset.
+
+Chaque viewset déclare dans `query_plans` les jointures, préchargements,
+colonnes et annotations nécessaires à ses serializers pour chaque action,
+afin que le nombre de requêtes reste constant quelle que soit la taille de la page.
+"""
+from django.db.models import aprefetch_related_objects, prefetch_related_objects
+
+
+class QueryPlan:
+    """Ensemble des optimisations à appliquer à un queryset."""
+
+    def __init__(self, select_related=(), prefetch_related=(), only=(), annotations=None):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+        self.annotations = annotations or {}
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset
+
+    def prefetch(self, instances):
+        """Applique les préchargements à des objets déjà chargés."""
+        if self.prefetch_related:
+            prefetch_related_objects(list(instances), *self.prefetch_related)
+
+    async def aprefetch(self, instances):
+        if self.prefetch_related:
+            await aprefetch_related_objects(list(instances), *self.prefetch_related)
+
+
+class QueryPlanMixin:
+    """
+    Donne accès au plan de l'action courante.
+    Le plan 'default' s'applique aux actions sans plan dédié.
+    """
+    query_plans = {}
+
+    def get_query_plan(self):
+        return self.query_plans.get(self.action) or self.query_plans.get('default')
+
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        return plan.apply(queryset) if plan else queryset
+
+    def prefetch_query_plan(self, instances):
+        plan = self.get_query_plan()
+        if plan:
+            plan.prefetch(instances)
+
+    async def aprefetch_query_plan(self, instances):
+        plan = self.get_query_plan()
+        if plan:
+            await plan.aprefetch(instances)
@@ -10,8 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'users',
     'projects',
+    'diagnostics',
     'rest_framework',
     'rest_framework_simplejwt',
 ]
 
 MIDDLEWARE = [
+    'config.timing.RequestTimingMiddleware',
+    'config.metrics.MetricsMiddleware',
+    'diagnostics.explain.ExplainCaptureMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +58,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'diagnostics.profiling.ProfilingMiddleware',
+    'diagnostics.memory.MemoryProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -79,14 +86,146 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Backend SQLite de config/sqlite : pragmas ci-dessous à chaque connexion et relance des
+# écritures refusées par « database is locked ».
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'config.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Connexions persistantes, vérifiées avant réutilisation. 0 sous ASGI (Uvicorn) :
+        # chaque requête y a son propre thread, la connexion ne serait jamais reprise.
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+                'journal_mode': 'WAL',
+                'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+                'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+                # Négatif : en Kio
+                'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+                'temp_store': 'MEMORY',
+            },
+            'busy_retries': config('SQLITE_BUSY_RETRIES', default=5, cast=int),
+            'busy_backoff': config('SQLITE_BUSY_BACKOFF', default=0.05, cast=float),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Appartenances aux projets, partagées entre les workers (voir projects/cache.py).
+    # En production multi-machines, pointer vers Memcached ou Redis.
+    'membership': {
+        'BACKEND': config(
+            'MEMBERSHIP_CACHE_BACKEND',
+            default='config.cache_backends.LRUFileBasedCache'
+        ),
+        'LOCATION': config(
+            'MEMBERSHIP_CACHE_LOCATION',
+            default=str(Path(tempfile.gettempdir()) / 'softdesk_cache' / 'membership')
+        ),
+        'TIMEOUT': config('MEMBERSHIP_CACHE_TIMEOUT', default=600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('MEMBERSHIP_CACHE_MAX_ENTRIES', default=10000, cast=int),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # Réponses des listes, propres à chaque worker (LocMemCache évince les moins récemment lues).
+    # Les versions des projets qui les invalident vivent dans le cache 'membership', partagé.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'softdesk-responses',
+        'TIMEOUT': config('RESPONSE_CACHE_TIMEOUT', default=3600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=2000, cast=int),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+# Cache des réponses des listes de projets et d'issues (projects/cache.py)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+# Taille maximale (en octets) d'une réponse mise en cache
+RESPONSE_CACHE_MAX_ITEM_BYTES = config('RESPONSE_CACHE_MAX_ITEM_BYTES', default=256 * 1024, cast=int)
+
+# File d'écriture (config/writer.py) : créations d'issues et de commentaires validées par lots par un
+# thread écrivain par processus, plutôt que chaque requête se dispute le verrou d'écriture de SQLite.
+WRITE_QUEUE_ENABLED = config('WRITE_QUEUE_ENABLED', default=False, cast=bool)
+# Écritures au plus par transaction
+WRITE_QUEUE_MAX_BATCH = config('WRITE_QUEUE_MAX_BATCH', default=32, cast=int)
+# Attente d'autres écritures avant de valider un lot (ms) ; 0 : celles déjà en file seulement
+WRITE_QUEUE_MAX_WAIT_MS = config('WRITE_QUEUE_MAX_WAIT_MS', default=0, cast=float)
+# Attente maximale d'une écriture encore en file (s) : au-delà, elle est annulée et la requête reçoit une 503
+WRITE_QUEUE_TIMEOUT = config('WRITE_QUEUE_TIMEOUT', default=10, cast=float)
+
+# Sous ASGI (uvicorn config.asgi:application) : GET list et retrieve en vues async (projects/async_views.py).
+# À laisser désactivé sous WSGI, où chaque vue async coûterait une boucle d'événements par requête.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+# Mesure des requêtes et en-tête Server-Timing (config/timing.py).
+# À activer dans le .env des serveurs de développement et de mesure.
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=False, cast=bool)
+# Au-delà (en ms), la requête est journalisée avec ses requêtes SQL les plus lentes
+SLOW_REQUEST_THRESHOLD_MS = config('SLOW_REQUEST_THRESHOLD_MS', default=500, cast=int)
+SLOW_REQUEST_TOP_QUERIES = config('SLOW_REQUEST_TOP_QUERIES', default=5, cast=int)
+
+# Métriques Prometheus (config/metrics.py), partagées entre les workers par METRICS_DIR.
+# À activer dans le .env des serveurs dont les métriques sont collectées.
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=str(Path(tempfile.gettempdir()) / 'softdesk_metrics'))
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)
+# Token du collecteur (Authorization: Bearer <token>) ; vide, seuls les administrateurs lisent les métriques
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Profilage cProfile à la demande (diagnostics/profiling.py)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+# Fraction des requêtes profilées, parmi les vues de PROFILING_ROUTES (ex. IssueViewSet.retrieve,ProjectViewSet.*)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)
+PROFILING_ROUTES = config('PROFILING_ROUTES', default='', cast=Csv())
+PROFILING_DIR = config('PROFILING_DIR', default=str(Path(tempfile.gettempdir()) / 'softdesk_profiles'))
+PROFILING_MAX_BYTES = config('PROFILING_MAX_BYTES', default=100 * 1024 * 1024, cast=int)
+# Durée de validité des en-têtes signés X-Softdesk-Profile et X-Softdesk-Memory (commande profile_token)
+PROFILING_TOKEN_MAX_AGE = config('PROFILING_TOKEN_MAX_AGE', default=3600, cast=int)
+
+# Allocations mémoire par requête, par tracemalloc (diagnostics/memory.py)
+MEMORY_PROFILING_ENABLED = config('MEMORY_PROFILING_ENABLED', default=False, cast=bool)
+MEMORY_SAMPLE_RATE = config('MEMORY_SAMPLE_RATE', default=0.01, cast=float)
+MEMORY_ROUTES = config('MEMORY_ROUTES', default='', cast=Csv())
+MEMORY_DIR = config('MEMORY_DIR', default=str(Path(tempfile.gettempdir()) / 'softdesk_memory'))
+MEMORY_MAX_BYTES = config('MEMORY_MAX_BYTES', default=200 * 1024 * 1024, cast=int)
+# Profondeur des piles enregistrées : plus elle est grande, plus le traçage est coûteux
+MEMORY_TRACE_FRAMES = config('MEMORY_TRACE_FRAMES', default=10, cast=int)
+
+# Plans des requêtes SQL lentes, capturés hors requête (diagnostics/explain.py, commande explain_report).
+# À activer dans le .env des serveurs de développement et de mesure.
+EXPLAIN_CAPTURE_ENABLED = config('EXPLAIN_CAPTURE_ENABLED', default=False, cast=bool)
+EXPLAIN_THRESHOLD_MS = config('EXPLAIN_THRESHOLD_MS', default=100, cast=int)
+EXPLAIN_DIR = config('EXPLAIN_DIR', default=str(Path(tempfile.gettempdir()) / 'softdesk_explain'))
+# Un plan est recalculé au plus une fois par EXPLAIN_REFRESH secondes (les données évoluent)
+EXPLAIN_REFRESH = config('EXPLAIN_REFRESH', default=86400, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'softdesk': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,59 @@
+"""
+Compteurs en mémoire par thread, sans verrou à l'écriture.
+
+Chaque thread écrit dans ses propres valeurs (local()), que lui seul
+modifie ; snapshot() les additionne pour tout le processus. Les valeurs des
+threads terminés sont reportées dans un total « retiré », pour que les
+comptes restent acquis sans garder les threads morts. Un worker forké
+(Gunicorn) repart de zéro : il ne reprend pas les valeurs du processus parent.
+
+Utilisé par les métriques Prometheus (config/metrics.py) et par les
+compteurs des caches (projects/cache.py).
+"""
+import os
+import threading
+
+
+class ThreadShards:
+    """
+    Valeurs par thread : factory() crée celles d'un thread (et les totaux),
+    merge(total, values) ajoute values à total. values peut être modifié
+    par son thread pendant merge : merge en lit des copies (dict.copy() est
+    atomique).
+    """
+
+    def __init__(self, factory, merge):
+        self.factory = factory
+        self.merge = merge
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._retired = self.factory()
+
+    def local(self):
+        """Valeurs du thread courant."""
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = self._local.values = self.factory()
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def snapshot(self):
+        """Total du processus ; les valeurs des threads terminés sont reportées dans le total retiré."""
+        with self._lock:
+            total = self.factory()
+            for shard in list(self._shards):
+                thread, values = shard
+                if thread.is_alive():
+                    self.merge(total, values)
+                else:
+                    self.merge(self._retired, values)
+                    self._shards.remove(shard)
+            self.merge(total, self._retired)
+        return total
@@ -0,0 +1,119 @@
+"""
+Backend SQLite de production (ENGINE 'config.sqlite').
+
+En plus du backend de Django :
+- OPTIONS['pragmas'] : PRAGMA appliqués à chaque nouvelle connexion, dans
+  l'ordre (busy_timeout d'abord, pour que le passage en WAL attende un
+  éventuel verrou) ;
+- connexions persistantes vérifiées (CONN_HEALTH_CHECKS) : une connexion
+  dont le fichier de base a été remplacé ou supprimé n'est pas réutilisée ;
+- OPTIONS['busy_retries'] et OPTIONS['busy_backoff'] : une instruction
+  refusée par SQLITE_BUSY (« database is locked ») hors transaction est
+  relancée, après une attente exponentielle avec gigue ;
+- begin_immediate : la prochaine transaction commence par BEGIN IMMEDIATE
+  (config.writer.write_atomic). Les transactions d'écriture prennent le
+  verrou d'écriture dès leur début, en attendant busy_timeout, plutôt qu'à
+  leur première écriture, où SQLite échoue sans attendre si elles ont déjà
+  lu. Leur BEGIN est relancé comme une instruction hors transaction. Les
+  autres transactions restent différées : une lecture ne bloque pas les
+  écritures.
+"""
+import os
+import random
+import time
+
+from django.db.backends.sqlite3 import base as sqlite3
+from django.db.backends.sqlite3.base import Database
+
+
+def is_busy(error):
+    """Vrai si error est un SQLITE_BUSY (base verrouillée par une autre connexion)."""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        # Codes étendus (SQLITE_BUSY_SNAPSHOT...) : l'octet de poids faible est le code principal
+        return code & 0xff == Database.SQLITE_BUSY
+    return 'database is locked' in str(error)
+
+
+def backoff_delay(attempt, backoff):
+    """Attente avant la relance attempt (0, 1...) : exponentielle, avec gigue."""
+    delay = backoff * 2 ** attempt
+    return random.uniform(delay / 2, delay)
+
+
+class SQLiteCursorWrapper(sqlite3.SQLiteCursorWrapper):
+    """Curseur qui relance les instructions refusées par SQLITE_BUSY, hors transaction."""
+    retries = 0
+    backoff = 0.05
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        # Liste : un générateur serait épuisé par la première tentative
+        return self._retry(super().executemany, query, list(param_list))
+
+    def _retry(self, execute, *args):
+        # Dans une transaction, relancer la seule instruction ne suffirait pas :
+        # c'est la transaction qu'il faudrait rejouer, l'erreur remonte
+        retries = 0 if self.connection.in_transaction else self.retries
+        for attempt in range(retries + 1):
+            try:
+                return execute(*args)
+            except Database.OperationalError as e:
+                if attempt == retries or not is_busy(e):
+                    raise
+            time.sleep(backoff_delay(attempt, self.backoff))
+
+
+class DatabaseWrapper(sqlite3.DatabaseWrapper):
+    pragmas = {}
+    busy_retries = 0
+    busy_backoff = 0.05
+    database_file = None
+    begin_immediate = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.busy_retries = kwargs.pop('busy_retries', 0)
+        self.busy_backoff = kwargs.pop('busy_backoff', 0.05)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        self.database_file = self._file_identity()
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.retries = self.busy_retries
+        cursor.backoff = self.busy_backoff
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
+
+    def is_usable(self):
+        # Fichier remplacé (restauration d'une sauvegarde) ou supprimé : la connexion lit l'ancien
+        if self._file_identity() != self.database_file:
+            return False
+        try:
+            self.connection.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def _file_identity(self):
+        if self.is_in_memory_db():
+            return None
+        try:
+            stat = os.stat(self.settings_dict['NAME'])
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
@@ -0,0 +1,222 @@
+"""
+Mesure du temps de chaque requête : SQL, phases DRF et en-tête Server-Timing.
+
+RequestTimingMiddleware enveloppe la connexion par execute_wrapper (nombre
+de requêtes, temps SQL, requêtes les plus lentes) et ajoute l'en-tête
+Server-Timing à chaque réponse. PhaseTimingMixin découpe le temps des vues
+en phases exclusives : une phase imbriquée (get_object appelle
+check_object_permissions) suspend la phase englobante.
+- auth : authentification (JWT, lecture de l'utilisateur),
+- perm : permissions,
+- throttle : limites de débit,
+- qs : get_object, filtres et pagination, qui évaluent le queryset,
+- ser : le reste de la vue, surtout la sérialisation.
+Le temps SQL est aussi réparti entre ces phases.
+
+Une requête plus lente que SLOW_REQUEST_THRESHOLD_MS est journalisée (logger
+softdesk.requests) en une ligne JSON, avec ses SLOW_REQUEST_TOP_QUERIES
+requêtes SQL les plus lentes (sans leurs paramètres).
+
+Le coût reste de quelques microsecondes par requête SQL : deux appels à
+perf_counter et, au-delà des plus lentes, une comparaison.
+
+Sous ASGI, le middleware est async : l'ORM async exécute le SQL dans le
+thread de la requête (sync_to_async), c'est donc sur la connexion de ce
+thread que le wrapper est posé (async_execute_wrapper).
+"""
+import heapq
+import json
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('softdesk.requests')
+
+PHASES = ('auth', 'perm', 'throttle', 'qs', 'ser')
+
+
+def _push_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _pop_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+@asynccontextmanager
+async def async_execute_wrapper(wrapper):
+    """connection.execute_wrapper() pour une requête async, posé dans le thread de ses requêtes SQL."""
+    await sync_to_async(_push_wrapper)(wrapper)
+    try:
+        yield
+    finally:
+        await sync_to_async(_pop_wrapper)(wrapper)
+
+
+@contextmanager
+def request_phase(request, phase):
+    """Compte le temps du bloc dans la phase donnée, si la requête est mesurée."""
+    timing = getattr(request, 'timing', None)
+    if timing is None:
+        yield
+        return
+    timing.enter(phase)
+    try:
+        yield
+    finally:
+        timing.leave()
+
+
+class RequestTiming:
+    """Temps d'une requête ; sert aussi d'execute_wrapper."""
+
+    def __init__(self, top_queries=5):
+        self.started = perf_counter()
+        self.duration = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.phases = {}
+        self.phase_sql = {}
+        self.slowest = []
+        self.top_queries = top_queries
+        self._stack = []
+        self._since = self.started
+
+    def enter(self, phase):
+        now = perf_counter()
+        if self._stack:
+            current = self._stack[-1]
+            self.phases[current] = self.phases.get(current, 0.0) + now - self._since
+        self._stack.append(phase)
+        self._since = now
+
+    def leave(self):
+        now = perf_counter()
+        phase = self._stack.pop()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._since
+        self._since = now
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            self.queries += 1
+            self.sql_time += elapsed
+            phase = self._stack[-1] if self._stack else 'other'
+            self.phase_sql[phase] = self.phase_sql.get(phase, 0.0) + elapsed
+            # Tas des top_queries requêtes les plus lentes : le texte SQL n'est gardé que pour elles
+            if len(self.slowest) < self.top_queries:
+                heapq.heappush(self.slowest, (elapsed, self.queries, sql))
+            elif self.top_queries and elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, self.queries, sql))
+
+    def finish(self):
+        self.duration = perf_counter() - self.started
+
+    def server_timing(self):
+        entries = [f'db;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries"']
+        entries += [f'{phase};dur={self.phases[phase] * 1000:.2f}' for phase in PHASES if phase in self.phases]
+        entries.append(f'total;dur={self.duration * 1000:.2f}')
+        return ', '.join(entries)
+
+    def record(self, request, response):
+        match = request.resolver_match
+        # Vues DRF : action de la méthode HTTP (list, retrieve...)
+        actions = getattr(match.func, 'actions', None) if match else None
+        user = getattr(request, 'user', None)
+        return {
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'action': actions.get(request.method.lower()) if actions else None,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'duration_ms': round(self.duration * 1000, 2),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'phases_ms': {phase: round(value * 1000, 2) for phase, value in self.phases.items()},
+            'phase_sql_ms': {phase: round(value * 1000, 2) for phase, value in self.phase_sql.items()},
+            'slowest_sql': [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql}
+                for elapsed, _, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+class RequestTimingMiddleware:
+    """Mesure chaque requête (désactivé par défaut : REQUEST_TIMING_ENABLED)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
+        self.top_queries = settings.SLOW_REQUEST_TOP_QUERIES
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = request.timing = RequestTiming(self.top_queries)
+        with connection.execute_wrapper(timing):
+            response = self.get_response(request)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = request.timing = RequestTiming(self.top_queries)
+        async with async_execute_wrapper(timing):
+            response = await self.get_response(request)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        # Une réponse en flux (export) n'est comptée que jusqu'à son premier octet
+        timing.finish()
+        response['Server-Timing'] = timing.server_timing()
+        if timing.duration >= self.threshold:
+            logger.warning(json.dumps(timing.record(request, response), ensure_ascii=False))
+        return response
+
+
+class PhaseTimingMixin:
+    """Découpe le temps des vues DRF en phases (voir le docstring du module)."""
+
+    def _timed(self, phase, method, *args, **kwargs):
+        with request_phase(self.request, phase):
+            return method(*args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        # self.request n'est pas encore défini : la phase englobante est posée ici
+        with request_phase(request, 'ser'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        return self._timed('auth', super().perform_authentication, request)
+
+    def check_permissions(self, request):
+        return self._timed('perm', super().check_permissions, request)
+
+    def check_object_permissions(self, request, obj):
+        return self._timed('perm', super().check_object_permissions, request, obj)
+
+    def check_throttles(self, request):
+        return self._timed('throttle', super().check_throttles, request)
+
+    def get_object(self):
+        return self._timed('qs', super().get_object)
+
+    def filter_queryset(self, queryset):
+        return self._timed('qs', super().filter_queryset, queryset)
+
+    def paginate_queryset(self, queryset):
+        return self._timed('qs', super().paginate_queryset, queryset)
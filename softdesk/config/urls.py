@@ -1,6 +1,7 @@
 """
 URL configuration
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -11,12 +12,17 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from users.views import (
     UserViewSet,
 )
+from diagnostics.views import ProfileListView, ProfileDetailView, MemoryReportListView, MemoryReportDetailView
 from projects.views import (
     ProjectViewSet,
     ContributorViewSet,
     IssueViewSet,
     CommentViewSet,
+    CacheStatsView,
+    MetricsView,
+    SearchView,
 )
+from projects.async_views import async_read_urls
 
 # Router principal
 router = DefaultRouter()
@@ -59,6 +65,11 @@ comments_router.register(
     basename='issue-comments'
 )
 
+viewset_urls = [*router.urls, *contributors_router.urls, *issues_router.urls, *comments_router.urls]
+if settings.ASYNC_READ_VIEWS:
+    # Sous ASGI : list et retrieve servis par les vues async (projects/async_views.py)
+    viewset_urls = async_read_urls(viewset_urls)
+
 # Combine URL patterns
 urlpatterns = [
     # Admin
@@ -70,10 +81,20 @@ urlpatterns = [
 
     # API endpoints
     path('softdesk_api/', include([
-        path('', include(router.urls)),
-        path('', include(contributors_router.urls)),
-        path('', include(issues_router.urls)),
-        path('', include(comments_router.urls)),
+        path('', include(viewset_urls)),
+
+        # Recherche
+        path('search/', SearchView.as_view(), name='search'),
+
+        # Monitoring
+        path('cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+        path('metrics/', MetricsView.as_view(), name='metrics'),
+
+        # Diagnostics
+        path('profiles/', ProfileListView.as_view(), name='profiles'),
+        path('profiles/<str:name>/', ProfileDetailView.as_view(), name='profile-detail'),
+        path('memory/', MemoryReportListView.as_view(), name='memory'),
+        path('memory/<str:name>/', MemoryReportDetailView.as_view(), name='memory-detail'),
     ])),
 ]
 
@@ -97,6 +118,8 @@ urlpatterns = [
 • GET    /softdesk_api/projects/{project_id}/                                           • Détails d'un projet
 • PUT    /softdesk_api/projects/{project_id}/                                           • Modifier un projet
 • DELETE /softdesk_api/projects/{project_id}/                                           • Supprimer un projet
+• GET    /softdesk_api/projects/{project_id}/export/                                    • Exporter un projet en NDJSON
+•        ?compress=gzip
 •
 ••• Contributors
 • GET    /softdesk_api/projects/{project_id}/contributors/                              • Liste des contributeurs
@@ -106,10 +129,12 @@ urlpatterns = [
 •
 ••• Issues
 • GET    /softdesk_api/projects/{project_id}/issues/                                    • Liste des issues
+•        ?status, ?priority, ?tag, ?assigned_user, ?ordering
 • POST   /softdesk_api/projects/{project_id}/issues/                                    • Créer une issue
 • GET    /softdesk_api/projects/{project_id}/issues/{issue_id}/                         • Détails d'une issue
 • PUT    /softdesk_api/projects/{project_id}/issues/{issue_id}/                         • Modifier une issue
 • DELETE /softdesk_api/projects/{project_id}/issues/{issue_id}/                         • Supprimer une issue
+• POST   /softdesk_api/projects/{project_id}/issues/batch/                              • Créer / modifier par lots
 •
 ••• Comments
 • GET    /softdesk_api/projects/{project_id}/issues/{issue_id}/comments/                • Liste des commentaires
@@ -117,6 +142,24 @@ urlpatterns = [
 • GET    /softdesk_api/projects/{project_id}/issues/{issue_id}/comments/{comment_id}/   • Détails d'un commentaire
 • PUT    /softdesk_api/projects/{project_id}/issues/{issue_id}/comments/{comment_id}/   • Modifier un commentaire
 • DELETE /softdesk_api/projects/{project_id}/issues/{issue_id}/comments/{comment_id}/   • Supprimer un commentaire
+•
+••• Search
+• GET    /softdesk_api/search/?q={texte}                                                • Recherche plein texte
+•        dans les issues et commentaires
+•
+••• Monitoring
+• GET    /softdesk_api/cache/stats/                                                     • Stats des caches (admin)
+• GET    /softdesk_api/metrics/                                                         • Métriques Prometheus
+•        admin ou METRICS_TOKEN
+•
+••• Diagnostics
+• GET    /softdesk_api/profiles/                                                        • Profils cProfile (admin)
+• GET    /softdesk_api/profiles/{name}/                                                 • Télécharger un profil
+•        ?top=N : fonctions les plus coûteuses
+• GET    /softdesk_api/memory/                                                          • Pic mémoire par vue (admin)
+•        et rapports tracemalloc
+• GET    /softdesk_api/memory/{name}/                                                   • Rapport mémoire
+•        ?compare={name} : écarts par ligne
 
 
 ••• API Permissions :
@@ -134,6 +177,7 @@ urlpatterns = [
 • GET     • authenticated contrib ou admin
 • PUT     • authenticated project_author ou admin
 • DELETE  • authenticated project_author ou admin
+• GET     • authenticated contrib ou admin > export : projet, contributeurs, issues et comments en NDJSON
 •
 ••• Contributeurs
 • GET     • authenticated contributor ou admin > liste les contributeurs d'un projet
@@ -147,6 +191,8 @@ urlpatterns = [
 • GET     • authenticated contributor ou admin > donne les infos d'une issue
 • PUT     • authenticated issue_author ou admin > update les infos d'une issue
 • DELETE  • authenticated issue_author ou admin > delete une issue
+• POST    • authenticated contributor ou admin > batch : crée des issues, modifie celles dont il est l'auteur
+•                                                (toutes pour l'admin)
 •
 ••• Commentaires
 • GET     • authenticated contributor ou admin > liste les issues d'un projet
@@ -154,4 +200,7 @@ urlpatterns = [
 • GET     • authenticated contributor ou admin > liste les comments d'une issue
 • PUT     • authenticated comment_author ou admin > update le comment
 • DELETE  • authenticated comment_author ou admin > delete le comment
+•
+••• Recherche
+• GET     • authenticated user > cherche dans les issues et comments de ses projets (tous pour l'admin)
 '''
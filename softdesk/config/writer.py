@@ -0,0 +1,223 @@
+"""
+File d'écriture unique par processus, pour SQLite (un seul écrivain à la
+fois, même en WAL).
+
+Avec WRITE_QUEUE_ENABLED, submit_write() confie une courte écriture
+(créations d'issues et de commentaires) au thread écrivain du processus, et
+attend son résultat. Le thread prend toutes les écritures en attente (au
+plus WRITE_QUEUE_MAX_BATCH, après au plus WRITE_QUEUE_MAX_WAIT_MS) et les
+exécute dans une seule transaction, chacune dans son savepoint : une
+écriture qui échoue est annulée seule, et son exception est levée chez
+l'appelant ; les autres sont validées ensemble. Si la validation du lot
+échoue, tous ses appelants reçoivent l'erreur. Une erreur inattendue du
+thread est journalisée sans l'arrêter ; un thread arrêté malgré tout est
+recréé par writer().
+
+L'appelant attend au plus WRITE_QUEUE_TIMEOUT secondes : une écriture
+encore en file est alors annulée et la requête reçoit une 503. Une écriture
+déjà commencée est attendue jusqu'à son résultat.
+
+Les threads de requête ne se disputent plus le verrou d'écriture : une
+validation par lot au lieu d'une par requête, et le débit augmente avec le
+nombre d'écrivains simultanés au lieu de s'effondrer.
+
+Toutes les transactions d'écriture (lots du thread écrivain, suppressions,
+serializers, projects/services.py, imports, admin, réparation des
+compteurs) sont ouvertes par write_atomic() : sur SQLite, elles commencent
+par BEGIN IMMEDIATE (config/sqlite/base.py). Une transaction différée qui
+lit avant d'écrire échouerait aussitôt (SQLITE_BUSY_SNAPSHOT) si un autre
+écrivain validait entre-temps.
+
+La fonction s'exécute dans le thread écrivain, sur sa propre connexion :
+les lectures qu'elle suppose (projet, issue de l'URL) sont faites avant,
+par l'appelant, et ses requêtes SQL ne sont pas comptées dans celles de la
+requête HTTP. Dans une transaction déjà ouverte (tests, ATOMIC_REQUESTS),
+ou sans WRITE_QUEUE_ENABLED, la fonction s'exécute sur place dans sa propre
+transaction, comme avant.
+"""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, InvalidStateError
+from contextlib import contextmanager
+from time import monotonic
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger('softdesk.writer')
+
+_STOP = object()
+
+
+class WriteQueueTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Le serveur est trop sollicité pour enregistrer cette écriture, réessayez plus tard."
+    default_code = 'write_queue_timeout'
+
+
+@contextmanager
+def write_atomic(using=None):
+    """
+    transaction.atomic() d'une transaction d'écriture : sur config.sqlite,
+    elle commence par BEGIN IMMEDIATE. Dans une transaction déjà ouverte,
+    simple savepoint. Utilisable comme décorateur : @write_atomic().
+    """
+    connection = transaction.get_connection(using)
+    immediate = not connection.in_atomic_block and hasattr(connection, 'begin_immediate')
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
+
+
+def _fail(batch, error):
+    """Transmet error aux appelants du lot qui n'ont pas encore de résultat."""
+    for future, _, _ in batch:
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            # Déjà résolue, ou annulée par son appelant (WRITE_QUEUE_TIMEOUT)
+            pass
+
+
+class Writer:
+    """Thread écrivain d'une base : seul à exécuter les écritures qui lui sont confiées."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, max_batch=32, max_wait=0.0):
+        self.using = using
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.writes = 0
+        self.thread = threading.Thread(target=self.run, name=f'softdesk-writer-{using}', daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, timeout=None):
+        """
+        Exécute function(*args) dans le prochain lot ; retourne son résultat ou
+        lève son exception. WriteQueueTimeout si elle n'a pas commencé après timeout secondes.
+        """
+        future = Future()
+        self.queue.put((future, function, args))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise WriteQueueTimeout
+        # Déjà commencée : son lot se termine
+        return future.result()
+
+    def alive(self):
+        # Après un fork, le thread du processus parent n'existe plus
+        return self.pid == os.getpid() and self.thread.is_alive()
+
+    def stop(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def run(self):
+        stopping = False
+        try:
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    try:
+                        self.commit(batch)
+                        # Comme en fin de requête : connexion fermée si obsolète ou inutilisable
+                        close_old_connections()
+                    except Exception as e:
+                        # Le thread survit : les appelants encore en attente reçoivent l'erreur
+                        logger.exception("Erreur du thread écrivain")
+                        _fail(batch, e)
+        finally:
+            connections[self.using].close()
+
+    def _next_batch(self):
+        """Écritures en attente, et vrai si l'arrêt a été demandé (les écritures reçues passent avant)."""
+        batch = []
+        item = self.queue.get()
+        deadline = monotonic() + self.max_wait
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                break
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - monotonic()))
+            except queue.Empty:
+                break
+        return batch, item is _STOP
+
+    def commit(self, batch):
+        """Exécute les écritures du lot dans une transaction, chacune dans son savepoint."""
+        outcomes = []
+        try:
+            with write_atomic(using=self.using):
+                for future, function, args in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, function(*args), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            logger.warning("Lot de %d écritures annulé : %s", len(batch), e)
+            _fail(batch, e)
+            return
+        self.batches += 1
+        self.writes += len(outcomes)
+        # Après la validation (et les fonctions on_commit) : l'appelant lit une base à jour
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def writer(using=DEFAULT_DB_ALIAS):
+    """
+    Thread écrivain du processus pour la base using, recréé après un fork
+    (workers Gunicorn) ou s'il s'est arrêté.
+    """
+    instance = _writers.get(using)
+    if instance is None or not instance.alive():
+        with _writers_lock:
+            instance = _writers.get(using)
+            if instance is None or not instance.alive():
+                instance = _writers[using] = Writer(
+                    using, settings.WRITE_QUEUE_MAX_BATCH, settings.WRITE_QUEUE_MAX_WAIT_MS / 1000
+                )
+    return instance
+
+
+def stop_writer(using=DEFAULT_DB_ALIAS):
+    """Arrête le thread écrivain de using, après les écritures en attente."""
+    with _writers_lock:
+        instance = _writers.pop(using, None)
+    if instance is not None and instance.pid == os.getpid():
+        instance.stop()
+
+
+def submit_write(function, *args, using=DEFAULT_DB_ALIAS):
+    """
+    Exécute function(*args) dans une transaction : par le thread écrivain
+    avec WRITE_QUEUE_ENABLED, sur place sinon. Retourne son résultat.
+    """
+    if not settings.WRITE_QUEUE_ENABLED or connections[using].in_atomic_block:
+        with write_atomic(using=using):
+            return function(*args)
+    return writer(using).submit(function, *args, timeout=settings.WRITE_QUEUE_TIMEOUT)
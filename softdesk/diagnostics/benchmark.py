@@ -0,0 +1,446 @@
+"""
+Banc de mesure des endpoints de l'API, dans le processus.
+
+Chaque scénario appelle une route de config/urls.py avec le client de test
+de Django, authentifié par JWT comme un vrai client, contre une base de
+test remplie par projects.datasets (même graine, mêmes données). Pour chaque
+scénario : percentiles du temps de réponse, nombre de requêtes SQL et temps
+SQL. Les écritures sont annulées (rollback) après chaque itération, pour que
+toutes les itérations mesurent la même base.
+
+Les résultats sont un dict sérialisable en JSON ; compare() en confronte
+deux pour signaler les régressions au-delà d'un seuil.
+"""
+import fnmatch
+import json
+import math
+import platform
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from projects.datasets import DatasetGenerator
+from projects.imports import preserved_dates
+from projects.models import Project, Contributor, Issue, Comment
+from users.models import User
+
+DATASET = {'users': 300, 'projects': 60, 'issues': 6000, 'comments': 30000, 'seed': 1}
+PASSWORD = 'password'
+ADMIN_USERNAME = 'bench_admin'
+
+
+class Scenario:
+    """
+    Un appel d'une route : url_name et kwargs(fixtures) pour reverse(), role
+    de l'utilisateur authentifié, corps data(fixtures) pour les écritures.
+    """
+
+    def __init__(self, name, url_name, method='get', role='author', kwargs=None, query=None, data=None,
+                 expected=200, write=False):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.role = role
+        self.kwargs = kwargs or (lambda f: {})
+        self.query = query
+        self.data = data
+        self.expected = expected
+        self.write = write
+
+    def url(self, fixtures):
+        url = reverse(self.url_name, kwargs=self.kwargs(fixtures))
+        return f"{url}?{urlencode(self.query)}" if self.query else url
+
+
+def _project(f):
+    return {'pk': f['project'].pk}
+
+
+def _nested(f):
+    return {'project_pk': f['project'].pk}
+
+
+def _issue(f):
+    return {'project_pk': f['project'].pk, 'pk': f['issue'].pk}
+
+
+def _comments(f):
+    return {'project_pk': f['project'].pk, 'issue_pk': f['issue'].pk}
+
+
+def _comment(f):
+    return {'project_pk': f['project'].pk, 'issue_pk': f['issue'].pk, 'pk': f['comment'].pk}
+
+
+SCENARIOS = [
+    # Authentification
+    Scenario('login', 'token_obtain_pair', 'post', role=None,
+             data=lambda f: {'username': f['author'].username, 'password': PASSWORD}),
+    Scenario('login:refresh', 'token_refresh', 'post', role=None,
+             data=lambda f: {'refresh': str(RefreshToken.for_user(f['author']))}),
+    Scenario('api-root', 'api-root'),
+    # Utilisateurs
+    Scenario('users:list', 'users-list', role='admin'),
+    Scenario('users:retrieve', 'users-detail', kwargs=lambda f: {'pk': f['author'].pk}),
+    Scenario('users:profile', 'users-profile', kwargs=lambda f: {'pk': f['author'].pk}),
+    Scenario('users:create', 'users-list', 'post', role='admin', expected=201, write=True,
+             data=lambda f: {
+                 'username': 'bench_new', 'email': 'bench_new@example.com', 'dob': '1990-01-01',
+                 'password': PASSWORD, 'password_confirm': PASSWORD,
+                 'can_be_contacted': True, 'can_data_be_shared': True,
+             }),
+    Scenario('users:update', 'users-detail', 'put', write=True, kwargs=lambda f: {'pk': f['author'].pk},
+             data=lambda f: {
+                 'username': f['author'].username, 'email': f['author'].email, 'dob': '1990-01-01',
+                 'can_be_contacted': True, 'can_data_be_shared': True,
+             }),
+    Scenario('users:destroy', 'users-detail', 'delete', role='member', expected=204, write=True,
+             kwargs=lambda f: {'pk': f['member'].pk}),
+    # Projets
+    Scenario('projects:list', 'projects-list', role='power_user'),
+    Scenario('projects:list:admin', 'projects-list', role='admin'),
+    Scenario('projects:retrieve', 'projects-detail', kwargs=_project),
+    Scenario('projects:create', 'projects-list', 'post', expected=201, write=True,
+             data=lambda f: {'title': 'Banc', 'description': 'd', 'type': 'Back-End',
+                             'contributors': [f['member'].username]}),
+    Scenario('projects:update', 'projects-detail', 'put', write=True, kwargs=_project,
+             data=lambda f: {'title': 'Banc', 'description': 'd', 'type': 'Back-End',
+                             'contributors': f['member_usernames']}),
+    Scenario('projects:destroy', 'projects-detail', 'delete', expected=204, write=True, kwargs=_project),
+    Scenario('projects:export', 'projects-export', kwargs=_project),
+    # Contributeurs
+    Scenario('contributors:list', 'project-contributors-list', kwargs=_nested),
+    Scenario('contributors:retrieve', 'project-contributors-detail',
+             kwargs=lambda f: {'project_pk': f['project'].pk, 'pk': f['contributor'].pk}),
+    Scenario('contributors:create', 'project-contributors-list', 'post', expected=201, write=True, kwargs=_nested,
+             data=lambda f: {'contributors': [f['newcomer'].username]}),
+    Scenario('contributors:destroy', 'project-contributors-detail', 'delete', write=True,
+             kwargs=lambda f: {'project_pk': f['project'].pk, 'pk': f['contributor'].pk}),
+    # Issues
+    Scenario('issues:list', 'project-issues-list', kwargs=_nested),
+    Scenario('issues:list:filtered', 'project-issues-list', kwargs=_nested,
+             query={'status': 'À FAIRE', 'ordering': '-priority'}),
+    Scenario('issues:retrieve', 'project-issues-detail', kwargs=_issue),
+    Scenario('issues:create', 'project-issues-list', 'post', expected=201, write=True, kwargs=_nested,
+             data=lambda f: {'title': 'Banc', 'description': 'd', 'tag': 'BUG', 'priority': 'FAIBLE',
+                             'status': 'À FAIRE'}),
+    Scenario('issues:update', 'project-issues-detail', 'put', role='issue_author', write=True, kwargs=_issue,
+             data=lambda f: {'title': 'Banc', 'description': 'd', 'tag': 'BUG', 'priority': 'FAIBLE',
+                             'status': 'EN COURS'}),
+    Scenario('issues:destroy', 'project-issues-detail', 'delete', role='issue_author', expected=204, write=True,
+             kwargs=_issue),
+    Scenario('issues:batch', 'project-issues-batch', 'post', write=True, kwargs=_nested,
+             data=lambda f: {'create': [{'title': f'Banc {n}', 'description': 'd'} for n in range(50)]}),
+    # Commentaires
+    Scenario('comments:list', 'issue-comments-list', kwargs=_comments),
+    Scenario('comments:retrieve', 'issue-comments-detail', kwargs=_comment),
+    Scenario('comments:create', 'issue-comments-list', 'post', expected=201, write=True, kwargs=_comments,
+             data=lambda f: {'description': 'Banc'}),
+    Scenario('comments:update', 'issue-comments-detail', 'put', role='comment_author', write=True,
+             kwargs=_comment, data=lambda f: {'description': 'Banc'}),
+    Scenario('comments:destroy', 'issue-comments-detail', 'delete', role='comment_author', expected=204,
+             write=True, kwargs=_comment),
+    # Recherche et supervision
+    Scenario('search', 'search', query={'q': 'erreur serveur'}),
+    Scenario('cache_stats', 'cache_stats', role='admin'),
+    Scenario('metrics', 'metrics', role='admin'),
+    Scenario('profiles:list', 'profiles', role='admin'),
+    Scenario('profiles:retrieve', 'profile-detail', role='admin', expected=404,
+             kwargs=lambda f: {'name': '20260101T000000000000-Absent-GET-200-0ms-0.pstats'}),
+    Scenario('memory:list', 'memory', role='admin'),
+    Scenario('memory:retrieve', 'memory-detail', role='admin', expected=404,
+             kwargs=lambda f: {'name': '20260101T000000000000-0'}),
+]
+
+
+def route_names():
+    """Noms des routes de l'API (hors admin de Django)."""
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace != 'admin':
+                    yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+    return set(walk(get_resolver().url_patterns))
+
+
+def uncovered_routes(scenarios=SCENARIOS):
+    return sorted(route_names() - {scenario.url_name for scenario in scenarios})
+
+
+def select(scenarios, only=None, exclude=None):
+    """Filtre les scénarios par motifs fnmatch sur leur nom (ex. 'issues:*')."""
+    return [
+        scenario for scenario in scenarios
+        if (not only or any(fnmatch.fnmatch(scenario.name, pattern) for pattern in only))
+        and not any(fnmatch.fnmatch(scenario.name, pattern) for pattern in exclude or ())
+    ]
+
+
+# Environnement de mesure
+
+@contextmanager
+def unthrottled():
+    """Désactive les limites de débit de DRF (un taux None laisse tout passer)."""
+    rates = SimpleRateThrottle.THROTTLE_RATES
+    SimpleRateThrottle.THROTTLE_RATES = dict.fromkeys(rates, None)
+    try:
+        yield
+    finally:
+        SimpleRateThrottle.THROTTLE_RATES = rates
+
+
+def _isolated_caches():
+    """Caches en mémoire, de mêmes réglages, pour ne pas toucher aux caches partagés."""
+    return {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'benchmark-{alias}',
+            'TIMEOUT': config.get('TIMEOUT', 300),
+            'OPTIONS': config.get('OPTIONS', {}),
+        }
+        for alias, config in settings.CACHES.items()
+    }
+
+
+@contextmanager
+def benchmark_database(dataset):
+    """
+    Base de test remplie par le générateur (dataset), ou base courante si
+    dataset est None. Caches isolés et limites de débit désactivées.
+    """
+    setup_test_environment()
+    old_name = None
+    try:
+        with override_settings(CACHES=_isolated_caches()), unthrottled():
+            if dataset is not None:
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                seed_database(dataset)
+            yield
+    finally:
+        if old_name is not None:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_database(dataset):
+    options = dict(dataset)
+    generator = DatasetGenerator(
+        options.pop('users'), options.pop('projects'), options.pop('issues'), options.pop('comments'),
+        password=PASSWORD, **options
+    )
+    with preserved_dates():
+        generator.run()
+    admin = User.objects.filter(username=f"{generator.prefix}0").get()
+    User.objects.create(
+        username=ADMIN_USERNAME, email=f'{ADMIN_USERNAME}@example.com', dob=admin.dob,
+        password=admin.password, is_superuser=True, is_staff=True,
+    )
+
+
+def load_fixtures():
+    """Objets visés par les scénarios : le plus gros projet et ses éléments les plus chargés."""
+    project = Project.objects.order_by('-issue_count', 'pk').first()
+    if project is None:
+        raise ValueError("La base ne contient aucun projet.")
+    members = list(
+        Contributor.objects.filter(project=project).exclude(user_id=project.author_user_id)
+        .select_related('user').order_by('pk')
+    )
+    issue = Issue.objects.filter(project=project).order_by('-comment_count', 'pk').first()
+    comment = Comment.objects.filter(issue=issue).order_by('pk').first() if issue else None
+    member_ids = Contributor.objects.filter(project=project).values('user_id')
+    power_user = (
+        Contributor.objects.values('user_id').order_by()
+        .annotate(n=Count('pk')).order_by('-n', 'user_id').first()
+    )
+    return {
+        'project': project,
+        'author': project.author_user,
+        'member': members[0].user if members else None,
+        'contributor': members[0] if members else None,
+        'member_usernames': [contributor.user.username for contributor in members],
+        'newcomer': User.objects.exclude(pk__in=member_ids).order_by('pk').first(),
+        'issue': issue,
+        'issue_author': issue.author_user if issue else None,
+        'comment': comment,
+        'comment_author': comment.author_user if comment else None,
+        'power_user': User.objects.get(pk=power_user['user_id']) if power_user else None,
+        'admin': User.objects.filter(is_superuser=True).order_by('pk').first(),
+    }
+
+
+# Mesure
+
+class QueryCollector:
+    """execute_wrapper comptant les requêtes SQL et leur durée."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _request(client, scenario, url, headers, data):
+    kwargs = dict(headers)
+    if data is not None:
+        kwargs.update(data=json.dumps(data), content_type='application/json')
+    response = getattr(client, scenario.method)(url, **kwargs)
+    if response.streaming:
+        # Un export compte jusqu'au dernier octet produit
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, scenario, fixtures, iterations, warmup=1, cold=False):
+    """Exécute le scénario warmup + iterations fois ; retourne ses statistiques."""
+    user = fixtures.get(scenario.role) if scenario.role else None
+    if scenario.role and user is None:
+        return {'skipped': f"aucun utilisateur pour le rôle {scenario.role}"}
+    headers = {}
+    if user is not None:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+    url = scenario.url(fixtures)
+    data = scenario.data(fixtures) if scenario.data else None
+
+    walls, queries, sql, statuses = [], [], [], []
+    for number in range(warmup + iterations):
+        if cold:
+            for cache in caches.all():
+                cache.clear()
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            if scenario.write:
+                with transaction.atomic():
+                    response = _request(client, scenario, url, headers, data)
+                    transaction.set_rollback(True)
+            else:
+                response = _request(client, scenario, url, headers, data)
+        wall = time.perf_counter() - start
+        if number < warmup:
+            continue
+        walls.append(wall * 1000)
+        queries.append(collector.count)
+        sql.append(collector.time * 1000)
+        statuses.append(response.status_code)
+
+    return {
+        'method': scenario.method.upper(),
+        'route': scenario.url_name,
+        'iterations': iterations,
+        'p50_ms': round(percentile(walls, 0.5), 3),
+        'p90_ms': round(percentile(walls, 0.9), 3),
+        'p99_ms': round(percentile(walls, 0.99), 3),
+        'mean_ms': round(sum(walls) / len(walls), 3),
+        'max_ms': round(max(walls), 3),
+        'queries': percentile(queries, 0.5),
+        'queries_max': max(queries),
+        'sql_p50_ms': round(percentile(sql, 0.5), 3),
+        'sql_p90_ms': round(percentile(sql, 0.9), 3),
+        'statuses': sorted(set(statuses)),
+        'unexpected': sum(1 for code in statuses if code != scenario.expected),
+    }
+
+
+def environment(dataset):
+    return {
+        'date': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'database': connection.vendor,
+        'machine': platform.machine(),
+        'dataset': dataset,
+    }
+
+
+def run(scenarios=SCENARIOS, iterations=20, warmup=1, dataset=DATASET, cold=False, progress=None):
+    """
+    Mesure les scénarios ; dataset=None mesure la base courante (écritures annulées).
+    progress(name, result) est appelé après chaque scénario.
+    """
+    results = {}
+    with benchmark_database(dataset):
+        fixtures = load_fixtures()
+        client = Client()
+        for scenario in scenarios:
+            try:
+                result = measure(client, scenario, fixtures, iterations, warmup, cold)
+            except Exception as e:
+                result = {'error': f"{type(e).__name__}: {e}"}
+            results[scenario.name] = result
+            if progress:
+                progress(scenario.name, result)
+    return {
+        'environment': environment(dataset),
+        'iterations': iterations,
+        'cold_cache': cold,
+        'scenarios': results,
+        'uncovered_routes': uncovered_routes(),
+    }
+
+
+# Comparaison
+
+COMPARED = ('p50_ms', 'p90_ms')
+
+
+def compare(baseline, current, threshold=0.10, min_delta_ms=0.5):
+    """
+    Confronte deux résultats. Régression : un percentile de COMPARED qui
+    augmente de plus de threshold (et d'au moins min_delta_ms, sous lequel
+    c'est du bruit) ou un nombre médian de requêtes qui augmente.
+    Retourne (régressions, améliorations, scénarios absents d'un des deux).
+    """
+    regressions, improvements, missing = [], [], []
+    before, after = baseline['scenarios'], current['scenarios']
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name, {}), after.get(name, {})
+        if 'p50_ms' not in old or 'p50_ms' not in new:
+            missing.append(name)
+            continue
+        for metric in COMPARED:
+            delta = new[metric] - old[metric]
+            change = delta / old[metric] if old[metric] else 0
+            row = {'scenario': name, 'metric': metric, 'before': old[metric], 'after': new[metric],
+                   'change': round(change, 4)}
+            if change > threshold and delta >= min_delta_ms:
+                regressions.append(row)
+            elif change < -threshold and -delta >= min_delta_ms:
+                improvements.append(row)
+        if new['queries'] != old['queries']:
+            row = {'scenario': name, 'metric': 'queries', 'before': old['queries'], 'after': new['queries'],
+                   'change': new['queries'] - old['queries']}
+            (regressions if new['queries'] > old['queries'] else improvements).append(row)
+    return regressions, improvements, missing
@@ -0,0 +1,208 @@
+"""
+Banc de concurrence SQLite : lectures et écritures simultanées, avec le
+backend SQLite par défaut de Django puis avec config/sqlite.
+
+Chaque configuration est mesurée sur sa propre copie de la base courante
+(API de sauvegarde de SQLite), qui n'est jamais modifiée :
+- « avant » : django.db.backends.sqlite3 tel quel, journal rollback
+  (DELETE), transactions différées, une connexion par requête ;
+- « après » : DATABASES['default'] (WAL, pragmas, relances sur
+  SQLITE_BUSY, connexions persistantes), l'écriture dans write_atomic()
+  (BEGIN IMMEDIATE) ;
+- « après + file » : les mêmes réglages, les écritures confiées au thread
+  écrivain de config/writer.py (validation par lots).
+
+Des threads lecteurs lisent une page de commentaires d'une issue, des
+threads écrivains ajoutent un commentaire comme CommentViewSet.perform_create
+(lecture de l'issue, puis insertion et compteur dans une transaction). Chaque
+opération est encadrée comme une requête HTTP (close_if_unusable_or_obsolete
+avant et après). Résultat par configuration et par opération : débit,
+percentiles de latence et erreurs (« database is locked »).
+
+Les threads partagent le GIL, comme ceux d'un worker runserver ou Gunicorn
+gthread : sous de nombreux lecteurs, la latence des écritures en dépend
+autant que des verrous de SQLite.
+"""
+import copy
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F
+
+from config.writer import stop_writer, write_atomic, writer
+from projects.models import Comment, Issue
+
+from .benchmark import environment, percentile
+
+# Issues visées : les plus commentées
+ISSUES = 200
+PAGE_SIZE = 20
+
+
+def read_comments(alias, issue_id):
+    list(Comment.objects.using(alias).filter(issue_id=issue_id).order_by('-created_at', '-id')[:PAGE_SIZE])
+
+
+def _issue(alias, issue_id):
+    return Issue.objects.using(alias).only('pk', 'author_user_id').get(pk=issue_id)
+
+
+def _create_comment(alias, issue):
+    Comment.objects.using(alias).create(
+        issue=issue, author_user_id=issue.author_user_id, description="Commentaire du banc de concurrence."
+    )
+    Issue.objects.using(alias).filter(pk=issue.pk).update(comment_count=F('comment_count') + 1)
+
+
+def post_comment(alias, issue_id):
+    # write_atomic() : BEGIN IMMEDIATE sur config.sqlite, transaction différée sur le backend par défaut
+    with write_atomic(using=alias):
+        _create_comment(alias, _issue(alias, issue_id))
+
+
+def post_comment_queued(alias, issue_id):
+    writer(alias).submit(_create_comment, alias, _issue(alias, issue_id))
+
+
+OPERATIONS = {'read': read_comments, 'write': post_comment}
+
+
+def configurations(directory):
+    """Réglages DATABASES des deux configurations, chacune sur sa copie de la base."""
+    default = settings.DATABASES['default']
+    return {
+        'avant': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(directory / 'avant.sqlite3'),
+            'CONN_MAX_AGE': 0,
+        },
+        'après': {
+            **copy.deepcopy(default),
+            'NAME': str(directory / 'apres.sqlite3'),
+        },
+        'après + file': {
+            **copy.deepcopy(default),
+            'NAME': str(directory / 'apres-file.sqlite3'),
+        },
+    }
+
+
+def copy_database(source, target, journal_mode):
+    """Copie cohérente de source (même en WAL, même en cours d'écriture)."""
+    source_db, target_db = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        source_db.backup(target_db)
+        target_db.execute(f'PRAGMA journal_mode = {journal_mode}')
+    finally:
+        source_db.close()
+        target_db.close()
+
+
+def _worker(alias, operation, issue_ids, deadline, results):
+    connection = connections[alias]
+    rng = random.Random()
+    latencies, errors = [], {}
+    try:
+        while time.perf_counter() < deadline:
+            issue_id = rng.choice(issue_ids)
+            start = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()
+            try:
+                operation(alias, issue_id)
+            except DatabaseError as e:
+                errors[str(e)] = errors.get(str(e), 0) + 1
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close_if_unusable_or_obsolete()
+    finally:
+        connection.close()
+        # list.append est atomique : pas de verrou entre les threads
+        results.append((latencies, errors))
+
+
+def _summary(results, duration):
+    latencies = [latency for thread_latencies, _ in results for latency in thread_latencies]
+    errors = {}
+    for _, thread_errors in results:
+        for message, count in thread_errors.items():
+            errors[message] = errors.get(message, 0) + count
+    return {
+        'threads': len(results),
+        'operations': len(latencies),
+        'per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 0.5), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'max_ms': round(max(latencies), 3) if latencies else None,
+        'errors': sum(errors.values()),
+        'error_messages': errors,
+    }
+
+
+def measure(alias, readers, writers, duration, queued=False):
+    """
+    Lecteurs et écrivains simultanés sur alias pendant duration secondes ;
+    queued : écritures par le thread écrivain.
+    """
+    issue_ids = list(Issue.objects.using(alias).order_by('-comment_count').values_list('pk', flat=True)[:ISSUES])
+    connections[alias].close()
+    del connections[alias]
+    if not issue_ids:
+        raise ValueError("La base ne contient aucune issue.")
+
+    operations = {**OPERATIONS, 'write': post_comment_queued} if queued else OPERATIONS
+    results = {kind: [] for kind in operations}
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(alias, operations[kind], issue_ids, deadline, results[kind]))
+        for kind, count in (('read', readers), ('write', writers))
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = {kind: _summary(kind_results, duration) for kind, kind_results in results.items() if kind_results}
+    if queued and writers:
+        batches = writer(alias).batches
+        summary['write']['batch_mean'] = round(summary['write']['operations'] / batches, 1) if batches else None
+    return summary
+
+
+def run(readers=8, writers=4, duration=10, progress=None):
+    """
+    Mesure les configurations l'une après l'autre.
+    progress(name, result) est appelé après chaque configuration.
+    """
+    if connections['default'].vendor != 'sqlite':
+        raise ValueError("Le banc de concurrence ne mesure que SQLite.")
+    source = str(settings.DATABASES['default']['NAME'])
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='softdesk-concurrency-') as directory:
+        for name, database in configurations(Path(directory)).items():
+            copy_database(source, database['NAME'], 'DELETE' if name == 'avant' else 'WAL')
+            alias = f'concurrency_{len(results)}'
+            # configure_settings() complète les réglages (TIME_ZONE, OPTIONS...) ; il exige 'default'
+            connections.settings[alias] = connections.configure_settings({**settings.DATABASES, alias: database})[alias]
+            try:
+                results[name] = measure(alias, readers, writers, duration, queued=name == 'après + file')
+            finally:
+                stop_writer(alias)
+                del connections.settings[alias]
+            if progress:
+                progress(name, results[name])
+    return {
+        'environment': environment(None),
+        'readers': readers,
+        'writers': writers,
+        'duration': duration,
+        'configurations': results,
+    }
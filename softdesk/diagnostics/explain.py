@@ -0,0 +1,286 @@
+"""
+Plans d'exécution des requêtes SQL lentes, capturés sur le trafic réel.
+
+ExplainCaptureMiddleware (désactivé par défaut : EXPLAIN_CAPTURE_ENABLED)
+chronomètre chaque requête SQL ; au-delà de
+EXPLAIN_THRESHOLD_MS, la requête est confiée (file bornée, sans attente) à
+un thread de fond. Le thread, et lui seul :
+- calcule l'empreinte de la requête (SQL normalisé : littéraux et listes
+  IN (...) remplacés), et cumule ses statistiques (exécutions lentes, temps
+  total et maximal, vues d'origine) ;
+- exécute EXPLAIN QUERY PLAN (SQLite) ou EXPLAIN ANALYZE (PostgreSQL, SELECT
+  seulement, dans une transaction annulée) sur sa propre connexion, une
+  fois par empreinte et par EXPLAIN_REFRESH secondes ;
+- écrit les plans dans EXPLAIN_DIR/plans/<empreinte>.json et les
+  statistiques du processus dans EXPLAIN_DIR/stats-<pid>-<jeton>.json.
+
+La commande explain_report classe les empreintes par temps total et
+signale les parcours complets de table. Les paramètres des requêtes ne
+sont jamais écrits sur disque.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection, connections, transaction
+
+from config.timing import async_execute_wrapper
+
+from .sampling import view_label
+
+logger = logging.getLogger('softdesk.explain')
+
+QUEUE_SIZE = 200
+FLUSH_INTERVAL = 5
+EXPLAINED_STATEMENTS = ('select', 'with', 'update', 'delete')
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+# SQLite : « SCAN projects_issue » (sans « USING INDEX ») ; PostgreSQL : « Seq Scan on projects_issue »
+_SQLITE_SCAN = re.compile(r'^\s*SCAN (?:TABLE )?(\w+)(.*)$')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+_TEMP_SORT = re.compile(r'USE TEMP B-TREE|Sort Method: external')
+
+
+def normalize(sql):
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+def plan_flags(lines):
+    """Parcours complets de table et tris temporaires d'un plan."""
+    scans, temp_sort = set(), False
+    for line in lines:
+        match = _SQLITE_SCAN.match(line)
+        if match and 'INDEX' not in match.group(2) and match.group(1) != 'CONSTANT':
+            scans.add(match.group(1))
+        scans.update(_POSTGRES_SCAN.findall(line))
+        temp_sort = temp_sort or bool(_TEMP_SORT.search(line))
+    return [f'full_scan:{table}' for table in sorted(scans)] + (['temp_sort'] if temp_sort else [])
+
+
+def explain_dir():
+    return Path(settings.EXPLAIN_DIR)
+
+
+def explain(alias, sql, params):
+    """Lignes du plan de sql, sur la connexion alias du thread courant."""
+    conn = connections[alias]
+    if conn.vendor == 'sqlite':
+        with conn.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            rows = cursor.fetchall()
+        # (id, parent, notused, detail) : indentation selon la profondeur
+        depth, lines = {0: -1}, []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node] + detail)
+        return lines
+    if conn.vendor == 'postgresql' and sql.lstrip().lower().startswith(('select', 'with')):
+        # ANALYZE exécute la requête : transaction annulée par sécurité
+        with transaction.atomic(using=alias), conn.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+            lines = [row[0] for row in cursor.fetchall()]
+            transaction.set_rollback(True, using=alias)
+        return lines
+    with conn.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+class _Worker:
+    """Thread de fond : seul à lire la file, à tenir les statistiques et à écrire."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex[:8]
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.stats = {}
+        self.dropped = 0
+        self.explained = {}
+        self.flushed = 0.0
+        self.thread = threading.Thread(target=self.run, name='softdesk-explain', daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Compte approximatif : incrémenté sans verrou par les threads de requête
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                try:
+                    self.handle(*item)
+                except Exception:
+                    logger.exception("Capture du plan impossible.")
+            if time.monotonic() - self.flushed >= FLUSH_INTERVAL and self.stats:
+                self.flush()
+
+    def handle(self, alias, sql, params, elapsed, view):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = {'sql': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': {}}
+        stats['count'] += 1
+        stats['total_ms'] += elapsed * 1000
+        stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+        stats['views'][view] = stats['views'].get(view, 0) + 1
+
+        now = time.time()
+        if now - self.explained.get(key, 0) < settings.EXPLAIN_REFRESH:
+            return
+        path = explain_dir() / 'plans' / f'{key}.json'
+        if path.exists() and now - path.stat().st_mtime < settings.EXPLAIN_REFRESH:
+            # Déjà expliquée par un autre worker
+            self.explained[key] = path.stat().st_mtime
+            return
+        self.explained[key] = now
+        try:
+            lines = explain(alias, sql, params)
+        except DatabaseError as e:
+            lines = [f'EXPLAIN impossible : {e}']
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, {
+            'fingerprint': key,
+            'sql': normalized,
+            'vendor': connections[alias].vendor,
+            'view': view,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'explained_at': now,
+            'plan': lines,
+            'flags': plan_flags(lines),
+        })
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        path = explain_dir() / f'stats-{self.pid}-{self.token}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, {'dropped': self.dropped, 'fingerprints': self.stats})
+
+    @staticmethod
+    def _write(path, data):
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(temporary, path)
+
+
+_worker = {'instance': None}
+_worker_lock = threading.Lock()
+
+
+def worker():
+    """Thread de fond du processus, recréé après un fork (workers Gunicorn)."""
+    instance = _worker['instance']
+    if instance is None or instance.pid != os.getpid():
+        with _worker_lock:
+            instance = _worker['instance']
+            if instance is None or instance.pid != os.getpid():
+                instance = _worker['instance'] = _Worker()
+    return instance
+
+
+class _SlowQueryWrapper:
+    """execute_wrapper : ne fait que chronométrer et, au-delà du seuil, déposer dans la file."""
+
+    def __init__(self, request, alias, threshold):
+        self.request = request
+        self.alias = alias
+        self.threshold = threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            if elapsed >= self.threshold and not many and sql.lstrip()[:6].lower().startswith(EXPLAINED_STATEMENTS):
+                worker().submit((self.alias, sql, params, elapsed, self.view()))
+
+    def view(self):
+        # Vue résolue à la demande : seules les requêtes lentes en ont besoin
+        match = self.request.resolver_match
+        return view_label(match.func, self.request.method) if match else 'unknown'
+
+
+class ExplainCaptureMiddleware:
+    """Capture les plans des requêtes SQL lentes (désactivé par défaut : EXPLAIN_CAPTURE_ENABLED)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.EXPLAIN_CAPTURE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.EXPLAIN_THRESHOLD_MS / 1000
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with connection.execute_wrapper(_SlowQueryWrapper(request, connection.alias, self.threshold)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with async_execute_wrapper(_SlowQueryWrapper(request, connection.alias, self.threshold)):
+            return await self.get_response(request)
+
+
+# Lecture des résultats (commande explain_report)
+
+def load_report():
+    """Statistiques de tous les workers, fusionnées par empreinte, avec leur plan."""
+    directory = explain_dir()
+    merged, dropped = {}, 0
+    for path in directory.glob('stats-*.json'):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        dropped += data.get('dropped', 0)
+        for key, stats in data['fingerprints'].items():
+            total = merged.setdefault(
+                key, {'sql': stats['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': {}}
+            )
+            total['count'] += stats['count']
+            total['total_ms'] += stats['total_ms']
+            total['max_ms'] = max(total['max_ms'], stats['max_ms'])
+            for view, count in stats['views'].items():
+                total['views'][view] = total['views'].get(view, 0) + count
+
+    for key, total in merged.items():
+        path = directory / 'plans' / f'{key}.json'
+        try:
+            plan = json.loads(path.read_text())
+        except (OSError, ValueError):
+            plan = {}
+        total.update(fingerprint=key, plan=plan.get('plan', []), flags=plan.get('flags', []))
+    ranked = sorted(merged.values(), key=lambda item: item['total_ms'], reverse=True)
+    return ranked, dropped
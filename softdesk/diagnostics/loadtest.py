@@ -0,0 +1,365 @@
+"""
+Générateur de charge asyncio contre un serveur SoftDesk en marche
+(runserver, Gunicorn ou Uvicorn).
+
+Les utilisateurs se connectent par /softdesk_api/login/, puis un mélange
+pondéré d'opérations est envoyé à débit cible constant (arrivées régulières
+ou de Poisson), quel que soit le temps de réponse du serveur : la latence
+est mesurée depuis l'instant prévu de la requête, et non depuis son envoi,
+pour que l'attente d'une connexion libre soit comptée (pas d'omission
+coordonnée).
+
+Les requêtes passent par httpx.AsyncClient (connexions persistantes, au
+plus --concurrency) : dépendance de développement du Pipfile
+(pipenv install --dev).
+"""
+import asyncio
+import base64
+import json
+import random
+import time
+
+import httpx
+
+from .benchmark import percentile
+
+API = '/softdesk_api'
+LOGIN_PATH = f'{API}/login/'
+OPERATIONS = ('list_projects', 'read_issues', 'post_comment', 'add_contributor')
+DEFAULT_MIX = {'list_projects': 40, 'read_issues': 40, 'post_comment': 15, 'add_contributor': 5}
+# Connexions simultanées : le hachage du mot de passe est coûteux côté serveur
+LOGIN_CONCURRENCY = 8
+# Projets dont les issues sont lues à la connexion de chaque utilisateur
+DISCOVERED_PROJECTS = 3
+
+
+class LoadTestError(Exception):
+    pass
+
+
+class HTTPClient:
+    """
+    Pool d'au plus max_connections connexions persistantes vers base_url ;
+    transport remplace celui de httpx (httpx.MockTransport dans les tests).
+    """
+
+    def __init__(self, base_url, max_connections=50, timeout=10.0, transport=None):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            headers={'User-Agent': 'softdesk-loadtest', 'Accept': 'application/json'},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            # Pas de délai pour obtenir une connexion du pool : l'attente fait partie de la latence mesurée
+            timeout=httpx.Timeout(timeout, pool=None),
+        )
+
+    async def request(self, method, path, data=None, token=None):
+        """Retourne (statut, données JSON décodées ou None)."""
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        response = await self.client.request(method, path, json=data, headers=headers)
+        try:
+            return response.status_code, response.json() if response.content else None
+        except ValueError:
+            return response.status_code, None
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# Utilisateurs et opérations
+
+def _token_user_id(token):
+    """Claim user_id du token d'accès (lu sans vérifier la signature)."""
+    payload = token.split('.')[1]
+    return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))['user_id']
+
+
+def _results(data):
+    """Éléments d'une page de liste (paginée ou non)."""
+    if isinstance(data, dict):
+        return data.get('results') or []
+    return data if isinstance(data, list) else []
+
+
+class Session:
+    """Un utilisateur connecté, et les projets et issues qu'il a découverts."""
+
+    def __init__(self, username, token):
+        self.username = username
+        self.token = token
+        self.user_id = int(_token_user_id(token))
+        self.projects = []
+        self.authored = []
+        self.issues = {}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.throttled = 0
+        self.failures = {}
+
+    def record(self, latency, status=None, failure=None):
+        self.latencies.append(latency)
+        if failure is not None:
+            self.errors += 1
+            self.failures[failure] = self.failures.get(failure, 0) + 1
+            return
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 429:
+            self.throttled += 1
+        elif status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        milliseconds = [latency * 1000 for latency in self.latencies]
+        return {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(milliseconds, 0.50), 2) if count else None,
+            'p95_ms': round(percentile(milliseconds, 0.95), 2) if count else None,
+            'p99_ms': round(percentile(milliseconds, 0.99), 2) if count else None,
+            'max_ms': round(max(milliseconds), 2) if count else None,
+            'error_rate': round(self.errors / count, 4) if count else 0,
+            'throttle_rate': round(self.throttled / count, 4) if count else 0,
+            'statuses': {str(code): number for code, number in sorted(self.statuses.items())},
+            'failures': self.failures,
+        }
+
+
+def parse_mix(text):
+    """'list_projects=40,post_comment=10' -> {'list_projects': 40, 'post_comment': 10}."""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"Opération inconnue : {name} (disponibles : {', '.join(OPERATIONS)}).")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Poids invalide pour {name} : {weight!r}.")
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Le mélange doit contenir au moins une opération de poids positif.")
+    return mix
+
+
+class LoadTest:
+    """
+    Connecte usernames (mot de passe commun), puis envoie rate requêtes par
+    seconde pendant duration secondes, tirées selon mix.
+    """
+
+    def __init__(self, base_url, usernames, password, mix=None, rate=50.0, duration=30.0,
+                 concurrency=50, timeout=10.0, poisson=False, seed=None, progress=None):
+        self.base_url = base_url
+        self.usernames = usernames
+        self.password = password
+        self.mix = mix or DEFAULT_MIX
+        self.rate = rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.poisson = poisson
+        self.rng = random.Random(seed)
+        self.progress = progress
+        self.sessions = []
+        self.login_stats = Stats()
+        self.stats = {name: Stats() for name in self.mix}
+        self.login_elapsed = 0
+        # Arrivées abandonnées (client saturé) et opérations sans utilisateur capable de les faire
+        self.dropped = 0
+        self.skipped = dict.fromkeys(self.mix, 0)
+
+    def run(self):
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        self.client = HTTPClient(self.base_url, self.concurrency, self.timeout)
+        try:
+            await self.login()
+            if not self.sessions:
+                raise LoadTestError(
+                    f"aucun utilisateur n'a pu se connecter (statuts : {self.login_stats.statuses}, "
+                    f"échecs : {self.login_stats.failures})."
+                )
+            await self.discover()
+            elapsed = await self.load()
+        finally:
+            await self.client.close()
+        return self.report(elapsed)
+
+    async def _timed(self, stats, coroutine, started=None):
+        started = time.perf_counter() if started is None else started
+        try:
+            status, data = await coroutine
+        except (httpx.HTTPError, ValueError) as e:
+            stats.record(time.perf_counter() - started, failure=type(e).__name__)
+            return None, None
+        stats.record(time.perf_counter() - started, status)
+        return status, data
+
+    async def login(self):
+        slots = asyncio.Semaphore(LOGIN_CONCURRENCY)
+
+        async def login(username):
+            async with slots:
+                status, data = await self._timed(
+                    self.login_stats,
+                    self.client.request('POST', LOGIN_PATH, {'username': username, 'password': self.password})
+                )
+            if status == 200 and data and 'access' in data:
+                self.sessions.append(Session(username, data['access']))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(username) for username in self.usernames))
+        self.login_elapsed = time.perf_counter() - started
+        if self.progress:
+            self.progress(f"{len(self.sessions)}/{len(self.usernames)} utilisateur(s) connecté(s).")
+
+    async def discover(self):
+        """Projets de chaque utilisateur et issues de quelques-uns d'entre eux (hors mesure)."""
+        async def discover(session):
+            status, data = await self.client.request('GET', f'{API}/projects/', token=session.token)
+            if status != 200:
+                return
+            for project in _results(data):
+                session.projects.append(project['id'])
+                if project.get('author_user') == session.user_id:
+                    session.authored.append(project['id'])
+            for project_id in self.rng.sample(session.projects, min(DISCOVERED_PROJECTS, len(session.projects))):
+                self._remember_issues(session, project_id, *await self.client.request(
+                    'GET', f'{API}/projects/{project_id}/issues/', token=session.token
+                ))
+
+        await asyncio.gather(*(discover(session) for session in self.sessions), return_exceptions=True)
+        if self.progress:
+            self.progress(
+                f"{sum(1 for session in self.sessions if session.projects)} utilisateur(s) contributeur(s), "
+                f"{sum(1 for session in self.sessions if session.authored)} auteur(s) de projet."
+            )
+
+    def _remember_issues(self, session, project_id, status, data):
+        if status == 200:
+            issues = [issue['id'] for issue in _results(data)]
+            if issues:
+                session.issues[project_id] = issues
+
+    # Opérations : chacune retourne la coroutine de sa requête, ou None si l'utilisateur ne peut pas la faire
+
+    def list_projects(self, session):
+        return self.client.request('GET', f'{API}/projects/', token=session.token)
+
+    def read_issues(self, session):
+        if not session.projects:
+            return None
+        project_id = self.rng.choice(session.projects)
+
+        async def read():
+            response = await self.client.request('GET', f'{API}/projects/{project_id}/issues/', token=session.token)
+            self._remember_issues(session, project_id, *response)
+            return response
+        return read()
+
+    def post_comment(self, session):
+        if not session.issues:
+            return None
+        project_id = self.rng.choice(list(session.issues))
+        issue_id = self.rng.choice(session.issues[project_id])
+        return self.client.request(
+            'POST', f'{API}/projects/{project_id}/issues/{issue_id}/comments/',
+            {'description': f"Commentaire de charge {self.rng.randrange(10 ** 9)}"}, session.token
+        )
+
+    def add_contributor(self, session):
+        if not session.authored:
+            return None
+        project_id = self.rng.choice(session.authored)
+        return self.client.request(
+            'POST', f'{API}/projects/{project_id}/contributors/',
+            {'contributors': [self.rng.choice(self.usernames)]}, session.token
+        )
+
+    def _pick(self, operation):
+        """Un utilisateur capable de l'opération (quelques essais, tous n'ont pas de projet)."""
+        for _ in range(20):
+            session = self.rng.choice(self.sessions)
+            request = getattr(self, operation)(session)
+            if request is not None:
+                return request
+        return None
+
+    async def load(self):
+        names = [name for name, weight in self.mix.items() if weight > 0]
+        weights = [self.mix[name] for name in names]
+        pending = set()
+        # Au-delà, le client ne suit plus le débit : les arrivées sont abandonnées et comptées
+        max_pending = self.concurrency * 20
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        scheduled = start
+        arrivals = 0
+        next_report = start + 5
+
+        while scheduled < start + self.duration:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = self.rng.choices(names, weights)[0]
+            if len(pending) >= max_pending:
+                self.dropped += 1
+            else:
+                request = self._pick(operation)
+                if request is None:
+                    self.skipped[operation] += 1
+                else:
+                    # La latence part de l'instant prévu, pas de l'envoi effectif
+                    started = time.perf_counter() - max(0.0, loop.time() - scheduled)
+                    task = asyncio.ensure_future(self._timed(self.stats[operation], request, started))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            arrivals += 1
+            if self.poisson:
+                scheduled += self.rng.expovariate(self.rate)
+            else:
+                # Calculé depuis le début : une somme de 1 / rate dérive et ajoute une arrivée
+                scheduled = start + arrivals / self.rate
+
+            if self.progress and loop.time() >= next_report:
+                next_report += 5
+                done = sum(len(stats.latencies) for stats in self.stats.values())
+                self.progress(
+                    f"{loop.time() - start:.0f} s : {done} requête(s) terminée(s), {len(pending)} en cours."
+                )
+
+        if pending:
+            await asyncio.wait(pending)
+        return loop.time() - start
+
+    def report(self, elapsed):
+        total = Stats()
+        for stats in self.stats.values():
+            total.latencies += stats.latencies
+            total.errors += stats.errors
+            total.throttled += stats.throttled
+            for code, number in stats.statuses.items():
+                total.statuses[code] = total.statuses.get(code, 0) + number
+            for failure, number in stats.failures.items():
+                total.failures[failure] = total.failures.get(failure, 0) + number
+        return {
+            'base_url': self.base_url,
+            'target_rps': self.rate,
+            'duration_s': round(elapsed, 2),
+            'arrivals': 'poisson' if self.poisson else 'uniform',
+            'concurrency': self.concurrency,
+            'users': len(self.usernames),
+            'logged_in': len(self.sessions),
+            'mix': self.mix,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'login': self.login_stats.summary(self.login_elapsed),
+            'total': total.summary(elapsed),
+            'operations': {name: stats.summary(elapsed) for name, stats in self.stats.items()},
+        }
@@ -0,0 +1,92 @@
+"""
+Mesure les endpoints de l'API dans le processus et écrit les résultats en JSON.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from diagnostics.benchmark import DATASET, SCENARIOS, compare, run, select
+from diagnostics.management.commands.benchmark_compare import write_comparison
+
+
+class Command(BaseCommand):
+    help = (
+        "Appelle chaque route de l'API avec le client de test contre une base générée (graine fixe) "
+        "et mesure temps de réponse, nombre de requêtes SQL et temps SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Mesures par scénario (défaut : 20).")
+        parser.add_argument('--warmup', type=int, default=2, help="Itérations non mesurées (défaut : 2).")
+        parser.add_argument('--only', nargs='+', help="Motifs des scénarios à mesurer (ex. 'issues:*').")
+        parser.add_argument('--exclude', nargs='+', help="Motifs des scénarios à ignorer (ex. login).")
+        parser.add_argument('--cold-cache', action='store_true', help="Vide les caches avant chaque itération.")
+        parser.add_argument(
+            '--existing-db',
+            action='store_true',
+            help="Mesure la base courante au lieu d'une base de test générée (écritures annulées)."
+        )
+        for name in ('users', 'projects', 'issues', 'comments', 'seed'):
+            parser.add_argument(
+                f'--{name}', type=int, default=DATASET[name],
+                help=f"Jeu de données généré : {name} (défaut : {DATASET[name]})."
+            )
+        parser.add_argument('--output', help="Fichier JSON des résultats.")
+        parser.add_argument('--compare', help="Résultats de référence (JSON) à comparer à cette mesure.")
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.10,
+            help="Hausse relative d'un percentile comptée comme régression (défaut : 0.10)."
+        )
+        parser.add_argument('--list', action='store_true', help="Liste les scénarios sans les exécuter.")
+
+    def handle(self, *args, **options):
+        scenarios = select(SCENARIOS, options['only'], options['exclude'])
+        if not scenarios:
+            raise CommandError("Aucun scénario ne correspond.")
+        if options['list']:
+            for scenario in scenarios:
+                self.stdout.write(f"{scenario.name:<24} {scenario.method.upper():<6} {scenario.url_name}")
+            return
+
+        dataset = None if options['existing_db'] else {name: options[name] for name in DATASET}
+        self.stdout.write(f"{'scénario':<24} {'p50':>9} {'p90':>9} {'p99':>9} {'requêtes':>9} {'SQL p50':>9}")
+        results = run(
+            scenarios,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            dataset=dataset,
+            cold=options['cold_cache'],
+            progress=self.report,
+        )
+
+        if results['uncovered_routes']:
+            self.stdout.write(self.style.WARNING(
+                "Routes sans scénario : " + ', '.join(results['uncovered_routes'])
+            ))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Résultats écrits dans {options['output']}.")
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = write_comparison(self, *compare(baseline, results, options['threshold']))
+            if regressions:
+                raise CommandError(f"{regressions} régression(s) au-delà du seuil.")
+
+    def report(self, name, result):
+        if 'error' in result or 'skipped' in result:
+            self.stdout.write(self.style.ERROR(f"{name:<24} {result.get('error') or result['skipped']}"))
+            return
+        line = (
+            f"{name:<24} {result['p50_ms']:>7.1f}ms {result['p90_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms "
+            f"{result['queries']:>9} {result['sql_p50_ms']:>7.1f}ms"
+        )
+        if result['unexpected']:
+            line += f"  statuts inattendus : {result['statuses']}"
+            self.stdout.write(self.style.WARNING(line))
+        else:
+            self.stdout.write(line)
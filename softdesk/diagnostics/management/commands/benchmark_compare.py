@@ -0,0 +1,66 @@
+"""
+Compare deux résultats de la commande benchmark.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from diagnostics.benchmark import compare
+
+
+def write_comparison(command, regressions, improvements, missing):
+    """Affiche la comparaison ; retourne le nombre de régressions."""
+    for title, rows, style in (
+        ("Régressions", regressions, command.style.ERROR),
+        ("Améliorations", improvements, command.style.SUCCESS),
+    ):
+        if not rows:
+            continue
+        command.stdout.write(style(f"{title} :"))
+        for row in rows:
+            change = (
+                f"{row['change']:+d}" if row['metric'] == 'queries' else f"{row['change'] * 100:+.1f} %"
+            )
+            command.stdout.write(
+                f"  {row['scenario']:<24} {row['metric']:<8} {row['before']:>10} -> {row['after']:<10} {change}"
+            )
+    if missing:
+        command.stdout.write(command.style.WARNING("Absents d'une des mesures : " + ', '.join(missing)))
+    if not regressions:
+        command.stdout.write(command.style.SUCCESS("Aucune régression."))
+    return len(regressions)
+
+
+class Command(BaseCommand):
+    help = "Compare deux fichiers de résultats de benchmark et signale les régressions au-delà d'un seuil."
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help="Résultats de référence (JSON).")
+        parser.add_argument('current', help="Nouveaux résultats (JSON).")
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.10,
+            help="Hausse relative d'un percentile comptée comme régression (défaut : 0.10)."
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=0.5,
+            help="Écart absolu minimal, en ms, pour compter un changement (défaut : 0.5)."
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        for path in (options['baseline'], options['current']):
+            try:
+                with open(path, encoding='utf-8') as file:
+                    results.append(json.load(file))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Lecture de {path} impossible : {e}")
+
+        regressions = write_comparison(
+            self, *compare(*results, threshold=options['threshold'], min_delta_ms=options['min_delta_ms'])
+        )
+        if regressions:
+            raise CommandError(f"{regressions} régression(s) au-delà du seuil.")
@@ -0,0 +1,58 @@
+"""
+Mesure lectures et écritures simultanées sur SQLite, avant et après le backend config/sqlite.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from diagnostics.concurrency import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Lance des lecteurs et des écrivains de commentaires simultanés sur deux copies de la base : "
+        "backend SQLite par défaut (avant), DATABASES['default'] (après), puis avec la file d'écriture."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help="Threads lecteurs (défaut : 8).")
+        parser.add_argument('--writers', type=int, default=4, help="Threads écrivains (défaut : 4).")
+        parser.add_argument(
+            '--duration', type=float, default=10, help="Durée de chaque mesure en secondes (défaut : 10)."
+        )
+        parser.add_argument('--output', help="Fichier JSON des résultats.")
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] == 0:
+            raise CommandError("Il faut au moins un lecteur ou un écrivain.")
+        if options['duration'] <= 0:
+            raise CommandError("--duration doit être positif.")
+
+        self.stdout.write(
+            f"{'configuration':<14} {'opération':<10} {'ops/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'erreurs':>8}"
+        )
+        try:
+            results = run(options['readers'], options['writers'], options['duration'], progress=self.report)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Résultats écrits dans {options['output']}.")
+
+    def report(self, name, result):
+        for kind, label in (('read', 'lecture'), ('write', 'écriture')):
+            if kind not in result:
+                continue
+            stats = result[kind]
+            latencies = ' '.join(
+                f"{stats[key]:>7.1f}ms" if stats[key] is not None else f"{'-':>9}"
+                for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            )
+            line = f"{name:<14} {label:<10} {stats['per_second']:>8.1f} {latencies} {stats['errors']:>8}"
+            if stats.get('batch_mean'):
+                line += f"  {stats['batch_mean']} écritures par transaction"
+            self.stdout.write(self.style.WARNING(line) if stats['errors'] else line)
+            for message, count in stats['error_messages'].items():
+                self.stdout.write(f"{'':<25}{count} × {message}")
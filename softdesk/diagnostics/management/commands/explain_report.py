@@ -0,0 +1,54 @@
+"""
+Classe les requêtes SQL lentes capturées par diagnostics/explain.py.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from diagnostics.explain import explain_dir, load_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Classe les empreintes de requêtes SQL lentes par temps total, avec leurs vues d'origine "
+        "et leur plan d'exécution, et signale les parcours complets de table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help="Nombre d'empreintes affichées (défaut : 20).")
+        parser.add_argument('--full-scans', action='store_true', help="Seulement les plans avec un parcours complet.")
+        parser.add_argument('--plans', action='store_true', help="Affiche le plan de chaque empreinte.")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    def handle(self, *args, **options):
+        ranked, dropped = load_report()
+        if options['full_scans']:
+            ranked = [item for item in ranked if any(flag.startswith('full_scan') for flag in item['flags'])]
+        ranked = ranked[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'dropped': dropped, 'fingerprints': ranked}, indent=2, ensure_ascii=False))
+            return
+        if not ranked:
+            self.stdout.write(f"Aucune requête lente capturée dans {explain_dir()}.")
+            return
+
+        for rank, item in enumerate(ranked, 1):
+            views = ', '.join(
+                f'{view} ({count})' for view, count in sorted(item['views'].items(), key=lambda v: v[1], reverse=True)
+            )
+            header = (
+                f"{rank:>3}. {item['fingerprint']}  total {item['total_ms']:.1f} ms, "
+                f"{item['count']} exécution(s), moyenne {item['total_ms'] / item['count']:.1f} ms, "
+                f"max {item['max_ms']:.1f} ms"
+            )
+            self.stdout.write(self.style.ERROR(header) if item['flags'] else header)
+            if item['flags']:
+                self.stdout.write(self.style.WARNING(f"     {', '.join(item['flags'])}"))
+            self.stdout.write(f"     vues : {views}")
+            self.stdout.write(f"     {item['sql'][:300]}")
+            if options['plans']:
+                for line in item['plan'] or ["(plan pas encore capturé)"]:
+                    self.stdout.write(f"       {line}")
+        if dropped:
+            self.stdout.write(self.style.WARNING(f"{dropped} requête(s) lente(s) perdue(s) : file pleine."))
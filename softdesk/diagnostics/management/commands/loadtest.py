@@ -0,0 +1,122 @@
+"""
+Envoie une charge HTTP réaliste à un serveur SoftDesk en marche.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from diagnostics.loadtest import DEFAULT_MIX, OPERATIONS, LoadTest, LoadTestError, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Connecte de nombreux utilisateurs par /softdesk_api/login/ puis envoie, à débit cible, un mélange "
+        "pondéré de requêtes (liste des projets, lecture d'issues, commentaires, ajout de contributeurs) "
+        "à un serveur en marche (runserver, Gunicorn, Uvicorn)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_url',
+            nargs='?',
+            default='http://127.0.0.1:8000',
+            help="Adresse du serveur (défaut : http://127.0.0.1:8000)."
+        )
+        parser.add_argument('--users', type=int, default=50, help="Nombre d'utilisateurs connectés (défaut : 50).")
+        parser.add_argument(
+            '--user-prefix',
+            default='gen',
+            help="Préfixe des usernames, comme generate_dataset (défaut : gen, soit gen0, gen1...)."
+        )
+        parser.add_argument('--usernames-file', help="Fichier d'usernames, un par ligne (remplace --user-prefix).")
+        parser.add_argument('--password', default='password', help="Mot de passe commun (défaut : password).")
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help=f"Poids des opérations ({', '.join(OPERATIONS)}), ex. list_projects=40,post_comment=10."
+        )
+        parser.add_argument('--rate', type=float, default=50, help="Requêtes par seconde visées (défaut : 50).")
+        parser.add_argument(
+            '--duration', type=float, default=30, help="Durée de la charge en secondes (défaut : 30)."
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help="Connexions simultanées au plus (défaut : 50)."
+        )
+        parser.add_argument('--timeout', type=float, default=10, help="Délai maximal d'une requête, en secondes.")
+        parser.add_argument(
+            '--poisson', action='store_true', help="Arrivées de Poisson au lieu d'arrivées régulières."
+        )
+        parser.add_argument('--seed', type=int, help="Graine des tirages (opérations, utilisateurs, cibles).")
+        parser.add_argument('--output', help="Fichier JSON du rapport.")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['rate'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--rate et --duration doivent être positifs.")
+
+        if options['usernames_file']:
+            with open(options['usernames_file'], encoding='utf-8') as file:
+                usernames = [line.strip() for line in file if line.strip()][:options['users']]
+        else:
+            usernames = [f"{options['user_prefix']}{number}" for number in range(options['users'])]
+
+        load = LoadTest(
+            options['base_url'],
+            usernames,
+            options['password'],
+            mix=mix,
+            rate=options['rate'],
+            duration=options['duration'],
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+            poisson=options['poisson'],
+            seed=options['seed'],
+            progress=self.stdout.write,
+        )
+        try:
+            report = load.run()
+        except (LoadTestError, OSError) as e:
+            raise CommandError(f"{options['base_url']} : {e}")
+
+        self.write_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Rapport écrit dans {options['output']}.")
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"\n{'opération':<18} {'requêtes':>9} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} "
+            f"{'erreurs':>8} {'429':>7}"
+        )
+        rows = [('login', report['login']), *report['operations'].items(), ('total', report['total'])]
+        for name, summary in rows:
+            if not summary['requests']:
+                self.stdout.write(f"{name:<18} {0:>9}")
+                continue
+            self.stdout.write(
+                f"{name:<18} {summary['requests']:>9} {summary['throughput_rps']:>8.1f} "
+                f"{summary['p50_ms']:>7.1f}ms {summary['p95_ms']:>7.1f}ms {summary['p99_ms']:>7.1f}ms "
+                f"{summary['error_rate']:>8.1%} {summary['throttle_rate']:>7.1%}"
+            )
+
+        total = report['total']
+        self.stdout.write(
+            f"\nDébit : {total['throughput_rps']} req/s pour {report['target_rps']} visées, "
+            f"statuts : {total['statuses']}"
+        )
+        if total['failures']:
+            self.stdout.write(self.style.ERROR(f"Échecs réseau : {total['failures']}"))
+        if report['dropped']:
+            self.stdout.write(self.style.WARNING(
+                f"{report['dropped']} arrivée(s) abandonnée(s) : le serveur ne suit pas le débit visé."
+            ))
+        skipped = {name: number for name, number in report['skipped'].items() if number}
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Opérations sans utilisateur capable de les faire : {skipped}"))
@@ -0,0 +1,34 @@
+"""
+Affiche un en-tête signé qui déclenche le profilage d'une requête.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from diagnostics import memory, profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche l'en-tête X-Softdesk-Profile à joindre à une requête pour la profiler "
+        "(PROFILING_ENABLED doit être actif sur le serveur), ou avec --memory l'en-tête "
+        "X-Softdesk-Memory qui trace ses allocations (MEMORY_PROFILING_ENABLED)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--memory', action='store_true', help="En-tête de la trace mémoire (tracemalloc).")
+
+    def handle(self, *args, **options):
+        if options['memory']:
+            header, token, enabled, setting, reports = (
+                memory.HEADER, memory.make_token(), settings.MEMORY_PROFILING_ENABLED,
+                'MEMORY_PROFILING_ENABLED', "Rapports : GET /softdesk_api/memory/ (admin)."
+            )
+        else:
+            header, token, enabled, setting, reports = (
+                profiling.HEADER, profiling.make_token(), settings.PROFILING_ENABLED,
+                'PROFILING_ENABLED', "Profils : GET /softdesk_api/profiles/ (admin)."
+            )
+        self.stdout.write(f"{header}: {token}")
+        self.stdout.write(f"Valable {settings.PROFILING_TOKEN_MAX_AGE} s. {reports}")
+        if not enabled:
+            self.stdout.write(self.style.WARNING(f"{setting} est désactivé : l'en-tête sera ignoré."))
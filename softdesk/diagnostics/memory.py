@@ -0,0 +1,248 @@
+"""
+Mémoire allouée par requête, mesurée par tracemalloc.
+
+MemoryProfilingMiddleware (désactivé par défaut : MEMORY_PROFILING_ENABLED)
+trace une fraction MEMORY_SAMPLE_RATE des requêtes des vues de
+MEMORY_ROUTES (motifs « Vue.action », comme PROFILING_ROUTES), et toute
+requête portant l'en-tête X-Softdesk-Memory signé (profile_token --memory).
+tracemalloc n'est actif que pendant une requête tracée, et une seule à la
+fois par processus. Il compte les allocations de tous les threads : si
+d'autres requêtes du processus sont en cours pendant la trace (worker à
+plusieurs threads, ASGI), le rapport est marqué approximate.
+
+Pour chaque requête tracée, un rapport JSON donne le pic d'allocation,
+la mémoire encore allouée à la fin, et la répartition par couche (champs,
+serializers, ORM, rendu, vues) et par ligne de l'instantané pris juste
+avant le rendu, quand les données sérialisées sont toutes en mémoire.
+L'instantané est gardé (fichier .tracemalloc) pour comparer deux requêtes.
+Au-delà de MEMORY_MAX_BYTES, les fichiers les plus anciens sont supprimés.
+"""
+import json
+import linecache
+import os
+import re
+import threading
+import tracemalloc
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import sampling
+from .sampling import InFlightRequests, SampledRequestMiddleware, rotate
+
+HEADER = 'X-Softdesk-Memory'
+SIGNING_SALT = 'softdesk.memory'
+
+# 20261018T101500123456-4242
+NAME_PATTERN = re.compile(r'^\d{8}T\d{12}-\d+$')
+# Couche d'une allocation : celle du premier fichier reconnu, en partant du plus récent
+LAYERS = (
+    ('field', ('rest_framework/fields.py', 'rest_framework/relations.py')),
+    ('serializer', ('serializers.py', 'rest_framework/utils/serializer_helpers.py')),
+    ('renderer', ('rest_framework/renderers.py', '/json/')),
+    ('orm', ('django/db/',)),
+    ('view', ('/projects/', '/users/', '/config/', 'rest_framework/')),
+)
+TOP_LINES = 20
+
+_tracing = threading.Lock()
+# Requêtes en cours dans le processus, et la trace en cours
+_in_flight = InFlightRequests()
+
+
+def make_token():
+    """Valeur de l'en-tête X-Softdesk-Memory, signée par SECRET_KEY."""
+    return sampling.make_token(SIGNING_SALT)
+
+
+def memory_dir():
+    return Path(settings.MEMORY_DIR)
+
+
+def _layer(traceback):
+    for frame in reversed(traceback):
+        filename = frame.filename.replace(os.sep, '/')
+        for layer, markers in LAYERS:
+            if any(marker in filename for marker in markers):
+                return layer
+    return 'other'
+
+
+def _clean(snapshot):
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ])
+
+
+def _line(frame):
+    return {
+        'file': frame.filename,
+        'line': frame.lineno,
+        'code': linecache.getline(frame.filename, frame.lineno).strip(),
+    }
+
+
+def analyse(snapshot, limit=TOP_LINES):
+    """Répartition d'un instantané par couche et par ligne."""
+    layers = {}
+    for trace in snapshot.traces:
+        layer = _layer(trace.traceback)
+        layers[layer] = layers.get(layer, 0) + trace.size
+    return {
+        'total_bytes': sum(layers.values()),
+        'layers': dict(sorted(layers.items(), key=lambda item: item[1], reverse=True)),
+        'top_lines': [
+            {**_line(stat.traceback[-1]), 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:limit]
+        ],
+    }
+
+
+def list_reports():
+    """Rapports, du plus récent au plus ancien (sans le détail des instantanés)."""
+    directory = memory_dir()
+    if not directory.is_dir():
+        return []
+    reports = []
+    for path in sorted(directory.glob('*.json'), reverse=True):
+        try:
+            report = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        report.pop('before_render', None)
+        report.pop('end', None)
+        reports.append(report)
+    return reports
+
+
+def route_stats(reports):
+    """Pic d'allocation par vue : nombre d'échantillons, maximum et moyenne."""
+    stats = {}
+    for report in reports:
+        route = stats.setdefault(report['view'], {
+            'samples': 0, 'approximate': 0, 'peak_max': 0, 'peak_total': 0, 'retained_total': 0,
+        })
+        route['samples'] += 1
+        route['approximate'] += bool(report.get('approximate'))
+        route['peak_max'] = max(route['peak_max'], report['peak_bytes'])
+        route['peak_total'] += report['peak_bytes']
+        route['retained_total'] += report['retained_bytes']
+    return {
+        view: {
+            'samples': route['samples'],
+            'approximate_samples': route['approximate'],
+            'peak_max_bytes': route['peak_max'],
+            'peak_mean_bytes': route['peak_total'] // route['samples'],
+            'retained_mean_bytes': route['retained_total'] // route['samples'],
+        }
+        for view, route in sorted(stats.items(), key=lambda item: item[1]['peak_max'], reverse=True)
+    }
+
+
+def report_path(name, suffix='.json'):
+    """Chemin d'un rapport (ou de son instantané), ou None : seuls les noms produits ici sont acceptés."""
+    if not NAME_PATTERN.match(name):
+        return None
+    path = memory_dir() / f'{name}{suffix}'
+    return path if path.is_file() else None
+
+
+def compare(name, other, limit=TOP_LINES):
+    """Écarts par ligne entre les instantanés de deux rapports (other moins name)."""
+    paths = [report_path(name, '.tracemalloc'), report_path(other, '.tracemalloc')]
+    if None in paths:
+        return None
+    before, after = (tracemalloc.Snapshot.load(str(path)) for path in paths)
+    return [
+        {**_line(stat.traceback[-1]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff, 'size': stat.size}
+        for stat in after.compare_to(before, 'lineno')[:limit]
+    ]
+
+
+class Trace:
+    """Trace d'une requête ; approximate : d'autres requêtes ont alloué en même temps."""
+
+    def __init__(self, view):
+        self.view = view
+        self.approximate = False
+        self.before_render = None
+
+
+class MemoryProfilingMiddleware(SampledRequestMiddleware):
+    """Trace les allocations des requêtes choisies, de la vue jusqu'à la réponse rendue."""
+    header = HEADER
+    salt = SIGNING_SALT
+    state_attribute = '_memory_trace'
+    in_flight = _in_flight
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response, settings.MEMORY_SAMPLE_RATE, settings.MEMORY_ROUTES)
+        self.frames = settings.MEMORY_TRACE_FRAMES
+        self.directory = memory_dir()
+        self.max_bytes = settings.MEMORY_MAX_BYTES
+        if iscoroutinefunction(self):
+            self.process_template_response = self.aprocess_template_response
+
+    def start(self, request, label):
+        # tracemalloc est global au processus : une requête tracée à la fois, et pas s'il est déjà actif
+        if tracemalloc.is_tracing() or not _tracing.acquire(blocking=False):
+            return None
+        trace = Trace(label)
+        self.in_flight.observe(trace)
+        tracemalloc.start(self.frames)
+        return trace
+
+    def finish(self, trace, request, response, duration):
+        try:
+            self.save(trace, request, response, duration)
+        finally:
+            tracemalloc.stop()
+            self.in_flight.release()
+            _tracing.release()
+
+    def snapshot_before_render(self, request):
+        # Réponse DRF avant rendu : les données sérialisées sont en mémoire
+        trace = getattr(request, self.state_attribute, None)
+        if trace is not None:
+            trace.before_render = _clean(tracemalloc.take_snapshot())
+
+    def process_template_response(self, request, response):
+        self.snapshot_before_render(request)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        self.snapshot_before_render(request)
+        return response
+
+    def save(self, trace, request, response, duration):
+        _, peak = tracemalloc.get_traced_memory()
+        end = _clean(tracemalloc.take_snapshot())
+        snapshot = trace.before_render or end
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        created_at = datetime.now(dt_timezone.utc)
+        name = f'{created_at:%Y%m%dT%H%M%S%f}-{os.getpid()}'
+        report = {
+            'name': name,
+            'view': trace.view,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'created_at': created_at.isoformat(),
+            'approximate': trace.approximate,
+            'peak_bytes': peak,
+            'retained_bytes': sum(item.size for item in end.traces),
+            'before_render': analyse(trace.before_render) if trace.before_render else None,
+            'end': analyse(end),
+        }
+        snapshot.dump(str(self.directory / f'{name}.tracemalloc'))
+        (self.directory / f'{name}.json').write_text(json.dumps(report))
+        rotate(self.directory, self.max_bytes, '*.*')
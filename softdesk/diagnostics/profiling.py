@@ -0,0 +1,174 @@
+"""
+Profilage cProfile de requêtes de production, à la demande.
+
+ProfilingMiddleware (désactivé par défaut : PROFILING_ENABLED) profile :
+- une fraction PROFILING_SAMPLE_RATE des requêtes des vues de
+  PROFILING_ROUTES (motifs « Vue.action », ex. IssueViewSet.retrieve ;
+  vide, toutes les vues) ;
+- toute requête portant l'en-tête X-Softdesk-Profile signé (commande
+  profile_token), valable PROFILING_TOKEN_MAX_AGE secondes.
+
+Chaque profil est écrit dans PROFILING_DIR (fichier .pstats, lisible par
+pstats ou snakeviz) ; les plus anciens sont supprimés au-delà de
+PROFILING_MAX_BYTES. Les administrateurs les listent et les téléchargent
+par /softdesk_api/profiles/.
+
+Depuis Python 3.12 (version du Pipfile), cProfile repose sur
+sys.monitoring : un seul profileur à la fois par processus, et il
+enregistre les appels de tous les threads. Un profil contient donc aussi
+les frames des requêtes traitées en même temps par le processus (threads
+de runserver, Gunicorn gthread, ASGI) : il est alors marqué approximate,
+dans son nom (suffixe -approximate) et dans la liste. Seuls les profils
+non approximatifs donnent les frames de la seule requête profilée.
+
+Avant Python 3.12, cProfile ne suit que le thread où il est activé : sous
+ASGI, une vue synchrone est donc profilée dans le thread où sync_to_async
+l'exécute, une vue async dans la boucle d'événements.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import sampling
+from .sampling import InFlightRequests, SampledRequestMiddleware, rotate
+
+HEADER = 'X-Softdesk-Profile'
+SIGNING_SALT = 'softdesk.profiling'
+# 20261018T101500123456-IssueViewSet.retrieve-GET-200-152ms-4242[-approximate].pstats
+NAME_PATTERN = re.compile(
+    r'^(?P<created_at>\d{8}T\d{12})-(?P<view>[\w.*]+)-(?P<method>[A-Z]+)-(?P<status>\d{3})'
+    r'-(?P<duration_ms>\d+)ms-(?P<pid>\d+)(?P<approximate>-approximate)?\.pstats$'
+)
+
+
+def make_token():
+    """Valeur de l'en-tête X-Softdesk-Profile, signée par SECRET_KEY."""
+    return sampling.make_token(SIGNING_SALT)
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def list_profiles():
+    """Profils, du plus récent au plus ancien, avec les informations de leur nom."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.glob('*.pstats'):
+        match = NAME_PATTERN.match(path.name)
+        if not match:
+            continue
+        info = match.groupdict()
+        profiles.append({
+            'name': path.name,
+            'view': info['view'],
+            'method': info['method'],
+            'status': int(info['status']),
+            'duration_ms': int(info['duration_ms']),
+            'approximate': bool(info['approximate']),
+            'created_at': datetime.strptime(info['created_at'], '%Y%m%dT%H%M%S%f').replace(tzinfo=dt_timezone.utc),
+            'size': path.stat().st_size,
+        })
+    return sorted(profiles, key=lambda profile: profile['name'], reverse=True)
+
+
+def profile_path(name):
+    """Chemin du profil name, ou None : seuls les noms produits par le middleware sont acceptés."""
+    if not NAME_PATTERN.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def top_functions(path, limit=30):
+    """Fonctions les plus coûteuses (temps cumulé) d'un profil."""
+    stats = pstats.Stats(str(path), stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': function,
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class Profile:
+    """
+    Profil d'une requête ; in_thread : profileur actif dans le thread de
+    sync_to_async (ASGI) ; approximate : d'autres requêtes du processus ont
+    été traitées en même temps.
+    """
+
+    def __init__(self, profiler, view, in_thread=False):
+        self.profiler = profiler
+        self.view = view
+        self.in_thread = in_thread
+        self.approximate = False
+
+
+class ProfilingMiddleware(SampledRequestMiddleware):
+    """Profile les requêtes choisies, de la vue jusqu'à la réponse rendue."""
+    header = HEADER
+    salt = SIGNING_SALT
+    state_attribute = '_profile'
+    in_flight = InFlightRequests()
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response, settings.PROFILING_SAMPLE_RATE, settings.PROFILING_ROUTES)
+        self.directory = profile_dir()
+        self.max_bytes = settings.PROFILING_MAX_BYTES
+
+    def start(self, request, label, in_thread=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Un autre profileur est actif (Python 3.12+ n'en permet qu'un par processus)
+            return None
+        profile = Profile(profiler, label, in_thread)
+        self.in_flight.observe(profile)
+        return profile
+
+    async def astart(self, request, label, view_func):
+        # Avant Python 3.12, cProfile ne suit que le thread où il est activé : celui qui exécute la vue
+        if iscoroutinefunction(view_func):
+            return self.start(request, label)
+        return await sync_to_async(self.start)(request, label, in_thread=True)
+
+    def finish(self, profile, request, response, duration):
+        profile.profiler.disable()
+        self.in_flight.release()
+        self.save(profile, request, response, duration)
+
+    async def afinish(self, profile, request, response, duration):
+        if profile.in_thread:
+            await sync_to_async(self.finish)(profile, request, response, duration)
+        else:
+            self.finish(profile, request, response, duration)
+
+    def save(self, profile, request, response, duration):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = (
+            f"{datetime.now(dt_timezone.utc):%Y%m%dT%H%M%S%f}-{profile.view}-{request.method}"
+            f"-{response.status_code}-{round(duration * 1000)}ms-{os.getpid()}"
+            f"{'-approximate' if profile.approximate else ''}.pstats"
+        )
+        profile.profiler.dump_stats(self.directory / name)
+        rotate(self.directory, self.max_bytes, '*.pstats')
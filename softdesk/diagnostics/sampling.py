@@ -0,0 +1,199 @@
+"""
+Choix des requêtes observées par les middlewares de diagnostic
+(diagnostics/profiling.py, diagnostics/memory.py).
+
+SampledRequestMiddleware observe une fraction sample_rate des requêtes des
+vues de routes (motifs « Vue.action », ex. IssueViewSet.retrieve ; vide,
+toutes les vues), et toute requête portant son en-tête signé (commande
+profile_token), valable PROFILING_TOKEN_MAX_AGE secondes. Ses sous-classes
+démarrent l'observation dans start() et l'enregistrent dans finish().
+
+Sous ASGI, le middleware est async, comme config/timing.py : process_view
+s'exécute dans la boucle d'événements, sans passer par un thread.
+
+Une observation globale au processus (tracemalloc, cProfile) voit aussi les
+autres requêtes en cours : avec in_flight (InFlightRequests), elle est
+marquée approximate si une autre requête est en cours pendant qu'elle dure.
+"""
+import fnmatch
+import random
+import threading
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+
+
+def make_token(salt):
+    """Valeur d'un en-tête de diagnostic, signée par SECRET_KEY."""
+    return signing.TimestampSigner(salt=salt).sign('sample')
+
+
+def valid_token(value, salt):
+    try:
+        signing.TimestampSigner(salt=salt).unsign(value, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def view_label(view_func, method):
+    """« ViewSet.action » pour un viewset DRF, nom de la classe ou de la fonction sinon."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'view')
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def route_matches(label, patterns):
+    """Vrai si label (« Vue.action ») correspond à l'un des motifs, ou s'il n'y a aucun motif."""
+    return not patterns or any(fnmatch.fnmatchcase(label, pattern) for pattern in patterns)
+
+
+def rotate(directory, max_bytes, pattern='*'):
+    """Supprime les fichiers pattern les plus anciens au-delà de max_bytes au total."""
+    files = []
+    for path in directory.glob(pattern):
+        try:
+            files.append((path.stat(), path))
+        except FileNotFoundError:
+            continue
+    total = sum(stat.st_size for stat, _ in files)
+    for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= stat.st_size
+
+
+class InFlightRequests:
+    """
+    Requêtes en cours dans le processus, et l'observation en cours : celle-ci
+    est marquée approximate si d'autres requêtes sont en cours quand elle
+    commence, ou si une autre requête commence pendant qu'elle dure.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._current = None
+
+    def enter(self):
+        with self._lock:
+            self._count += 1
+            if self._current is not None:
+                self._current.approximate = True
+
+    def leave(self):
+        with self._lock:
+            self._count -= 1
+
+    def observe(self, state):
+        """Fait de state (attribut approximate) l'observation en cours."""
+        with self._lock:
+            state.approximate = self._count > 1
+            self._current = state
+
+    def release(self):
+        with self._lock:
+            self._current = None
+
+
+class SampledRequestMiddleware:
+    """
+    Observe les requêtes choisies, de la vue jusqu'à la réponse rendue. À
+    placer en fin de MIDDLEWARE : la vue n'est connue qu'après la résolution
+    de l'URL (process_view).
+
+    start(request, label) retourne l'état de l'observation, ou None pour y
+    renoncer ; finish(state, request, response, duration) l'enregistre.
+    """
+    sync_capable = True
+    async_capable = True
+    # En-tête signé qui force l'observation, et le sel de sa signature
+    header = None
+    salt = None
+    # Attribut de la requête qui porte l'état de l'observation
+    state_attribute = None
+    # InFlightRequests des observations globales au processus, ou None
+    in_flight = None
+
+    def __init__(self, get_response, sample_rate, routes):
+        self.get_response = get_response
+        self.sample_rate = sample_rate
+        self.routes = list(routes)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.in_flight is not None:
+            self.in_flight.enter()
+        try:
+            started = perf_counter()
+            response = self.get_response(request)
+            state = request.__dict__.pop(self.state_attribute, None)
+            if state is not None:
+                self.finish(state, request, response, perf_counter() - started)
+            return response
+        finally:
+            if self.in_flight is not None:
+                self.in_flight.leave()
+
+    async def __acall__(self, request):
+        if self.in_flight is not None:
+            self.in_flight.enter()
+        try:
+            started = perf_counter()
+            response = await self.get_response(request)
+            state = request.__dict__.pop(self.state_attribute, None)
+            if state is not None:
+                await self.afinish(state, request, response, perf_counter() - started)
+            return response
+        finally:
+            if self.in_flight is not None:
+                self.in_flight.leave()
+
+    def wanted(self, request, label):
+        token = request.headers.get(self.header)
+        if token:
+            return valid_token(token, self.salt)
+        if not route_matches(label, self.routes):
+            return False
+        return random.random() < self.sample_rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        label = view_label(view_func, request.method)
+        if self.wanted(request, label):
+            state = self.start(request, label)
+            if state is not None:
+                setattr(request, self.state_attribute, state)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        label = view_label(view_func, request.method)
+        if self.wanted(request, label):
+            state = await self.astart(request, label, view_func)
+            if state is not None:
+                setattr(request, self.state_attribute, state)
+        return None
+
+    def start(self, request, label):
+        raise NotImplementedError
+
+    async def astart(self, request, label, view_func):
+        return self.start(request, label)
+
+    def finish(self, state, request, response, duration):
+        raise NotImplementedError
+
+    async def afinish(self, state, request, response, duration):
+        self.finish(state, request, response, duration)
@@ -0,0 +1,429 @@
+"""
+Tests des outils de diagnostic.
+"""
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from projects.models import Issue
+from projects.tests import TEST_CACHES, SoftDeskAPITestCase
+from . import benchmark, loadtest, memory, profiling
+from .explain import explain, normalize, plan_flags
+from .sampling import InFlightRequests, rotate
+
+
+class NormalizeTests(SimpleTestCase):
+    """Empreinte des requêtes lentes : littéraux et listes IN remplacés (diagnostics/explain.py)."""
+
+    def test_replaces_literals_and_in_lists(self):
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'l''issue' AND n = 5"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? AND n = ?",
+        )
+
+    def test_in_lists_of_any_length_share_a_fingerprint(self):
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (%s)'), normalize('SELECT * FROM t WHERE id IN (%s, %s)')
+        )
+
+    def test_collapses_whitespace(self):
+        self.assertEqual(normalize('  SELECT *\n  FROM t\tWHERE n = 1.5 '), 'SELECT * FROM t WHERE n = ?')
+
+
+class PlanFlagsTests(TestCase):
+    """Parcours complets et tris temporaires des plans SQLite."""
+
+    def test_scan_without_index_is_a_full_scan(self):
+        self.assertEqual(plan_flags(['SCAN projects_issue']), ['full_scan:projects_issue'])
+
+    def test_scan_using_index_is_not_a_full_scan(self):
+        self.assertEqual(plan_flags(['SCAN projects_issue USING INDEX issue_project_created_idx']), [])
+        self.assertEqual(plan_flags(['  SCAN projects_issue USING COVERING INDEX issue_project_created_idx']), [])
+
+    def test_temp_sort(self):
+        self.assertEqual(
+            plan_flags(['SCAN projects_comment', 'USE TEMP B-TREE FOR ORDER BY']),
+            ['full_scan:projects_comment', 'temp_sort'],
+        )
+
+    def test_sqlite_plans(self):
+        queryset = Issue.objects.order_by()
+        sql, params = queryset.query.sql_with_params()
+        self.assertEqual(plan_flags(explain(DEFAULT_DB_ALIAS, sql, params)), ['full_scan:projects_issue'])
+
+        sql, params = queryset.filter(project_id=1).query.sql_with_params()
+        self.assertEqual(plan_flags(explain(DEFAULT_DB_ALIAS, sql, params)), [])
+
+        # Liste d'issues d'un projet : l'index issue_project_created_idx évite le tri
+        sql, params = Issue.objects.filter(project_id=1).query.sql_with_params()
+        self.assertEqual(plan_flags(explain(DEFAULT_DB_ALIAS, sql, params)), [])
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkTests(TestCase):
+    """Banc de mesure des endpoints (diagnostics/benchmark.py)."""
+
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(benchmark.uncovered_routes(), [])
+
+    def test_scenarios_answer_as_expected(self):
+        benchmark.seed_database({'users': 6, 'projects': 2, 'issues': 8, 'comments': 16, 'seed': 1})
+        fixtures = benchmark.load_fixtures()
+        client = Client()
+        with benchmark.unthrottled():
+            for scenario in benchmark.SCENARIOS:
+                with self.subTest(scenario.name):
+                    result = benchmark.measure(client, scenario, fixtures, iterations=1, warmup=0)
+                    self.assertNotIn('skipped', result)
+                    self.assertEqual(result['unexpected'], 0, result)
+                    self.assertGreater(result['queries'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.9), 7)
+        self.assertIsNone(benchmark.percentile([], 0.5))
+
+    def test_compare(self):
+        def results(p50, queries):
+            return {'scenarios': {'issues:list': {'p50_ms': p50, 'p90_ms': p50, 'queries': queries}}}
+
+        regressions, improvements, missing = benchmark.compare(results(10.0, 3), results(12.0, 4))
+        self.assertEqual([row['metric'] for row in regressions], ['p50_ms', 'p90_ms', 'queries'])
+        self.assertEqual((improvements, missing), ([], []))
+
+        # Sous min_delta_ms, l'écart est du bruit
+        self.assertEqual(benchmark.compare(results(1.0, 3), results(1.3, 3)), ([], [], []))
+
+        regressions, improvements, missing = benchmark.compare(results(10.0, 3), {'scenarios': {}})
+        self.assertEqual((regressions, improvements, missing), ([], [], ['issues:list']))
+
+
+class DiagnosticsTestCase(SoftDeskAPITestCase):
+    """Middleware de diagnostic activé par enabled_settings(directory), qui écrit dans un dossier temporaire."""
+
+    def enabled_settings(self, directory):
+        raise NotImplementedError
+
+    def setUp(self):
+        # Réglages en place avant la première requête : le client charge alors les middlewares
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Sous-dossier : le dossier parent reçoit les fichiers hors du dossier de diagnostic
+        self.directory = Path(directory.name) / 'diagnostics'
+        self.configure(**self.enabled_settings(str(self.directory)))
+        super().setUp()
+
+    def configure(self, **settings):
+        """Nouveaux réglages, et un client neuf pour que le middleware les relise."""
+        settings_override = override_settings(**settings)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = self.client_class()
+
+
+class ProfilingTests(DiagnosticsTestCase):
+    """Profilage cProfile des requêtes choisies (diagnostics/profiling.py)."""
+
+    def enabled_settings(self, directory):
+        return {
+            'PROFILING_ENABLED': True, 'PROFILING_DIR': directory,
+            'PROFILING_SAMPLE_RATE': 1.0, 'PROFILING_ROUTES': ['IssueViewSet.list'],
+        }
+
+    def profiles(self):
+        return sorted(path.name for path in self.directory.glob('*.pstats'))
+
+    def test_samples_requests_of_the_routes(self):
+        self.request('get', self.url)
+        self.assertEqual(self.profiles(), [])
+        self.request('get', self.url + 'issues/')
+        [name] = self.profiles()
+        match = profiling.NAME_PATTERN.match(name)
+        self.assertEqual((match['view'], match['method'], match['status']), ('IssueViewSet.list', 'GET', '200'))
+
+    def test_sample_rate(self):
+        self.configure(PROFILING_SAMPLE_RATE=0.0)
+        self.request('get', self.url + 'issues/')
+        self.assertEqual(self.profiles(), [])
+
+    def test_signed_token_forces_a_profile(self):
+        self.configure(PROFILING_SAMPLE_RATE=0.0, PROFILING_ROUTES=['IssueViewSet.list'])
+        self.request('get', self.url, HTTP_X_SOFTDESK_PROFILE=profiling.make_token())
+        [name] = self.profiles()
+        self.assertIn('-ProjectViewSet.retrieve-GET-200-', name)
+
+    def test_forged_or_expired_token_is_ignored(self):
+        self.configure(PROFILING_SAMPLE_RATE=0.0)
+        self.request('get', self.url, HTTP_X_SOFTDESK_PROFILE='sample:forged:signature')
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 7200):
+            expired = profiling.make_token()
+        self.request('get', self.url, HTTP_X_SOFTDESK_PROFILE=expired)
+        self.assertEqual(self.profiles(), [])
+
+    def test_profile_path_only_accepts_profile_names(self):
+        self.request('get', self.url + 'issues/')
+        [name] = self.profiles()
+        self.assertEqual(profiling.profile_path(name), self.directory / name)
+        (self.directory.parent / 'secret.pstats').touch()
+        for forged in ('../secret.pstats', 'secret.pstats', name.replace('.pstats', '.txt'), f'x/{name}'):
+            self.assertIsNone(profiling.profile_path(forged), forged)
+
+    def test_views_are_reserved_to_admins(self):
+        self.request('get', self.url + 'issues/')
+        [name] = self.profiles()
+        url = f'/softdesk_api/profiles/{name}/'
+        for path in ('/softdesk_api/profiles/', url, url + '?top=5'):
+            self.assertEqual(self.request('get', path, user=self.bob).status_code, 403, path)
+
+        response = self.request('get', '/softdesk_api/profiles/', user=self.admin)
+        self.assertEqual([profile['name'] for profile in response.data], [name])
+        self.assertFalse(response.data[0]['approximate'])
+        response = self.request('get', url, user=self.admin)
+        self.assertEqual(b''.join(response.streaming_content), (self.directory / name).read_bytes())
+        response = self.request('get', url + '?top=5', user=self.admin)
+        self.assertEqual(len(response.data['functions']), 5)
+        self.assertEqual(self.request('get', '/softdesk_api/profiles/absent.pstats/', user=self.admin).status_code, 404)
+
+
+class SamplingTests(SimpleTestCase):
+    """Outils communs aux middlewares de diagnostic (diagnostics/sampling.py)."""
+
+    def test_rotate_removes_the_oldest_files_over_max_bytes(self):
+        with tempfile.TemporaryDirectory() as name:
+            directory = Path(name)
+            for age, filename in enumerate(['c.pstats', 'b.pstats', 'a.pstats', 'other.json']):
+                path = directory / filename
+                path.write_bytes(b'x' * 100)
+                os.utime(path, (time.time() - age * 60, time.time() - age * 60))
+            rotate(directory, 250, '*.pstats')
+            self.assertEqual(sorted(path.name for path in directory.iterdir()), ['b.pstats', 'c.pstats', 'other.json'])
+            rotate(directory, 200, '*.pstats')
+            self.assertEqual(len(list(directory.iterdir())), 3)
+
+    def test_in_flight_marks_overlapping_observations(self):
+        in_flight = InFlightRequests()
+        in_flight.enter()
+        alone = SimpleNamespace()
+        in_flight.observe(alone)
+        self.assertFalse(alone.approximate)
+        in_flight.enter()
+        self.assertTrue(alone.approximate)
+        in_flight.leave()
+        in_flight.release()
+
+        crowded = SimpleNamespace()
+        in_flight.enter()
+        in_flight.observe(crowded)
+        self.assertTrue(crowded.approximate)
+
+
+class MemoryProfilingTests(DiagnosticsTestCase):
+    """Rapports tracemalloc des requêtes choisies (diagnostics/memory.py)."""
+
+    def enabled_settings(self, directory):
+        return {
+            'MEMORY_PROFILING_ENABLED': True, 'MEMORY_DIR': directory,
+            'MEMORY_SAMPLE_RATE': 1.0, 'MEMORY_ROUTES': ['IssueViewSet.list'],
+        }
+
+    def reports(self):
+        return [report['name'] for report in memory.list_reports()]
+
+    def test_report(self):
+        self.create_issue()
+        self.request('get', self.url)
+        self.assertEqual(self.reports(), [])
+        self.request('get', self.url + 'issues/?page_size=1')
+        [name] = self.reports()
+        self.assertTrue((self.directory / f'{name}.tracemalloc').is_file())
+
+        report = self.request('get', f'/softdesk_api/memory/{name}/', user=self.admin).data
+        self.assertEqual((report['view'], report['method'], report['status']), ('IssueViewSet.list', 'GET', 200))
+        self.assertEqual(report['path'], self.url + 'issues/?page_size=1')
+        self.assertFalse(report['approximate'])
+        self.assertGreater(report['peak_bytes'], 0)
+        self.assertGreaterEqual(report['peak_bytes'], report['retained_bytes'])
+        # Instantané avant rendu : la réponse DRF n'est pas encore rendue
+        before_render = report['before_render']
+        self.assertEqual(before_render['total_bytes'], sum(before_render['layers'].values()))
+        self.assertTrue(set(before_render['layers']) <= {'field', 'serializer', 'renderer', 'orm', 'view', 'other'})
+        self.assertLessEqual(len(before_render['top_lines']), memory.TOP_LINES)
+
+    def test_signed_token_forces_a_report(self):
+        self.configure(MEMORY_SAMPLE_RATE=0.0)
+        self.request('get', self.url + 'issues/')
+        self.request('get', self.url, HTTP_X_SOFTDESK_MEMORY='sample:forged:signature')
+        self.assertEqual(self.reports(), [])
+        self.request('get', self.url, HTTP_X_SOFTDESK_MEMORY=memory.make_token())
+        self.assertEqual([report['view'] for report in memory.list_reports()], ['ProjectViewSet.retrieve'])
+
+    def test_route_stats_and_compare(self):
+        self.request('get', self.url + 'issues/')
+        self.request('get', self.url + 'issues/')
+        older, newer = sorted(self.reports())
+        response = self.request('get', '/softdesk_api/memory/', user=self.admin)
+        peaks = [report['peak_bytes'] for report in response.data['reports']]
+        self.assertEqual(response.data['routes'], {
+            'IssueViewSet.list': {
+                'samples': 2,
+                'approximate_samples': 0,
+                'peak_max_bytes': max(peaks),
+                'peak_mean_bytes': sum(peaks) // 2,
+                'retained_mean_bytes': sum(report['retained_bytes'] for report in response.data['reports']) // 2,
+            },
+        })
+        # Les rapports listés ne portent pas le détail des instantanés
+        self.assertNotIn('before_render', response.data['reports'][0])
+
+        response = self.request('get', f'/softdesk_api/memory/{older}/?compare={newer}', user=self.admin)
+        self.assertEqual((response.data['name'], response.data['compare']), (older, newer))
+        for line in response.data['lines']:
+            self.assertEqual(set(line), {'file', 'line', 'code', 'size_diff', 'count_diff', 'size'})
+        response = self.request('get', f'/softdesk_api/memory/{older}/?compare=../{newer}', user=self.admin)
+        self.assertEqual(response.status_code, 404)
+
+    def test_report_path_only_accepts_report_names(self):
+        self.request('get', self.url + 'issues/')
+        [name] = self.reports()
+        self.assertEqual(memory.report_path(name), self.directory / f'{name}.json')
+        (self.directory.parent / 'secret.json').touch()
+        for forged in ('../secret', 'secret', f'{name}.json', f'x/{name}'):
+            self.assertIsNone(memory.report_path(forged), forged)
+
+    def test_views_are_reserved_to_admins(self):
+        self.request('get', self.url + 'issues/')
+        [name] = self.reports()
+        url = f'/softdesk_api/memory/{name}/'
+        for path in ('/softdesk_api/memory/', url, f'{url}?compare={name}'):
+            self.assertEqual(self.request('get', path, user=self.bob).status_code, 403, path)
+        self.assertEqual(self.request('get', '/softdesk_api/memory/', user=self.admin).status_code, 200)
+        response = self.request('get', '/softdesk_api/memory/20260101T000000000000-0/', user=self.admin)
+        self.assertEqual(response.status_code, 404)
+
+
+def _access_token(user_id):
+    payload = base64.urlsafe_b64encode(json.dumps({'user_id': user_id}).encode()).decode().rstrip('=')
+    return f'header.{payload}.signature'
+
+
+class FakeServer:
+    """Serveur SoftDesk simulé pour httpx.MockTransport : chaque réponse attend delay secondes."""
+
+    def __init__(self, delay=0.02, throttled_contributors=False):
+        self.delay = delay
+        self.throttled_contributors = throttled_contributors
+        self.paths = []
+
+    async def __call__(self, request):
+        await asyncio.sleep(self.delay)
+        path = request.url.path
+        self.paths.append((request.method, path))
+        if path == loadtest.LOGIN_PATH:
+            username = json.loads(request.content)['username']
+            if username == 'unknown':
+                return httpx.Response(401, json={'detail': "Identifiants invalides."})
+            return httpx.Response(200, json={'access': _access_token(int(username.removeprefix('gen')))})
+        if path == '/softdesk_api/projects/':
+            return httpx.Response(200, json={'results': [{'id': 1, 'author_user': 0}, {'id': 2, 'author_user': 1}]})
+        if path.endswith('/issues/'):
+            return httpx.Response(200, json={'results': [{'id': 10}, {'id': 11}]})
+        if path.endswith('/contributors/') and self.throttled_contributors:
+            return httpx.Response(429, json={'detail': "Trop de requêtes."})
+        return httpx.Response(201, json={'id': 100})
+
+
+class LoadTestTests(SimpleTestCase):
+    """Générateur de charge (diagnostics/loadtest.py, commande loadtest)."""
+
+    def patched_client(self, server):
+        http_client = loadtest.HTTPClient
+
+        def client(base_url, max_connections=50, timeout=10.0):
+            return http_client(base_url, max_connections, timeout, transport=httpx.MockTransport(server))
+        return mock.patch.object(loadtest, 'HTTPClient', client)
+
+    def test_summary(self):
+        stats = loadtest.Stats()
+        for number in range(1, 101):
+            stats.record(number / 1000, 429 if number > 95 else 200)
+        stats.record(0.5, 500)
+        stats.record(0.2, failure='ConnectTimeout')
+        summary = stats.summary(elapsed=2)
+        self.assertEqual(summary['requests'], 102)
+        self.assertEqual(summary['throughput_rps'], 51)
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (51.0, 97.0, 200.0))
+        self.assertEqual(summary['max_ms'], 500)
+        self.assertEqual(summary['error_rate'], round(2 / 102, 4))
+        self.assertEqual(summary['throttle_rate'], round(5 / 102, 4))
+        self.assertEqual(summary['statuses'], {'200': 95, '429': 5, '500': 1})
+        self.assertEqual(summary['failures'], {'ConnectTimeout': 1})
+        self.assertIsNone(loadtest.Stats().summary(1)['p50_ms'])
+
+    def test_run(self):
+        server = FakeServer(throttled_contributors=True)
+        with self.patched_client(server):
+            report = loadtest.LoadTest(
+                'http://softdesk.test', ['gen0', 'gen1', 'unknown'], 'password',
+                mix={'read_issues': 1, 'post_comment': 1, 'add_contributor': 1}, rate=100, duration=0.3, seed=1,
+            ).run()
+
+        self.assertEqual((report['users'], report['logged_in']), (3, 2))
+        self.assertEqual(report['login']['statuses'], {'200': 2, '401': 1})
+        # Arrivées régulières : rate * duration requêtes, aucune abandonnée ni sans utilisateur
+        self.assertEqual(report['dropped'], 0)
+        self.assertEqual(report['skipped'], {'read_issues': 0, 'post_comment': 0, 'add_contributor': 0})
+        total = report['total']
+        self.assertEqual(total['requests'], 30)
+        self.assertEqual(total['requests'], sum(summary['requests'] for summary in report['operations'].values()))
+        # Chaque réponse attend 20 ms : la latence mesurée ne peut être plus courte
+        self.assertGreaterEqual(total['p50_ms'], 20)
+        self.assertLessEqual(total['p50_ms'], total['p95_ms'])
+        self.assertLessEqual(total['p95_ms'], total['p99_ms'])
+        self.assertLessEqual(total['p99_ms'], total['max_ms'])
+        contributors = report['operations']['add_contributor']
+        self.assertEqual(contributors['statuses'], {'429': contributors['requests']})
+        self.assertEqual(contributors['throttle_rate'], 1)
+        self.assertEqual(total['throttle_rate'], round(contributors['requests'] / total['requests'], 4))
+        self.assertEqual(total['error_rate'], 0)
+        # add_contributor ne vise que les projets dont l'utilisateur est l'auteur
+        self.assertTrue({
+            path for method, path in server.paths if path.endswith('/contributors/')
+        } <= {'/softdesk_api/projects/1/contributors/', '/softdesk_api/projects/2/contributors/'})
+
+    def test_command_report(self):
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory, self.patched_client(FakeServer(delay=0)):
+            output = Path(directory) / 'report.json'
+            call_command(
+                'loadtest', 'http://softdesk.test', '--users', '2', '--mix', 'list_projects=1', '--rate', '50',
+                '--duration', '0.2', '--seed', '1', '--output', str(output), stdout=stdout,
+            )
+            report = json.loads(output.read_text())
+        self.assertEqual(report['total']['requests'], 10)
+        self.assertEqual(report['operations']['list_projects']['statuses'], {'200': 10})
+        lines = stdout.getvalue().splitlines()
+        [row] = [line for line in lines if line.startswith('list_projects')]
+        self.assertEqual(row.split()[1], '10')
+        self.assertIn(f"{report['total']['p50_ms']:.1f}ms", next(line for line in lines if line.startswith('total')))
+
+    def test_parse_mix(self):
+        self.assertEqual(loadtest.parse_mix('list_projects=40, post_comment=10'), {
+            'list_projects': 40, 'post_comment': 10,
+        })
+        for text in ('unknown=1', 'list_projects=abc', 'list_projects=0'):
+            with self.assertRaises(ValueError):
+                loadtest.parse_mix(text)
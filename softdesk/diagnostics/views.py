@@ -0,0 +1,79 @@
+import json
+
+from django.http import FileResponse, Http404
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.timing import PhaseTimingMixin
+from projects.permissions import IsAdmin
+from .memory import compare, list_reports, report_path, route_stats
+from .profiling import list_profiles, profile_path, top_functions
+
+
+class ProfileListView(PhaseTimingMixin, APIView):
+    """
+    Profils cProfile enregistrés (diagnostics/profiling.py), du plus récent au plus ancien.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDetailView(PhaseTimingMixin, APIView):
+    """
+    Télécharge un profil (.pstats), ou avec ?top=N renvoie ses N fonctions
+    les plus coûteuses en temps cumulé.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, name):
+        path = profile_path(name)
+        if path is None:
+            raise Http404("Profil introuvable.")
+
+        top = request.query_params.get('top')
+        if top is not None:
+            try:
+                limit = max(1, min(int(top), 200))
+            except ValueError:
+                raise ValidationError({"top": "Ce paramètre doit être un entier."})
+            return Response({"name": name, "functions": top_functions(path, limit)})
+
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name,
+                            content_type='application/octet-stream')
+
+
+class MemoryReportListView(PhaseTimingMixin, APIView):
+    """
+    Pic d'allocation par vue et rapports tracemalloc enregistrés (diagnostics/memory.py).
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        reports = list_reports()
+        return Response({"routes": route_stats(reports), "reports": reports})
+
+
+class MemoryReportDetailView(PhaseTimingMixin, APIView):
+    """
+    Rapport complet d'une requête tracée, ou avec ?compare=<name> les écarts
+    d'allocation par ligne entre ce rapport et l'autre.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, name):
+        path = report_path(name)
+        if path is None:
+            raise Http404("Rapport introuvable.")
+
+        other = request.query_params.get('compare')
+        if other is not None:
+            lines = compare(name, other)
+            if lines is None:
+                raise Http404("Instantané introuvable.")
+            return Response({"name": name, "compare": other, "lines": lines})
+
+        return Response(json.loads(path.read_text()))
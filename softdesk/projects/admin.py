@@ -3,6 +3,9 @@ from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import Project, Contributor
 from .models import Issue, Comment
+from .cache import bump_project_versions
+from .counters import COUNTERS, track_created, track_deleted, track_moved, track_deleted_queryset
+from config.writer import write_atomic
 
 
 class UserAdmin(DjangoUserAdmin):
@@ -45,13 +48,46 @@ class UserAdmin(DjangoUserAdmin):
     ordering = ("username", )
 
 
+class CounterAdminMixin:
+    """Maintient le compteur du parent (voir projects/counters.py) lors des ajouts et suppressions."""
+
+    def save_model(self, request, obj, form, change):
+        fk = COUNTERS[type(obj)][0]
+        with write_atomic():
+            old_parent_id = None
+            if change:
+                old_parent_id = type(obj).objects.filter(pk=obj.pk).values_list(fk, flat=True).first()
+            super().save_model(request, obj, form, change)
+            if change:
+                track_moved(obj, old_parent_id)
+                if old_parent_id != getattr(obj, fk):
+                    # Le projet quitté change aussi de version (le nouveau par les signaux)
+                    if fk != 'project_id':
+                        old_parent_id = Issue.objects.filter(pk=old_parent_id).values_list(
+                            'project_id', flat=True
+                        ).first()
+                    bump_project_versions([old_parent_id])
+            else:
+                track_created(obj)
+
+    def delete_model(self, request, obj):
+        with write_atomic():
+            super().delete_model(request, obj)
+            track_deleted(obj)
+
+    def delete_queryset(self, request, queryset):
+        with write_atomic():
+            track_deleted_queryset(queryset)
+            super().delete_queryset(request, queryset)
+
+
 class ContributorInline(admin.TabularInline):
     """Inline admin descriptor for Contributor model."""
     model = Contributor
     extra = 1  # Number of extra empty forms in the admin
 
 
-class ContributorAdmin(admin.ModelAdmin):
+class ContributorAdmin(CounterAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'project', 'user']  # Liste des champs visibles
     ordering = ("id", )
 
@@ -73,6 +109,8 @@ class ProjectAdmin(admin.ModelAdmin):
         "type",
         "author_user",
         "created_at",
+        "issue_count",
+        "contributor_count",
         "get_contributors"
     )
     fields = (
@@ -81,10 +119,12 @@ class ProjectAdmin(admin.ModelAdmin):
         "description",
         "type",
         "author_user",
-        "created_at"
+        "created_at",
+        "issue_count",
+        "contributor_count"
     )
 
-    readonly_fields = ("created_at", "author_user")
+    readonly_fields = ("created_at", "author_user", "issue_count", "contributor_count")
 
     # Ajouter les contributeurs en inline
     inlines = [ContributorInline]
@@ -95,8 +135,18 @@ class ProjectAdmin(admin.ModelAdmin):
 
     get_contributors.short_description = 'Contributors'
 
+    def save_formset(self, request, form, formset, change):
+        # Contributeurs ajoutés ou retirés depuis l'inline
+        with write_atomic():
+            super().save_formset(request, form, formset, change)
+            if formset.model is Contributor:
+                for contributor in formset.new_objects:
+                    track_created(contributor)
+                for contributor in formset.deleted_objects:
+                    track_deleted(contributor)
 
-class IssueAdmin(admin.ModelAdmin):
+
+class IssueAdmin(CounterAdminMixin, admin.ModelAdmin):
     """Admin view for Issue."""
     list_display = (
         'id',
@@ -119,12 +169,13 @@ class IssueAdmin(admin.ModelAdmin):
         'project',
         'author_user',
         'assigned_user',
-        'created_at'
+        'created_at',
+        'comment_count'
     )
-    readonly_fields = ('created_at', )
+    readonly_fields = ('created_at', 'comment_count')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(CounterAdminMixin, admin.ModelAdmin):
     """Admin view for the Comment model."""
     list_display = (
         'id',
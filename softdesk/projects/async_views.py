@@ -0,0 +1,302 @@
+"""
+Lectures async (list et retrieve) des projets, contributeurs, issues et
+commentaires, pour un déploiement ASGI (Uvicorn).
+
+DRF n'exécute que des vues synchrones : sous ASGI, chaque requête est
+confiée à un thread par sync_to_async et l'occupe jusqu'à sa réponse. Avec
+ASYNC_READ_VIEWS, les GET list et retrieve sont servis par les viewsets
+ci-dessous, sous-classes des viewsets synchrones : mêmes querysets, filtres,
+plans de requête, pagination, serializers, ETag et cache des réponses. Seuls
+les accès à la base passent par leurs variantes async (méthodes a* : ORM
+async, cache async), y compris l'authentification JWT et les permissions ;
+le reste (filtres, serializers, rendu JSON) s'exécute dans la boucle
+d'événements.
+
+Les autres requêtes (écritures, HEAD, OPTIONS, API navigable) sont confiées
+au viewset synchrone, comme sans ASYNC_READ_VIEWS.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config.timing import request_phase
+from .models import Comment
+from .views import ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication dont l'utilisateur est lu par l'ORM async."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = await self.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def _async_authenticator(authenticator):
+    # L'authentification JWT par défaut lit l'utilisateur en base : sa variante async la remplace
+    if type(authenticator) is JWTAuthentication:
+        return AsyncJWTAuthentication()
+    return authenticator
+
+
+def _rendered(response):
+    """Réponse DRF rendue ici : Django la rendrait sinon dans un thread."""
+    response.render()
+    rendered = HttpResponse(response.content, status=response.status_code)
+    if not response.has_header('Content-Type'):
+        # 304 et 204 : DRF n'en envoie pas
+        del rendered['Content-Type']
+    for name, value in response.items():
+        rendered[name] = value
+    return rendered
+
+
+class AsyncReadMixin:
+    """
+    list et retrieve async d'un viewset. À placer après le viewset : ses
+    méthodes a* sont celles par défaut, celles des mixins du viewset (cache
+    des réponses, ETag, message de liste vide) passent avant.
+    """
+    async_actions = ('list', 'retrieve')
+    # Actions dont la vue lit le projet ou l'issue de l'URL (RequestContext.project et issue)
+    context_objects = ()
+
+    @classmethod
+    def as_async_view(cls, sync_view):
+        """Vue async de l'URL de sync_view, à qui sont confiées les autres méthodes HTTP."""
+        actions = sync_view.actions
+        initkwargs = sync_view.initkwargs
+        run_sync_view = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if actions.get(request.method.lower()) in cls.async_actions:
+                self = cls(**initkwargs)
+                response = await self.adispatch(request, dict(actions), *args, **kwargs)
+                if response is not None:
+                    return response
+            return await run_sync_view(request, *args, **kwargs)
+
+        # cls, initkwargs, actions, csrf_exempt : métriques et profils restent ceux du viewset synchrone
+        view.__dict__.update(sync_view.__dict__)
+        view.__name__ = sync_view.__name__
+        view.__doc__ = sync_view.__doc__
+        return view
+
+    async def adispatch(self, request, actions, *args, **kwargs):
+        """dispatch() de DRF ; None si la réponse n'est pas en JSON (API navigable)."""
+        # Comme ViewSetMixin.as_view() : liaison des méthodes HTTP aux actions
+        if 'get' in actions and 'head' not in actions:
+            actions['head'] = actions['get']
+        self.action_map = actions
+        for method, action in actions.items():
+            setattr(self, method, getattr(self, action))
+        self.args = args
+        self.kwargs = kwargs
+
+        request = self.initialize_request(request, *args, **kwargs)
+        request.authenticators = tuple(_async_authenticator(authenticator) for authenticator in request.authenticators)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        except exceptions.APIException:
+            return None
+        if request.accepted_renderer.format != 'json':
+            return None
+
+        with request_phase(request, 'ser'):
+            try:
+                await self.ainitial(request, *args, **kwargs)
+                handler = getattr(self, f'a{self.action}')
+                response = await handler(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            response = self.finalize_response(request, response, *args, **kwargs)
+            return _rendered(response)
+
+    async def ainitial(self, request, *args, **kwargs):
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        with request_phase(request, 'auth'):
+            await self.aperform_authentication(request)
+        with request_phase(request, 'perm'):
+            await self.acheck_permissions(request)
+        # Limites de débit dans le cache local au processus : sans requête ni thread
+        self.check_throttles(request)
+        with request_phase(request, 'qs'):
+            await self.aprepare()
+
+    async def aperform_authentication(self, request):
+        """Request._authenticate(), par aauthenticate() quand l'authentification en a une."""
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def acheck_permissions(self, request):
+        for permission in self.get_permissions():
+            if hasattr(permission, 'ahas_permission'):
+                allowed = await permission.ahas_permission(request, self)
+            else:
+                allowed = permission.has_permission(request, self)
+            if not allowed:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None)
+                )
+
+    async def aprepare(self):
+        """Charge d'avance ce que le contexte de la requête chargerait à la demande."""
+        context = self.request_context
+        if not context.is_admin:
+            await context.aproject_ids()
+        if self.action in self.context_objects:
+            await context.aload()
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        with request_phase(self.request, 'qs'):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        """GenericAPIView.get_object() par l'ORM async."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        with request_phase(self.request, 'qs'):
+            try:
+                obj = await queryset.aget(**filter_kwargs)
+            except queryset.model.DoesNotExist:
+                raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+            except (TypeError, ValueError, ValidationError):
+                raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+class AsyncProjectViewSet(ProjectViewSet, AsyncReadMixin):
+    sync_viewset = ProjectViewSet
+    context_objects = ('retrieve',)
+
+    async def aget_object(self):
+        # Projet chargé par aprepare() : get_object() ne fait pas de requête
+        return self.get_object()
+
+
+class AsyncContributorViewSet(ContributorViewSet, AsyncReadMixin):
+    sync_viewset = ContributorViewSet
+
+
+class AsyncIssueViewSet(IssueViewSet, AsyncReadMixin):
+    sync_viewset = IssueViewSet
+    context_objects = ('retrieve',)
+
+    async def aget_object(self):
+        # Issue chargée par aprepare() : get_object() ne fait pas de requête
+        return self.get_object()
+
+
+class AsyncCommentViewSet(CommentViewSet, AsyncReadMixin):
+    sync_viewset = CommentViewSet
+    # get_queryset() lit l'issue de l'URL
+    context_objects = ('list', 'retrieve')
+
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        with request_phase(self.request, 'qs'):
+            try:
+                obj = await queryset.aget(pk=self.kwargs.get('pk'))
+            except Comment.DoesNotExist:
+                raise Http404({"message": "Ce commentaire n'existe pas."})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+ASYNC_VIEWSETS = {
+    viewset.sync_viewset: viewset
+    for viewset in (AsyncProjectViewSet, AsyncContributorViewSet, AsyncIssueViewSet, AsyncCommentViewSet)
+}
+
+
+def async_read_urls(urlpatterns):
+    """URLs des routers, les vues des viewsets de ASYNC_VIEWSETS remplacées par leur vue async."""
+    patterns = []
+    for pattern in urlpatterns:
+        viewset = ASYNC_VIEWSETS.get(getattr(pattern.callback, 'cls', None))
+        if viewset is not None:
+            pattern = URLPattern(
+                pattern.pattern,
+                viewset.as_async_view(pattern.callback),
+                pattern.default_args,
+                pattern.name
+            )
+        patterns.append(pattern)
+    return patterns
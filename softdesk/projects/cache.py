@@ -0,0 +1,302 @@
+"""
+Cache des appartenances aux projets et cache des réponses des listes.
+
+Chaque utilisateur est associé à l'ensemble des ids des projets dont il est
+contributeur. Le cache ('membership' dans settings.CACHES) est partagé entre
+les workers ; les signaux de projects/signals.py l'invalident à chaque
+modification d'un Contributor ou d'un Project. Les compteurs de succès et
+d'échecs restent en mémoire, propres à chaque worker.
+
+Les réponses des listes ('responses') sont indexées par la version des
+projets dont elles dépendent. Les signaux changent la version d'un projet à
+chaque écriture sur lui, ses contributeurs, ses issues ou leurs commentaires :
+les anciennes réponses ne sont plus jamais lues et finissent évincées (LRU).
+"""
+import hashlib
+import pickle
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.shards import ThreadShards
+from .models import Contributor
+
+MEMBERSHIP_CACHE = 'membership'
+MEMBERSHIP_KEY = 'projects:{}'
+
+
+def _membership_cache():
+    return caches[MEMBERSHIP_CACHE]
+
+
+# Compteurs de succès et d'échecs, en mémoire : aucune écriture dans le cache
+# partagé à chaque lecture. Comme les métriques, chaque thread écrit dans son
+# propre dictionnaire, sans verrou (config/shards.py).
+
+def _merge(total, values):
+    # copy() est atomique : le thread propriétaire peut écrire pendant la fusion
+    for name, value in values.copy().items():
+        total[name] = total.get(name, 0) + value
+
+
+_counters = ThreadShards(dict, _merge)
+
+
+def _count(name, delta=1):
+    # Vues async : tous les appels d'une boucle d'événements dans le même thread, sans await ici
+    counters = _counters.local()
+    counters[name] = counters.get(name, 0) + delta
+
+
+def _process_counters():
+    """Compteurs du processus, threads terminés compris."""
+    return _counters.snapshot()
+
+
+def _ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def get_user_project_ids(user):
+    """Retourne le frozenset des ids des projets dont user est contributeur."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    cache = _membership_cache()
+    key = MEMBERSHIP_KEY.format(user.pk)
+    project_ids = cache.get(key)
+    if project_ids is not None:
+        _count('membership:hits')
+        return project_ids
+
+    _count('membership:misses')
+    project_ids = frozenset(
+        Contributor.objects.filter(user_id=user.pk).values_list('project_id', flat=True)
+    )
+    cache.set(key, project_ids)
+    return project_ids
+
+
+async def aget_user_project_ids(user):
+    """get_user_project_ids() pour les vues async : cache et ORM async."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    cache = _membership_cache()
+    key = MEMBERSHIP_KEY.format(user.pk)
+    project_ids = await cache.aget(key)
+    if project_ids is not None:
+        _count('membership:hits')
+        return project_ids
+
+    _count('membership:misses')
+    project_ids = frozenset([
+        project_id
+        async for project_id in Contributor.objects.filter(user_id=user.pk).values_list('project_id', flat=True)
+    ])
+    await cache.aset(key, project_ids)
+    return project_ids
+
+
+def invalidate_memberships(user_ids):
+    """
+    Supprime les entrées des utilisateurs donnés, immédiatement puis une seconde
+    fois après validation de la transaction : une lecture concurrente ayant
+    recalculé l'ancien état entre-temps ne peut donc pas rester en cache.
+    """
+    keys = [MEMBERSHIP_KEY.format(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache = _membership_cache()
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def membership_cache_stats():
+    """Compteurs de succès/échecs du cache des appartenances, pour le worker courant."""
+    counters = _process_counters()
+    hits, misses = counters.get('membership:hits', 0), counters.get('membership:misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': _ratio(hits, misses),
+    }
+
+
+# Cache des réponses
+
+RESPONSE_CACHE = 'responses'
+PROJECT_VERSION_KEY = 'version:project:{}'
+PROJECTS_VERSION_KEY = 'version:projects'  # Ensemble des projets (liste de l'admin)
+
+# Entêtes conservés avec une réponse (posés par ConditionalGetMixin)
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Vary')
+
+
+def _bump(keys):
+    # Une nouvelle valeur aléatoire, plutôt qu'un incrément, ne peut pas revenir à une ancienne version
+    _membership_cache().set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+
+def bump_project_versions(project_ids, projects_list=False):
+    """
+    Change la version des projets donnés (et de la liste de tous les projets
+    si projects_list), immédiatement puis après validation de la transaction :
+    une réponse calculée entre-temps sur l'ancien état reste sous une version périmée.
+    """
+    keys = [PROJECT_VERSION_KEY.format(pk) for pk in set(project_ids) if pk is not None]
+    if projects_list:
+        keys.append(PROJECTS_VERSION_KEY)
+    if keys:
+        _bump(keys)
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def _versions(keys):
+    cache = _membership_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Version inconnue ou évincée : une nouvelle, sauf si un autre worker vient d'en créer une
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+async def _aversions(keys):
+    cache = _membership_cache()
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = await cache.aget(key)
+    return versions
+
+
+def _version_keys(project_ids, projects_list):
+    keys = [PROJECT_VERSION_KEY.format(pk) for pk in sorted(set(project_ids))]
+    if projects_list:
+        keys.append(PROJECTS_VERSION_KEY)
+    return keys
+
+
+def _versions_token(keys, versions):
+    return hashlib.md5(
+        ';'.join(f'{key}={versions[key]}' for key in keys).encode()
+    ).hexdigest()
+
+
+def get_project_versions_token(project_ids, projects_list=False):
+    """Empreinte des versions des projets donnés : change dès que l'un d'eux change."""
+    keys = _version_keys(project_ids, projects_list)
+    return _versions_token(keys, _versions(keys))
+
+
+async def aget_project_versions_token(project_ids, projects_list=False):
+    keys = _version_keys(project_ids, projects_list)
+    return _versions_token(keys, await _aversions(keys))
+
+
+class ResponseCacheMixin:
+    """
+    Met en cache la réponse de l'action list, par vue, utilisateur, URL,
+    format et version des données (get_response_cache_version(), par défaut
+    la version de la liste de ConditionalGetMixin).
+    À placer avant ConditionalGetMixin : un succès évite aussi le calcul du validateur.
+
+    alist() en est la variante des vues async (projects/async_views.py) ; le
+    cache des réponses est local au processus, il est lu sans passer par un thread.
+    """
+    response_cache_actions = ('list',)
+
+    def get_response_cache_version(self):
+        return self.get_list_version()
+
+    async def aget_response_cache_version(self):
+        return await self.aget_list_version()
+
+    def get_response_cache_key(self, request, version=None):
+        if version is None:
+            version = self.get_response_cache_version()
+        # Le nom du viewset synchrone : ses réponses sont partagées avec la vue async
+        name = getattr(self, 'sync_viewset', type(self)).__name__
+        key = ':'.join(str(part) for part in [
+            name,
+            self.action,
+            request.user.pk,
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+            version,
+        ])
+        return 'response:' + hashlib.md5(key.encode()).hexdigest()
+
+    def _cached_response(self, request, cached):
+        """Réponse servie depuis le cache, et le nombre d'octets servis."""
+        data, headers, size = cached
+        if headers.get('ETag') in parse_etags(request.headers.get('If-None-Match', '')):
+            response, served = Response(status=status.HTTP_304_NOT_MODIFIED), 0
+        else:
+            response, served = Response(data), size
+        for name, value in headers.items():
+            response[name] = value
+        return response, served
+
+    def _store_response(self, cache, key, response):
+        if response.status_code == status.HTTP_200_OK:
+            size = len(pickle.dumps(response.data, pickle.HIGHEST_PROTOCOL))
+            if size <= settings.RESPONSE_CACHE_MAX_ITEM_BYTES:
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                cache.set(key, (response.data, headers, size))
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED or self.action not in self.response_cache_actions:
+            return super().list(request, *args, **kwargs)
+
+        cache = caches[RESPONSE_CACHE]
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            _count('responses:hits')
+            response, served = self._cached_response(request, cached)
+            _count('responses:bytes', served)
+            return response
+
+        _count('responses:misses')
+        response = super().list(request, *args, **kwargs)
+        self._store_response(cache, key, response)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED or self.action not in self.response_cache_actions:
+            return await super().alist(request, *args, **kwargs)
+
+        cache = caches[RESPONSE_CACHE]
+        key = self.get_response_cache_key(request, await self.aget_response_cache_version())
+        cached = cache.get(key)
+        if cached is not None:
+            _count('responses:hits')
+            response, served = self._cached_response(request, cached)
+            _count('responses:bytes', served)
+            return response
+
+        _count('responses:misses')
+        response = await super().alist(request, *args, **kwargs)
+        self._store_response(cache, key, response)
+        return response
+
+
+def response_cache_stats():
+    """Succès, échecs et octets servis depuis le cache des réponses, pour le worker courant."""
+    counters = _process_counters()
+    hits, misses = counters.get('responses:hits', 0), counters.get('responses:misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': _ratio(hits, misses),
+        'bytes_served': counters.get('responses:bytes', 0),
+    }
@@ -0,0 +1,178 @@
+"""
+Contexte d'autorisation propre à une requête.
+"""
+from django.http import Http404
+
+from .cache import aget_user_project_ids, get_user_project_ids
+from .models import Project, Contributor, Issue
+
+
+def _to_pk(value):
+    """Convertit un kwarg d'URL en clé primaire, ou None s'il est invalide."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestContext:
+    """
+    Résout une seule fois par requête le projet, l'issue et l'appartenance
+    de l'utilisateur au projet, à partir des kwargs de l'URL.
+
+    Le chargement est paresseux : la requête SQL (une seule jointure) n'est
+    exécutée qu'au premier accès au projet ou à l'issue. L'appartenance est
+    lue dans le cache partagé (projects/cache.py), sans requête.
+
+    Une vue async charge d'avance, par aload() et aproject_ids(), ce que les
+    propriétés chargeraient à la demande ; elles ne font alors plus de requête.
+    """
+
+    def __init__(self, request, view):
+        self.user = request.user
+        kwargs = getattr(view, 'kwargs', None) or {}
+        # 'pk' désigne le projet ou l'issue selon la vue (voir context_lookup)
+        lookup = getattr(view, 'context_lookup', None)
+
+        self.project_pk = _to_pk(kwargs.get('project_pk'))
+        self.issue_pk = _to_pk(kwargs.get('issue_pk'))
+        if 'pk' in kwargs:
+            if lookup == 'issue':
+                self.issue_pk = _to_pk(kwargs['pk'])
+            elif lookup == 'project' or 'project_pk' not in kwargs:
+                self.project_pk = _to_pk(kwargs['pk'])
+
+        self._loaded = False
+        self._project = None
+        self._issue = None
+        self._project_ids = None
+
+    def _should_load(self):
+        if self._loaded:
+            return False
+        self._loaded = True
+        return self.project_pk is not None and self.user.is_authenticated
+
+    def _issue_queryset(self):
+        # Issue + projet en une seule requête jointe
+        return Issue.objects.select_related('project').filter(pk=self.issue_pk, project_id=self.project_pk)
+
+    def _load(self):
+        if not self._should_load():
+            return
+        if self.issue_pk is not None:
+            issue = self._issue_queryset().first()
+            if issue is not None:
+                self._issue = issue
+                self._project = issue.project
+                return
+        self._project = Project.objects.filter(pk=self.project_pk).first()
+
+    async def aload(self):
+        """_load() par l'ORM async."""
+        if not self._should_load():
+            return
+        if self.issue_pk is not None:
+            issue = await self._issue_queryset().afirst()
+            if issue is not None:
+                self._issue = issue
+                self._project = issue.project
+                return
+        self._project = await Project.objects.filter(pk=self.project_pk).afirst()
+
+    @property
+    def project(self):
+        self._load()
+        return self._project
+
+    @property
+    def issue(self):
+        self._load()
+        return self._issue
+
+    @property
+    def is_admin(self):
+        return bool(self.user and self.user.is_superuser)
+
+    @property
+    def project_ids(self):
+        """Ids des projets dont l'utilisateur est contributeur."""
+        if self._project_ids is None:
+            self._project_ids = get_user_project_ids(self.user)
+        return self._project_ids
+
+    async def aproject_ids(self):
+        if self._project_ids is None:
+            self._project_ids = await aget_user_project_ids(self.user)
+        return self._project_ids
+
+    @property
+    def is_contributor(self):
+        return self.project_pk is not None and self.project_pk in self.project_ids
+
+    @property
+    def is_project_author(self):
+        return self.project is not None and self.project.author_user_id == self.user.pk
+
+    @property
+    def is_issue_author(self):
+        return self.issue is not None and self.issue.author_user_id == self.user.pk
+
+    def get_project_or_404(self):
+        if self.project is None:
+            raise Http404("Ce projet n'existe pas.")
+        return self.project
+
+    def get_issue_or_404(self):
+        if self.issue is None:
+            raise Http404("Cette issue n'existe pas.")
+        return self.issue
+
+    def project_id_of(self, obj):
+        """Retourne l'id du projet auquel appartient obj."""
+        if isinstance(obj, Project):
+            return obj.pk
+        if hasattr(obj, 'project_id'):
+            return obj.project_id
+        if hasattr(obj, 'issue_id'):
+            if self.issue_pk is not None and obj.issue_id == self.issue_pk and self.issue is not None:
+                return self.issue.project_id
+            return obj.issue.project_id
+        return None
+
+    def is_contributor_of(self, obj):
+        """Vérifie l'appartenance de l'utilisateur au projet de obj."""
+        return self.project_id_of(obj) in self.project_ids
+
+    def is_author_of(self, obj):
+        """
+        Vérifie si l'utilisateur est l'auteur de obj.
+        Pour un contributeur, l'auteur est celui du projet.
+        """
+        if hasattr(obj, 'author_user_id'):
+            return obj.author_user_id == self.user.pk
+        if isinstance(obj, Contributor):
+            if obj.project_id == self.project_pk:
+                return self.is_project_author
+            return obj.project.author_user_id == self.user.pk
+        return False
+
+
+def get_request_context(request, view):
+    """Retourne le contexte de la requête, construit au premier appel."""
+    context = getattr(request, '_softdesk_context', None)
+    if context is None:
+        context = RequestContext(request, view)
+        request._softdesk_context = context
+    return context
+
+
+class RequestContextMixin:
+    """Expose le contexte de la requête aux viewsets."""
+
+    # Ce que désigne le kwarg 'pk' de l'URL : 'project', 'issue' ou None
+    context_lookup = None
+
+    @property
+    def request_context(self):
+        return get_request_context(self.request, self)
@@ -0,0 +1,150 @@
+"""
+Maintenance des compteurs dénormalisés (Project.issue_count,
+Project.contributor_count et Issue.comment_count).
+
+Les compteurs sont ajustés avec des expressions F(), donc de façon atomique,
+dans les chemins de création et de suppression (vues, serializers, admin,
+signal de suppression d'un utilisateur).
+repair_counters() recalcule et répare ceux qui auraient dérivé.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from config.writer import write_atomic
+from .models import Project, Contributor, Issue, Comment
+
+# Modèle compté -> (attribut de la clé étrangère, modèle parent, champ compteur)
+COUNTERS = {
+    Issue: ('project_id', Project, 'issue_count'),
+    Contributor: ('project_id', Project, 'contributor_count'),
+    Comment: ('issue_id', Issue, 'comment_count'),
+}
+
+
+def adjust_counter(model, pk, field, delta):
+    """Ajoute delta au compteur field de l'objet model d'id pk."""
+    if delta and pk is not None:
+        model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def track_created(instance, count=1):
+    """Incrémente le compteur du parent d'un objet créé."""
+    fk, parent, field = COUNTERS[type(instance)]
+    adjust_counter(parent, getattr(instance, fk), field, count)
+
+
+def track_deleted(instance, count=1):
+    """Décrémente le compteur du parent d'un objet supprimé."""
+    fk, parent, field = COUNTERS[type(instance)]
+    adjust_counter(parent, getattr(instance, fk), field, -count)
+
+
+def track_moved(instance, old_parent_id):
+    """Reporte le compte d'un objet déplacé d'un parent à un autre."""
+    fk, parent, field = COUNTERS[type(instance)]
+    if old_parent_id != getattr(instance, fk):
+        adjust_counter(parent, old_parent_id, field, -1)
+        adjust_counter(parent, getattr(instance, fk), field, 1)
+
+
+def track_deleted_queryset(queryset):
+    """Décrémente les compteurs des parents des objets d'un queryset (avant suppression)."""
+    fk, parent, field = COUNTERS[queryset.model]
+    rows = queryset.order_by().values(fk).annotate(n=Count('pk'))
+    for row in rows:
+        adjust_counter(parent, row[fk], field, -row['n'])
+
+
+def track_user_deleted(user):
+    """
+    Un utilisateur supprimé retire ses lignes Contributor (CASCADE) de chaque projet.
+    Appelé par le signal pre_delete de User (projects/signals.py).
+    """
+    Project.objects.filter(contributor__user=user).update(
+        contributor_count=F('contributor_count') - 1
+    )
+
+
+def _real_count(model, fk):
+    """Sous-requête comptant les lignes de model rattachées au parent courant."""
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{fk: OuterRef('pk')})
+            .order_by()
+            .values(fk)
+            .annotate(n=Count('pk'))
+            .values('n')
+        ),
+        0
+    )
+
+
+def recount(parent, pk, field):
+    """Recalcule le compteur field d'un parent (après une écriture en masse sans signaux)."""
+    model, fk = next(
+        (model, fk) for model, (fk, model_parent, model_field) in COUNTERS.items()
+        if model_parent is parent and model_field == field
+    )
+    parent.objects.filter(pk=pk).update(**{field: _real_count(model, fk)})
+
+
+def _drifted(batch, fields):
+    """Objets du lot dont un compteur diffère du compte réel, corrigés en mémoire."""
+    drifted = []
+    for obj in batch:
+        changed = False
+        for field in fields:
+            real = getattr(obj, f'real_{field}')
+            if getattr(obj, field) != real:
+                setattr(obj, field, real)
+                changed = True
+        if changed:
+            drifted.append(obj)
+    return drifted
+
+
+def _repair(parent, counted, batch_size, dry_run, pks=None):
+    fields = {field: (model, fk) for model, (fk, model_parent, field) in counted.items()}
+    annotations = {f'real_{field}': _real_count(model, fk) for field, (model, fk) in fields.items()}
+
+    queryset = parent.objects.order_by('pk').only('pk', *fields).annotate(**annotations)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+
+    repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        first_pk, last_pk = last_pk, batch[-1].pk
+
+        drifted = _drifted(batch, fields)
+        if drifted and not dry_run:
+            # Lot relu sous le verrou d'écriture : un compteur ajusté depuis la lecture n'est pas écrasé
+            with write_atomic():
+                batch = queryset.filter(pk__gt=first_pk, pk__lte=last_pk)
+                drifted = _drifted(batch, fields)
+                parent.objects.bulk_update(drifted, list(fields))
+        repaired += len(drifted)
+    return repaired
+
+
+def repair_counters(batch_size=1000, dry_run=False, project_ids=None):
+    """
+    Recalcule les compteurs par lots de batch_size parents et corrige ceux
+    qui ont dérivé. Retourne le nombre de projets et d'issues réparés.
+    """
+    by_parent = {}
+    for model, (fk, parent, field) in COUNTERS.items():
+        by_parent.setdefault(parent, {})[model] = (fk, parent, field)
+
+    issue_ids = None
+    if project_ids is not None:
+        issue_ids = Issue.objects.filter(project_id__in=project_ids).values('pk')
+
+    return {
+        'projects': _repair(Project, by_parent[Project], batch_size, dry_run, project_ids),
+        'issues': _repair(Issue, by_parent[Issue], batch_size, dry_run, issue_ids),
+    }
@@ -0,0 +1,271 @@
+"""
+Génération d'un jeu de données synthétique, reproductible, pour les mesures
+de performance.
+
+Tout est tiré d'un random.Random(seed) : une même graine et les mêmes
+paramètres donnent les mêmes lignes (seuls les ids dépendent de la base).
+Les distributions sont asymétriques, comme en production :
+- la taille des projets suit une loi de Zipf (quelques projets géants) ;
+- les utilisateurs sont choisis selon une loi de Zipf (des « power users »
+  contributeurs de nombreux projets, auteurs de nombreuses issues) ;
+- la longueur des fils de commentaires suit une loi de Pareto (quelques
+  fils très longs).
+
+Les lignes sont insérées par bulk_create, un lot par transaction, avec
+leurs compteurs déjà calculés. Tous les utilisateurs partagent un même mot
+de passe, haché une seule fois.
+"""
+import math
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+
+from .cache import bump_project_versions, invalidate_memberships
+from .models import User, Project, Contributor, Issue, Comment
+from config.writer import write_atomic
+
+BATCH_SIZE = 5000
+PASSWORD_SALT = 'softdeskdataset'
+# Les dates sont fixes (et non relatives à maintenant) pour rester reproductibles
+START = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+SPAN = timedelta(days=730)
+
+WORDS = (
+    "erreur connexion page serveur utilisateur affichage lenteur bouton formulaire "
+    "validation export import mobile tableau filtre recherche notification compte "
+    "paiement facture session mot passe profil écran menu lien image fichier "
+    "téléchargement envoi courriel api réponse délai cache base données index "
+    "requête tri pagination projet tâche équipe client version correctif test "
+    "déploiement sécurité accès droits journal sauvegarde synchronisation"
+).split()
+
+
+def _zipf_cum_weights(size, exponent):
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+def _allocate(rng, total, cum_weights):
+    """Répartit total éléments entre len(cum_weights) cases, selon les poids."""
+    counts = array('l', [0]) * len(cum_weights)
+    if not cum_weights:
+        return counts
+    population = range(len(cum_weights))
+    remaining = total
+    while remaining > 0:
+        chunk = min(remaining, 100000)
+        for index in rng.choices(population, cum_weights=cum_weights, k=chunk):
+            counts[index] += 1
+        remaining -= chunk
+    return counts
+
+
+def _sample(rng, population, cum_weights, size):
+    """size éléments distincts de population, tirés selon les poids."""
+    size = min(size, len(population))
+    chosen = {}
+    attempts = 0
+    while len(chosen) < size and attempts < 20 * size:
+        chosen.setdefault(rng.choices(population, cum_weights=cum_weights)[0], None)
+        attempts += 1
+    for item in population:
+        if len(chosen) >= size:
+            break
+        chosen.setdefault(item, None)
+    return list(chosen)
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+class DatasetGenerator:
+    """
+    Génère users utilisateurs, projects projets, issues issues et comments
+    commentaires. progress(model, created, elapsed) est appelé après chaque lot.
+    """
+
+    def __init__(self, users, projects, issues, comments, seed=0, prefix='gen', password='password',
+                 project_skew=1.1, user_skew=1.0, thread_skew=1.5, max_contributors=50,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.counts = {'users': users, 'projects': projects, 'issues': issues, 'comments': comments}
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.password = password
+        self.project_skew = project_skew
+        self.user_skew = user_skew
+        self.thread_skew = thread_skew
+        self.max_contributors = max_contributors
+        self.batch_size = batch_size
+        self.progress = progress
+        self.created = dict.fromkeys(['users', 'projects', 'contributors', 'issues', 'comments'], 0)
+        self._started = None
+
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def _insert(self, model, objects, key, **kwargs):
+        with write_atomic():
+            created = model.objects.bulk_create(objects, **kwargs)
+        self.created[key] += len(objects)
+        if self.progress:
+            self.progress(key, self.created[key], self.elapsed())
+        return created
+
+    def _batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self):
+        self._started = time.monotonic()
+        user_ids = self.generate_users()
+        projects = self.generate_projects(user_ids)
+        issues = self.generate_issues(projects)
+        self.generate_comments(projects, issues)
+
+        bump_project_versions([project['pk'] for project in projects], projects_list=True)
+        invalidate_memberships(user_ids)
+        return self.created
+
+    def generate_users(self):
+        rng = self.rng
+        # Un seul hachage (lent par construction) pour tous les comptes
+        password = make_password(self.password, salt=PASSWORD_SALT)
+        user_ids = []
+
+        def users():
+            for number in range(self.counts['users']):
+                username = f'{self.prefix}{number}'
+                yield User(
+                    username=username,
+                    email=f'{username}@example.com',
+                    password=password,
+                    dob=date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 45)),
+                    can_be_contacted=rng.random() < 0.7,
+                    can_data_be_shared=rng.random() < 0.5,
+                )
+
+        for batch in self._batches(users()):
+            user_ids.extend(user.pk for user in self._insert(User, batch, 'users'))
+        return user_ids
+
+    def generate_projects(self, user_ids):
+        """Projets et contributeurs ; retourne pour chaque projet son id, sa date et ses membres."""
+        rng = self.rng
+        project_weights = _zipf_cum_weights(self.counts['projects'], self.project_skew)
+        issue_counts = _allocate(rng, self.counts['issues'], project_weights)
+        user_weights = _zipf_cum_weights(len(user_ids), self.user_skew)
+        # Les power users ne sont pas les premiers comptes créés
+        ranked_users = user_ids[:]
+        rng.shuffle(ranked_users)
+
+        projects = []
+        for number in range(self.counts['projects']):
+            size = 2 + int(math.sqrt(issue_counts[number]))
+            members = _sample(rng, ranked_users, user_weights, min(size, self.max_contributors))
+            projects.append({
+                'members': members,
+                'issues': issue_counts[number],
+                'created_at': START + SPAN * rng.random() * 0.5,
+            })
+        # Les projets géants ne sont pas tous les premiers créés
+        rng.shuffle(projects)
+
+        def rows():
+            for number, project in enumerate(projects):
+                yield Project(
+                    title=f"Projet {number} " + _text(rng, 1, 4),
+                    description=_text(rng, 5, 30),
+                    type=rng.choice(Project.PROJECT_TYPE_CHOICES)[0],
+                    author_user_id=project['members'][0],
+                    created_at=project['created_at'],
+                    updated_at=project['created_at'],
+                    issue_count=project['issues'],
+                    contributor_count=len(project['members']),
+                )
+
+        created = []
+        for batch in self._batches(rows()):
+            created.extend(self._insert(Project, batch, 'projects'))
+        for project, row in zip(projects, created):
+            project['pk'] = row.pk
+
+        contributors = (
+            Contributor(project_id=project['pk'], user_id=user_id, updated_at=project['created_at'])
+            for project in projects for user_id in project['members']
+        )
+        for batch in self._batches(contributors):
+            self._insert(Contributor, batch, 'contributors')
+        return projects
+
+    def generate_issues(self, projects):
+        """Issues ; retourne l'id, l'index du projet, la date et le nombre de commentaires de chacune."""
+        rng = self.rng
+        comment_counts = _allocate(
+            rng,
+            self.counts['comments'],
+            list(accumulate(rng.paretovariate(self.thread_skew) for _ in range(self.counts['issues'])))
+        )
+        # Tableaux compacts : une entrée par issue, gardée pour générer les commentaires
+        issue_ids, issue_projects, issue_dates = array('q'), array('l'), array('d')
+
+        def rows():
+            number = 0
+            for index, project in enumerate(projects):
+                members = project['members']
+                remaining = START + SPAN - project['created_at']
+                for _ in range(project['issues']):
+                    created_at = project['created_at'] + remaining * rng.random()
+                    issue_projects.append(index)
+                    issue_dates.append((created_at - START).total_seconds())
+                    yield Issue(
+                        project_id=project['pk'],
+                        title=_text(rng, 3, 7),
+                        description=_text(rng, 10, 40),
+                        tag=rng.choices(["BUG", "AMÉLIORATION", "TÂCHE"], weights=[5, 3, 2])[0],
+                        priority=rng.choices(["FAIBLE", "MOYENNE", "ÉLEVÉE"], weights=[3, 5, 2])[0],
+                        status=rng.choices(["À FAIRE", "EN COURS", "TERMINÉ"], weights=[3, 2, 5])[0],
+                        author_user_id=rng.choice(members),
+                        assigned_user_id=rng.choice(members) if rng.random() < 0.7 else None,
+                        created_at=created_at,
+                        updated_at=created_at,
+                        comment_count=comment_counts[number],
+                    )
+                    number += 1
+
+        for batch in self._batches(rows()):
+            issue_ids.extend(issue.pk for issue in self._insert(Issue, batch, 'issues'))
+        return issue_ids, issue_projects, issue_dates, comment_counts
+
+    def generate_comments(self, projects, issues):
+        rng = self.rng
+        issue_ids, issue_projects, issue_dates, comment_counts = issues
+
+        def rows():
+            for issue_id, project_index, issue_date, count in zip(
+                issue_ids, issue_projects, issue_dates, comment_counts
+            ):
+                members = projects[project_index]['members']
+                created_at = START + timedelta(seconds=issue_date)
+                for _ in range(count):
+                    # Les réponses d'un fil s'espacent de quelques heures en moyenne
+                    created_at += timedelta(seconds=rng.expovariate(1 / 7200))
+                    yield Comment(
+                        issue_id=issue_id,
+                        description=_text(rng, 5, 60),
+                        author_user_id=rng.choice(members),
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+
+        for batch in self._batches(rows()):
+            self._insert(Comment, batch, 'comments')
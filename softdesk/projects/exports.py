@@ -0,0 +1,147 @@
+"""
+Export d'un projet au format NDJSON (un objet JSON par ligne).
+
+Lignes, dans l'ordre : les utilisateurs cités (id et username, pour
+retrouver les comptes à l'import), le projet, ses contributeurs, ses issues,
+puis les commentaires de ces issues ; chacune porte son modèle dans "model".
+Les lignes sont produites au fil de l'eau à partir de curseurs
+(.iterator()) et de lots de taille fixe : la mémoire utilisée ne dépend pas
+de la taille du projet.
+
+Sous ASGI, Django lirait tout un itérateur synchrone en mémoire avant
+d'envoyer la réponse : la vue passe alors l'export par aiter_chunks().
+"""
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .models import User, Project, Contributor, Issue, Comment
+
+CHUNK_SIZE = 2000
+# Issues dont les commentaires sont lus par requête : SQLite ne trie que ces commentaires
+ISSUES_PER_COMMENT_QUERY = 100
+# Taille minimale d'un morceau envoyé au client
+BUFFER_SIZE = 64 * 1024
+
+# values() d'une clé étrangère donne l'id de l'objet lié
+USER_FIELDS = ['id', 'username']
+PROJECT_FIELDS = ['id', 'title', 'description', 'type', 'author_user', 'created_at', 'updated_at']
+CONTRIBUTOR_FIELDS = ['id', 'user', 'updated_at']
+ISSUE_FIELDS = [
+    'id', 'title', 'description', 'tag', 'priority', 'status',
+    'assigned_user', 'author_user', 'created_at', 'updated_at',
+]
+COMMENT_FIELDS = ['id', 'issue', 'description', 'author_user', 'created_at', 'updated_at']
+
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def _line(model, row):
+    return _encoder.encode({'model': model, **row}) + '\n'
+
+
+def _issue_id_chunks(project):
+    """Ids des issues du projet par lots, en pagination par clé (index project_id, id)."""
+    last_pk = 0
+    while True:
+        ids = list(
+            Issue.objects.filter(project=project, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:ISSUES_PER_COMMENT_QUERY]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def _users(project):
+    """
+    Utilisateurs cités par le projet : auteur, contributeurs, auteurs et
+    assignés des issues et des commentaires.
+    """
+    issues = Issue.objects.filter(project=project)
+    return User.objects.filter(
+        Q(pk=project.author_user_id)
+        | Q(pk__in=Contributor.objects.filter(project=project).values('user'))
+        | Q(pk__in=issues.values('author_user'))
+        | Q(pk__in=issues.values('assigned_user'))
+        | Q(pk__in=Comment.objects.filter(issue__project=project).values('author_user'))
+    ).order_by('pk').values(*USER_FIELDS)
+
+
+def export_lines(project, chunk_size=CHUNK_SIZE):
+    """Génère les lignes NDJSON du projet."""
+    for row in _users(project).iterator(chunk_size=chunk_size):
+        yield _line('user', row)
+
+    yield _line('project', Project.objects.filter(pk=project.pk).values(*PROJECT_FIELDS).get())
+
+    contributors = (
+        Contributor.objects.filter(project=project)
+        .order_by('pk')
+        .values(*CONTRIBUTOR_FIELDS, username=F('user__username'))
+    )
+    for row in contributors.iterator(chunk_size=chunk_size):
+        yield _line('contributor', row)
+
+    issues = Issue.objects.filter(project=project).order_by('pk').values(*ISSUE_FIELDS)
+    for row in issues.iterator(chunk_size=chunk_size):
+        yield _line('issue', row)
+
+    for issue_ids in _issue_id_chunks(project):
+        comments = Comment.objects.filter(issue_id__in=issue_ids).order_by('issue_id', 'pk').values(*COMMENT_FIELDS)
+        for row in comments.iterator(chunk_size=chunk_size):
+            yield _line('comment', row)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Regroupe les lignes en morceaux d'au moins size octets."""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    """Compresse les morceaux au format gzip au fil de l'eau."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_project(project, compress=False, chunk_size=CHUNK_SIZE):
+    """Morceaux (bytes) de l'export du projet, compressés en gzip si compress."""
+    chunks = buffered(export_lines(project, chunk_size))
+    return gzipped(chunks) if compress else chunks
+
+
+async def aiter_chunks(chunks):
+    """
+    Itérateur async des morceaux d'un générateur synchrone, lus un à un dans
+    le thread des vues synchrones de la requête (sync_to_async
+    thread-sensitive), où ses curseurs ont été ouverts.
+    """
+    end = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, end)
+            if chunk is end:
+                return
+            yield chunk
+    finally:
+        # Client parti : les curseurs sont fermés dans le même thread
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,142 @@
+"""
+Filtres et tris des listes d'issues.
+
+Seules les combinaisons servies par un index de Issue.Meta.indexes sont
+acceptées : un index (project, <champs filtrés>, <champs triés>) doit exister.
+Les autres sont refusées (400) plutôt que de parcourir toutes les issues du projet.
+Un filtre n'a qu'une valeur : avec plusieurs (IN), SQLite lirait l'index une
+fois par valeur puis trierait le tout dans un B-tree temporaire.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Issue
+
+
+class IssueFilterBackend(BaseFilterBackend):
+    """
+    ?status=, ?priority=, ?tag=, ?assigned_user= : une valeur chacun.
+    ?ordering= : une des clés de ORDERINGS.
+    """
+    filter_fields = {
+        'status': [value for value, _ in Issue.ISSUE_STATUS],
+        'priority': [value for value, _ in Issue.ISSUE_PRIORITY],
+        'tag': [value for value, _ in Issue.ISSUE_TAG],
+        'assigned_user': None,  # ids d'utilisateurs, ou 'me'
+    }
+    ordering_param = 'ordering'
+    # Tous les champs d'un même ordre vont dans le même sens : l'index est lu dans un sens ou dans l'autre.
+    # En collation binaire, FAIBLE < MOYENNE < ÉLEVÉE : '-priority' donne les plus urgentes d'abord.
+    ORDERINGS = {
+        '-created_at': ('-created_at', '-pk'),
+        'created_at': ('created_at', 'pk'),
+        '-priority': ('-priority', '-created_at', '-pk'),
+        'priority': ('priority', 'created_at', 'pk'),
+    }
+    default_ordering = '-created_at'
+
+    def get_filters(self, request):
+        """Retourne {champ: [valeurs]} à partir des paramètres de la requête."""
+        filters = {}
+        errors = {}
+        for field, choices in self.filter_fields.items():
+            values = [
+                value.strip()
+                for param in request.query_params.getlist(field)
+                for value in param.split(',')
+                if value.strip()
+            ]
+            if not values:
+                continue
+            if field == 'assigned_user':
+                values = [request.user.pk if value == 'me' else value for value in values]
+                if not all(str(value).isdigit() for value in values):
+                    errors[field] = "Valeurs attendues : des ids d'utilisateurs ou 'me'."
+                    continue
+                values = [int(value) for value in values]
+            elif any(value not in choices for value in values):
+                errors[field] = f"Valeurs possibles : {', '.join(choices)}."
+                continue
+            filters[field] = list(dict.fromkeys(values))
+        if errors:
+            raise ValidationError(errors)
+        return filters
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get(self.ordering_param) or self.default_ordering
+        if key not in self.ORDERINGS:
+            raise ValidationError({
+                self.ordering_param: f"Tris possibles : {', '.join(self.ORDERINGS)}."
+            })
+        return self.ORDERINGS[key]
+
+    def filter_queryset(self, request, queryset, view):
+        filters = self.get_filters(request)
+        ordering = self.get_ordering(request, queryset, view)
+        multiple = [field for field, values in filters.items() if len(values) > 1]
+        if multiple:
+            raise ValidationError({
+                field: "Une seule valeur : plusieurs valeurs ne permettent pas un tri par l'index."
+                for field in multiple
+            })
+        if not self.is_indexed(filters, ordering):
+            raise ValidationError({
+                "detail": "Cette combinaison de filtres et de tri n'est pas prise en charge.",
+                "combinaisons": self.supported_combinations(),
+            })
+
+        for field, values in filters.items():
+            queryset = queryset.filter(**{field: values[0]})
+        return queryset.order_by(*ordering)
+
+    @staticmethod
+    def _signed(fields):
+        """['-created_at', '-pk'] -> [('created_at', True), ('id', True)]"""
+        return [('id' if field.lstrip('-') == 'pk' else field.lstrip('-'), field.startswith('-')) for field in fields]
+
+    def _index_columns(self):
+        for index in Issue._meta.indexes:
+            columns = self._signed(index.fields)
+            if columns and columns[0][0] == 'project':
+                yield columns[1:]
+
+    def is_indexed(self, filters, ordering):
+        """
+        Vrai si un index commence par project, puis les champs filtrés (dans
+        n'importe quel ordre), puis les champs de tri non filtrés, tous lus
+        dans le sens de l'index ou tous dans le sens inverse. Les filtres
+        ({champ: [valeurs]}) n'ont qu'une valeur : une liste IN suivie d'un
+        tri n'est pas servie par l'index.
+        """
+        if any(values is not None and len(values) > 1 for values in filters.values()):
+            return False
+        sort = [(field, desc) for field, desc in self._signed(ordering) if field not in filters]
+        for columns in self._index_columns():
+            if {field for field, _ in columns[:len(filters)]} != set(filters):
+                continue
+            following = columns[len(filters):len(filters) + len(sort)]
+            if [field for field, _ in following] != [field for field, _ in sort]:
+                continue
+            if len({desc != index_desc for (_, desc), (_, index_desc) in zip(sort, following)}) <= 1:
+                return True
+        return False
+
+    def supported_combinations(self):
+        """Liste lisible des combinaisons (filtres, tri) acceptées."""
+        combinations = []
+        for columns in self._index_columns():
+            for size in range(len(columns)):
+                filters = [field for field, _ in columns[:size]]
+                if not set(filters) <= set(self.filter_fields):
+                    break
+                orderings = [
+                    key for key, ordering in self.ORDERINGS.items()
+                    if not key.startswith('-') and self.is_indexed(dict.fromkeys(filters), ordering)
+                ]
+                if orderings:
+                    combinations.append({'filtres': filters, 'tri': orderings})
+        unique = []
+        for combination in combinations:
+            if combination not in unique:
+                unique.append(combination)
+        return unique
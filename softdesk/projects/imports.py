@@ -0,0 +1,401 @@
+"""
+Import en masse de projets, contributeurs, issues et commentaires.
+
+Le format est celui de l'export (projects/exports.py) : une ligne par objet,
+son modèle dans "model", en NDJSON ou en CSV (une colonne par champ, dont
+"model"), éventuellement compressé en gzip. Les parents précèdent leurs
+enfants ; sans colonne "project", contributeurs et issues appartiennent au
+dernier projet lu.
+
+Les ids du fichier sont ceux de la base d'origine : les nouveaux ids des
+projets et des issues leur sont associés au fil de l'import. Les
+utilisateurs ne sont pas créés : ils sont retrouvés par username (celui des
+lignes user ou contributor pour un id d'origine), ou par id avec keep_user_ids.
+
+Les lignes sont insérées par bulk_create, un lot par transaction. Dans la
+même transaction, le point de reprise (une ligne ImportBatch par lot)
+enregistre la position atteinte et les ids créés : un lot validé a
+toujours son point de reprise, et un import interrompu reprend au lot
+suivant sans rien insérer deux fois.
+"""
+import csv
+import gzip
+import json
+import time
+from contextlib import contextmanager
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_project_versions, invalidate_memberships
+from .counters import repair_counters
+from .models import User, Project, Contributor, Issue, Comment, ImportBatch
+from config.writer import write_atomic
+
+MODELS = ('user', 'project', 'contributor', 'issue', 'comment')
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def open_records(path, file_format=None):
+    """Lignes (dicts) d'un fichier NDJSON ou CSV, éventuellement .gz."""
+    name = path[:-3] if path.endswith('.gz') else path
+    file_format = file_format or ('csv' if name.endswith('.csv') else 'ndjson')
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            for row in csv.DictReader(file):
+                # Une cellule vide vaut None, comme un champ absent du NDJSON
+                yield {key: value if value != '' else None for key, value in row.items()}
+        else:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ImportFileError(f"Ligne {number} : JSON invalide ({e}).")
+
+
+class Checkpoint:
+    """
+    Point de reprise nommé : une ligne ImportBatch par lot validé, avec le
+    nombre de lignes du fichier traitées et les correspondances d'ids créées
+    par ce lot.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.line = 0
+        self.ids = {'project': {}, 'issue': {}}
+        self.users = {}
+        self.project = None
+
+    def batches(self):
+        return ImportBatch.objects.filter(checkpoint=self.name)
+
+    def exists(self):
+        return self.batches().exists()
+
+    def load(self):
+        for entry in self.batches().values_list('entry', flat=True).iterator():
+            self.apply(entry)
+
+    def apply(self, entry):
+        self.line = entry['line']
+        for model, pairs in entry.get('ids', {}).items():
+            self.ids[model].update(pairs)
+        self.users.update(entry.get('users', []))
+        self.project = entry.get('project', self.project)
+
+    def save(self, entry):
+        """Enregistre un lot, dans sa transaction."""
+        ImportBatch.objects.create(checkpoint=self.name, entry=entry)
+        self.apply(entry)
+
+    def discard(self):
+        self.batches().delete()
+
+
+@contextmanager
+def preserved_dates():
+    """Désactive auto_now et auto_now_add pour conserver les dates du fichier."""
+    fields = [
+        field for model in (Project, Contributor, Issue, Comment)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _key(value):
+    """Les ids du fichier sont des entiers en NDJSON, des chaînes en CSV."""
+    return None if value is None else str(value)
+
+
+def _date(value, default=None):
+    if value is None:
+        return default
+    date = parse_datetime(str(value).replace(' ', 'T'))
+    if date is None:
+        raise ValueError(f"date invalide : {value}")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _choice(record, field, choices, default=None):
+    value = record.get(field) or default
+    if value not in [choice for choice, _ in choices]:
+        raise ValueError(f"{field} invalide : {value}")
+    return value
+
+
+def _required(record, field):
+    value = record.get(field)
+    if value is None:
+        raise ValueError(f"{field} manquant")
+    return value
+
+
+class Importer:
+    """
+    Importe des lignes dans l'ordre, par lots de batch_size lignes d'un même
+    modèle. progress(imported, elapsed) est appelé après chaque lot.
+    """
+
+    def __init__(self, checkpoint, batch_size=BATCH_SIZE, keep_user_ids=False, progress=None):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.keep_user_ids = keep_user_ids
+        self.progress = progress
+        self.created = dict.fromkeys(MODELS, 0)
+        self.rejected = 0
+        self.errors = []
+        self.unknown_users = set()
+        # username (ou id avec keep_user_ids) -> id local, None si inconnu
+        self._local_users = {}
+        self._started = None
+        self._imported = 0
+
+    # Lecture
+
+    def run(self, records):
+        self._started = time.monotonic()
+        model, batch, number = None, [], self.checkpoint.line
+        for number, record in enumerate(records, 1):
+            if number <= self.checkpoint.line:
+                continue
+            if batch and (record.get('model') != model or len(batch) >= self.batch_size):
+                self.flush(model, batch, number - 1)
+                batch = []
+            model = record.get('model')
+            batch.append((number, record))
+        if batch:
+            self.flush(model, batch, number)
+
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def _reject(self, number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"ligne {number} : {message}")
+
+    # Utilisateurs
+
+    def _user_ref(self, value):
+        """Référence locale (username, ou id avec keep_user_ids) d'un utilisateur du fichier."""
+        if value is None:
+            return None
+        value = str(value)
+        if not value.isdigit():
+            return value
+        if self.keep_user_ids:
+            return int(value)
+        # Id d'origine : son username est connu par les lignes contributor
+        return self.checkpoint.users.get(value, f'#{value}')
+
+    def _resolve_users(self, refs):
+        """Complète self._local_users pour refs, en une requête par type de référence."""
+        refs = {ref for ref in refs if ref is not None and ref not in self._local_users}
+        usernames = [ref for ref in refs if isinstance(ref, str) and not ref.startswith('#')]
+        ids = [ref for ref in refs if isinstance(ref, int)]
+        found = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        found.update((pk, pk) for pk in User.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        for ref in refs:
+            self._local_users[ref] = found.get(ref)
+
+    def _user_id(self, ref):
+        if ref is None:
+            return None
+        user_id = self._local_users.get(ref)
+        if user_id is None:
+            self.unknown_users.add(str(ref))
+        return user_id
+
+    # Lots
+
+    def flush(self, model, batch, line):
+        if model not in MODELS:
+            for number, _ in batch:
+                self._reject(number, f"modèle inconnu : {model}")
+            self.checkpoint.save({'line': line})
+            return
+
+        entry = {'line': line}
+        with write_atomic():
+            getattr(self, f'_import_{model}s')(batch, entry)
+            self.checkpoint.save(entry)
+
+        self._imported += len(batch)
+        if self.progress:
+            self.progress(self._imported, self.elapsed())
+
+    def _parent_project(self, record):
+        source = _key(record.get('project')) or self.checkpoint.project
+        return self.checkpoint.ids['project'].get(source)
+
+    def _learn_users(self, batch, entry):
+        """Associe les ids d'origine des utilisateurs à leur username."""
+        users = [
+            [_key(source), record['username']]
+            for _, record in batch
+            for source in [record.get('user') if record.get('model') == 'contributor' else record.get('id')]
+            if source is not None and record.get('username')
+        ]
+        entry['users'] = users
+        self.checkpoint.users.update(users)
+
+    def _import_users(self, batch, entry):
+        self._learn_users(batch, entry)
+
+    def _import_projects(self, batch, entry):
+        self._resolve_users(self._user_ref(record.get('author_user')) for _, record in batch)
+        sources, projects = [], []
+        now = timezone.now()
+        for number, record in batch:
+            try:
+                created_at = _date(record.get('created_at'), now)
+                project = Project(
+                    title=_required(record, 'title'),
+                    description=record.get('description') or '',
+                    type=_choice(record, 'type', Project.PROJECT_TYPE_CHOICES),
+                    author_user_id=self._user_id(self._user_ref(record.get('author_user'))),
+                    created_at=created_at,
+                    updated_at=_date(record.get('updated_at'), created_at),
+                )
+            except ValueError as e:
+                self._reject(number, str(e))
+                continue
+            sources.append(_key(record.get('id')))
+            projects.append(project)
+
+        Project.objects.bulk_create(projects)
+        entry['ids'] = {'project': [[source, project.pk] for source, project in zip(sources, projects)]}
+        # Les lignes suivantes sans colonne project appartiennent au dernier projet lu, même rejeté
+        entry['project'] = _key(batch[-1][1].get('id'))
+        self.created['project'] += len(projects)
+        bump_project_versions([project.pk for project in projects], projects_list=True)
+
+    def _import_contributors(self, batch, entry):
+        self._learn_users(batch, entry)
+
+        refs = {
+            number: record.get('username') or self._user_ref(record.get('user'))
+            for number, record in batch
+        }
+        self._resolve_users(refs.values())
+        pairs = {}
+        now = timezone.now()
+        for number, record in batch:
+            project_id = self._parent_project(record)
+            user_id = self._user_id(refs[number])
+            if project_id is None:
+                self._reject(number, "projet inconnu")
+            elif user_id is None:
+                self._reject(number, f"utilisateur inconnu : {refs[number]}")
+            else:
+                pairs.setdefault((project_id, user_id), _date(record.get('updated_at'), now))
+
+        # Contributeurs déjà présents : ignorés, et non comptés comme créés
+        existing = set(
+            Contributor.objects.filter(
+                project_id__in={project_id for project_id, _ in pairs},
+                user_id__in={user_id for _, user_id in pairs},
+            ).values_list('project_id', 'user_id')
+        )
+        contributors = [
+            Contributor(project_id=project_id, user_id=user_id, updated_at=updated_at)
+            for (project_id, user_id), updated_at in pairs.items()
+            if (project_id, user_id) not in existing
+        ]
+        Contributor.objects.bulk_create(contributors)
+        self.created['contributor'] += len(contributors)
+        # bulk_create n'envoie pas de signaux
+        invalidate_memberships([contributor.user_id for contributor in contributors])
+        bump_project_versions({contributor.project_id for contributor in contributors})
+
+    def _import_issues(self, batch, entry):
+        self._resolve_users(
+            self._user_ref(record.get(field))
+            for _, record in batch for field in ('author_user', 'assigned_user')
+        )
+        sources, issues = [], []
+        now = timezone.now()
+        for number, record in batch:
+            project_id = self._parent_project(record)
+            if project_id is None:
+                self._reject(number, "projet inconnu")
+                continue
+            try:
+                created_at = _date(record.get('created_at'), now)
+                issue = Issue(
+                    project_id=project_id,
+                    title=_required(record, 'title'),
+                    description=record.get('description') or '',
+                    tag=_choice(record, 'tag', Issue.ISSUE_TAG, "TÂCHE"),
+                    priority=_choice(record, 'priority', Issue.ISSUE_PRIORITY, "MOYENNE"),
+                    status=_choice(record, 'status', Issue.ISSUE_STATUS, "À FAIRE"),
+                    author_user_id=self._user_id(self._user_ref(record.get('author_user'))),
+                    assigned_user_id=self._user_id(self._user_ref(record.get('assigned_user'))),
+                    created_at=created_at,
+                    updated_at=_date(record.get('updated_at'), created_at),
+                )
+            except ValueError as e:
+                self._reject(number, str(e))
+                continue
+            sources.append(_key(record.get('id')))
+            issues.append(issue)
+
+        Issue.objects.bulk_create(issues)
+        entry['ids'] = {'issue': [[source, issue.pk] for source, issue in zip(sources, issues)]}
+        self.created['issue'] += len(issues)
+        bump_project_versions({issue.project_id for issue in issues})
+
+    def _import_comments(self, batch, entry):
+        self._resolve_users(self._user_ref(record.get('author_user')) for _, record in batch)
+        comments = []
+        now = timezone.now()
+        for number, record in batch:
+            issue_id = self.checkpoint.ids['issue'].get(_key(record.get('issue')))
+            if issue_id is None:
+                self._reject(number, "issue inconnue")
+                continue
+            try:
+                created_at = _date(record.get('created_at'), now)
+                comments.append(Comment(
+                    issue_id=issue_id,
+                    description=_required(record, 'description'),
+                    author_user_id=self._user_id(self._user_ref(record.get('author_user'))),
+                    created_at=created_at,
+                    updated_at=_date(record.get('updated_at'), created_at),
+                ))
+            except ValueError as e:
+                self._reject(number, str(e))
+
+        Comment.objects.bulk_create(comments)
+        self.created['comment'] += len(comments)
+
+    # Fin
+
+    def project_ids(self):
+        return list(self.checkpoint.ids['project'].values())
+
+    def finish(self, batch_size=1000):
+        """Recalcule les compteurs des projets importés et change leur version."""
+        project_ids = self.project_ids()
+        repaired = repair_counters(batch_size=batch_size, project_ids=project_ids)
+        bump_project_versions(project_ids, projects_list=True)
+        return repaired
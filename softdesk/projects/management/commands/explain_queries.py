@@ -0,0 +1,145 @@
+"""
+Affiche le plan d'exécution des requêtes SQL de chaque route de l'API,
+sans puis avec les index déclarés dans Meta.indexes.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from projects.cache import invalidate_memberships
+from projects.models import Project, Contributor, Issue, Comment
+from projects.views import ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet
+
+INDEXED_MODELS = (Contributor, Issue, Comment)
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche l'EXPLAIN des requêtes de chaque viewset, sans puis avec les index "
+        "composites, sur le projet et l'issue les plus volumineux de la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help="Exécute les requêtes (EXPLAIN ANALYZE) si la base le permet."
+        )
+        parser.add_argument(
+            '--after-only',
+            action='store_true',
+            help="N'affiche que les plans avec les index."
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        try:
+            self.prefix = connection.ops.explain_query_prefix(**explain_options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        project = Project.objects.order_by('-issue_count', 'pk').first()
+        if project is None:
+            raise CommandError("La base ne contient aucun projet.")
+        issue = (
+            Issue.objects.filter(project=project).order_by('-comment_count', 'pk').first()
+            or Issue.objects.order_by('-comment_count', 'pk').first()
+        )
+        user = project.author_user
+        assignee_id = (
+            Issue.objects.filter(assigned_user__isnull=False)
+            .aggregate(user_id=Max('assigned_user_id'))['user_id']
+        )
+        self.stdout.write(
+            f"Projet {project.pk} ({project.issue_count} issues), "
+            f"issue {issue.pk if issue else '-'} ({issue.comment_count if issue else 0} commentaires), "
+            f"utilisateur {user.username}"
+        )
+
+        if not options['after_only']:
+            if connection.features.can_rollback_ddl:
+                self.stdout.write(self.style.MIGRATE_HEADING("\n=== Sans les index composites ==="))
+                with transaction.atomic():
+                    self.drop_indexes()
+                    self.explain_routes(project, issue, user, assignee_id)
+                    transaction.set_rollback(True)
+            else:
+                self.stdout.write(self.style.WARNING(
+                    "Cette base ne peut pas annuler un DROP INDEX : comparaison ignorée."
+                ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Avec les index composites ==="))
+        self.explain_routes(project, issue, user, assignee_id)
+
+    def drop_indexes(self):
+        """Supprime les index de Meta.indexes (annulé par le rollback de l'appelant)."""
+        template = connection.schema_editor().sql_delete_index
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(template % {
+                        'table': quote(model._meta.db_table),
+                        'name': quote(index.name),
+                    })
+
+    def routes(self, project, issue):
+        """(libellé, viewset, actions, kwargs de l'URL) des routes mesurées."""
+        routes = [
+            ("GET /projects/", ProjectViewSet, {'get': 'list'}, {}),
+            ("GET /projects/{id}/", ProjectViewSet, {'get': 'retrieve'}, {'pk': project.pk}),
+            ("GET /projects/{id}/contributors/", ContributorViewSet, {'get': 'list'},
+             {'project_pk': project.pk}),
+            ("GET /projects/{id}/issues/", IssueViewSet, {'get': 'list'}, {'project_pk': project.pk}),
+        ]
+        if issue is not None:
+            routes += [
+                ("GET /projects/{id}/issues/{id}/", IssueViewSet, {'get': 'retrieve'},
+                 {'project_pk': issue.project_id, 'pk': issue.pk}),
+                ("GET /projects/{id}/issues/{id}/comments/", CommentViewSet, {'get': 'list'},
+                 {'project_pk': issue.project_id, 'issue_pk': issue.pk}),
+            ]
+        return routes
+
+    def get(self, viewset, actions, kwargs, user, path='/'):
+        """Réponse de la vue à un GET de path, et les requêtes SQL exécutées."""
+        request = APIRequestFactory().get(path, SERVER_NAME='localhost')
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = viewset.as_view(actions)(request, **kwargs)
+        return response, queries.captured_queries
+
+    def explain_routes(self, project, issue, user, assignee_id):
+        for label, viewset, actions, kwargs in self.routes(project, issue):
+            # Le cache des appartenances est vidé pour que sa requête soit mesurée aussi
+            invalidate_memberships([user.pk])
+            _, queries = self.get(viewset, actions, kwargs, user)
+            self.explain(label, queries)
+            if actions['get'] != 'list':
+                continue
+
+            # Pagination par curseur (HybridPagination) : la page suivante montre le plan de sa condition
+            response, _ = self.get(viewset, actions, kwargs, user, '/?mode=cursor')
+            next_link = response.data.get('next') if isinstance(response.data, dict) else None
+            if next_link:
+                _, queries = self.get(viewset, actions, kwargs, user, next_link)
+                self.explain(f"{label}?cursor=...", queries)
+
+        if assignee_id is not None:
+            queryset = Issue.objects.filter(assigned_user_id=assignee_id).order_by('-created_at')[:20]
+            sql, params = queryset.query.sql_with_params()
+            self.explain("Issues assignées à un utilisateur", [{'sql': sql, 'params': params}])
+
+    def explain(self, label, queries):
+        self.stdout.write(self.style.SUCCESS(f"\n{label}"))
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                self.stdout.write(f"  {sql[:160]}{'...' if len(sql) > 160 else ''}")
+                cursor.execute(f"{self.prefix} {sql}", query.get('params'))
+                for row in cursor.fetchall():
+                    self.stdout.write(f"      {row[-1]}")
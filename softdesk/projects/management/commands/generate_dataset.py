@@ -0,0 +1,128 @@
+"""
+Génère un jeu de données synthétique et reproductible pour les mesures de performance.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.datasets import BATCH_SIZE, DatasetGenerator
+from projects.imports import preserved_dates
+from projects.search import drop_search_triggers, rebuild_search_index
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère utilisateurs, projets, contributeurs, issues et commentaires avec des distributions "
+        "asymétriques (projets géants, power users, longs fils de commentaires), à partir d'une graine."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Nombre d'utilisateurs (défaut : 1000).")
+        parser.add_argument('--projects', type=int, default=200, help="Nombre de projets (défaut : 200).")
+        parser.add_argument('--issues', type=int, default=20000, help="Nombre d'issues (défaut : 20000).")
+        parser.add_argument('--comments', type=int, default=100000, help="Nombre de commentaires (défaut : 100000).")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur (défaut : 0).")
+        parser.add_argument(
+            '--prefix',
+            default='gen',
+            help="Préfixe des usernames générés (défaut : gen, soit gen0, gen1...)."
+        )
+        parser.add_argument(
+            '--password',
+            default='password',
+            help="Mot de passe commun à tous les utilisateurs générés (défaut : password)."
+        )
+        parser.add_argument(
+            '--project-skew',
+            type=float,
+            default=1.1,
+            help=(
+                "Exposant de Zipf de la taille des projets : plus il est grand, "
+                "plus les géants dominent (défaut : 1.1)."
+            )
+        )
+        parser.add_argument(
+            '--user-skew',
+            type=float,
+            default=1.0,
+            help="Exposant de Zipf de l'activité des utilisateurs (défaut : 1.0)."
+        )
+        parser.add_argument(
+            '--thread-skew',
+            type=float,
+            default=1.5,
+            help=(
+                "Paramètre de Pareto de la longueur des fils : plus il est petit, "
+                "plus les fils sont inégaux (défaut : 1.5)."
+            )
+        )
+        parser.add_argument(
+            '--max-contributors',
+            type=int,
+            default=50,
+            help="Nombre maximal de contributeurs par projet (défaut : 50)."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Nombre de lignes insérées par transaction (défaut : {BATCH_SIZE})."
+        )
+        parser.add_argument(
+            '--defer-search-index',
+            action='store_true',
+            help="Suspend l'indexation plein texte pendant la génération et reconstruit l'index à la fin."
+        )
+
+    def handle(self, *args, **options):
+        if options['projects'] and options['users'] < 1:
+            raise CommandError("Il faut au moins un utilisateur pour créer des projets.")
+        if options['issues'] and not options['projects']:
+            raise CommandError("Il faut au moins un projet pour créer des issues.")
+        if options['comments'] and not options['issues']:
+            raise CommandError("Il faut au moins une issue pour créer des commentaires.")
+        if options['projects'] and options['max_contributors'] < 1:
+            raise CommandError("--max-contributors doit valoir au moins 1 : l'auteur d'un projet en est contributeur.")
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Des utilisateurs '{options['prefix']}...' existent déjà : choisissez un autre --prefix."
+            )
+
+        generator = DatasetGenerator(
+            users=options['users'],
+            projects=options['projects'],
+            issues=options['issues'],
+            comments=options['comments'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            project_skew=options['project_skew'],
+            user_skew=options['user_skew'],
+            thread_skew=options['thread_skew'],
+            max_contributors=options['max_contributors'],
+            batch_size=options['batch_size'],
+            progress=self.report_progress,
+        )
+        self._last_report = 0
+
+        if options['defer_search_index']:
+            drop_search_triggers()
+        try:
+            with preserved_dates():
+                created = generator.run()
+        finally:
+            if options['defer_search_index']:
+                rebuild_search_index()
+
+        elapsed = generator.elapsed()
+        self.stdout.write(self.style.SUCCESS(
+            f"{created['users']} utilisateur(s), {created['projects']} projet(s), "
+            f"{created['contributors']} contributeur(s), {created['issues']} issue(s), "
+            f"{created['comments']} commentaire(s) générés en {elapsed:.1f} s "
+            f"({sum(created.values()) / elapsed if elapsed else 0:.0f} lignes/s). "
+            f"Mot de passe : {options['password']}"
+        ))
+
+    def report_progress(self, model, created, elapsed):
+        if elapsed - self._last_report >= 2:
+            self._last_report = elapsed
+            self.stdout.write(f"{model} : {created} ({elapsed:.0f} s)")
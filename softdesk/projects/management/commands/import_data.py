@@ -0,0 +1,113 @@
+"""
+Importe en masse un fichier au format de l'export (NDJSON ou CSV).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.imports import BATCH_SIZE, Checkpoint, ImportFileError, Importer, open_records, preserved_dates
+from projects.search import drop_search_triggers, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe projets, contributeurs, issues et commentaires depuis un fichier NDJSON ou CSV "
+        "(format de /projects/{id}/export/), par lots, avec reprise sur point de reprise."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .ndjson, .jsonl ou .csv, éventuellement .gz.")
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help="Format du fichier (déduit de l'extension par défaut)."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Nombre de lignes insérées par transaction (défaut : {BATCH_SIZE})."
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help="Nom du point de reprise, enregistré en base (défaut : path)."
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help="Reprend l'import là où le point de reprise s'est arrêté."
+        )
+        parser.add_argument(
+            '--discard-checkpoint',
+            action='store_true',
+            help="Efface le point de reprise existant et importe le fichier depuis le début."
+        )
+        parser.add_argument(
+            '--keep-user-ids',
+            action='store_true',
+            help="Les ids d'utilisateurs du fichier sont ceux de cette base (restauration d'une sauvegarde)."
+        )
+        parser.add_argument(
+            '--defer-search-index',
+            action='store_true',
+            help="Suspend l'indexation plein texte pendant l'import et reconstruit l'index à la fin."
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'] or options['path'])
+        if options['discard_checkpoint']:
+            checkpoint.discard()
+        elif checkpoint.exists():
+            if not options['resume']:
+                raise CommandError(
+                    f"Le point de reprise {checkpoint.name} existe : relancez avec --resume, "
+                    "ou avec --discard-checkpoint pour tout réimporter."
+                )
+            checkpoint.load()
+            self.stdout.write(f"Reprise après la ligne {checkpoint.line}.")
+
+        importer = Importer(
+            checkpoint,
+            batch_size=options['batch_size'],
+            keep_user_ids=options['keep_user_ids'],
+            progress=self.report_progress,
+        )
+        self._last_report = 0
+
+        if options['defer_search_index']:
+            drop_search_triggers()
+        try:
+            with preserved_dates():
+                importer.run(open_records(options['path'], options['format']))
+        except (ImportFileError, OSError) as e:
+            raise CommandError(f"{e} Relancez avec --resume pour reprendre au dernier lot validé.")
+        finally:
+            if options['defer_search_index']:
+                # Recrée les déclencheurs même si l'import s'est interrompu
+                rebuild_search_index()
+
+        repaired = importer.finish()
+        self.report(importer, repaired)
+
+    def report_progress(self, imported, elapsed):
+        if elapsed - self._last_report >= 2:
+            self._last_report = elapsed
+            self.stdout.write(f"{imported} lignes importées ({imported / elapsed:.0f} lignes/s)")
+
+    def report(self, importer, repaired):
+        elapsed = importer.elapsed()
+        total = sum(importer.created.values())
+        for error in importer.errors:
+            self.stderr.write(error)
+        if importer.rejected > len(importer.errors):
+            self.stderr.write(f"... et {importer.rejected - len(importer.errors)} autre(s) ligne(s) rejetée(s).")
+        if importer.unknown_users:
+            self.stdout.write(self.style.WARNING(
+                f"{len(importer.unknown_users)} utilisateur(s) inconnu(s), laissés vides : "
+                + ', '.join(sorted(importer.unknown_users)[:20])
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{importer.created['project']} projet(s), {importer.created['contributor']} contributeur(s), "
+            f"{importer.created['issue']} issue(s), {importer.created['comment']} commentaire(s) importés "
+            f"en {elapsed:.1f} s ({total / elapsed if elapsed else 0:.0f} lignes/s) ; "
+            f"{importer.rejected} ligne(s) rejetée(s), "
+            f"compteurs réparés : {repaired['projects']} projet(s), {repaired['issues']} issue(s)."
+        ))
@@ -0,0 +1,18 @@
+"""
+Reconstruit l'index de recherche plein texte des issues et des commentaires.
+"""
+from django.core.management.base import BaseCommand
+
+from projects.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recrée les tables FTS5 et leurs déclencheurs si besoin, puis réindexe issues et commentaires."
+
+    def handle(self, *args, **options):
+        if rebuild_search_index():
+            self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                "Base non SQLite : la recherche utilise l'ORM, aucun index à reconstruire."
+            ))
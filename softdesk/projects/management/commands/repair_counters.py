@@ -0,0 +1,36 @@
+"""
+Recalcule les compteurs dénormalisés des projets et des issues.
+"""
+from django.core.management.base import BaseCommand
+
+from projects.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule par lots les compteurs issue_count, contributor_count et comment_count "
+        "et répare ceux qui ont dérivé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Nombre de projets/issues traités par transaction (défaut : 1000)."
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Compte les compteurs erronés sans les corriger."
+        )
+
+    def handle(self, *args, **options):
+        repaired = repair_counters(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        verb = "à réparer" if options['dry_run'] else "réparés"
+        self.stdout.write(self.style.SUCCESS(
+            f"Compteurs {verb} : {repaired['projects']} projet(s), {repaired['issues']} issue(s)."
+        ))
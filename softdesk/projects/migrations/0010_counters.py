@@ -0,0 +1,58 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{fk: OuterRef('pk')})
+            .order_by()
+            .values(fk)
+            .annotate(n=Count('pk'))
+            .values('n')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Contributor = apps.get_model('projects', 'Contributor')
+    Issue = apps.get_model('projects', 'Issue')
+    Comment = apps.get_model('projects', 'Comment')
+
+    Project.objects.update(
+        issue_count=_count(Issue, 'project_id'),
+        contributor_count=_count(Contributor, 'project_id'),
+    )
+    Issue.objects.update(comment_count=_count(Comment, 'issue_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_alter_comment_options_alter_issue_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Nombre de commentaires de l'issue."),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='contributor_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Nombre de contributeurs du projet.'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='issue_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Nombre d'issues du projet."),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:40
+
+from django.db import migrations
+
+# SQL figé à l'état de cette migration : projects/search.py peut évoluer sans la modifier.
+CREATE_SEARCH_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS projects_issue_fts USING fts5(
+        title, description,
+        content='projects_issue', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS projects_comment_fts USING fts5(
+        description,
+        content='projects_comment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS projects_issue_fts_ai AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO projects_issue_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_issue_fts_ad AFTER DELETE ON projects_issue BEGIN
+        INSERT INTO projects_issue_fts(projects_issue_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_issue_fts_au AFTER UPDATE OF title, description ON projects_issue
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        INSERT INTO projects_issue_fts(projects_issue_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO projects_issue_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_ai AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_comment_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_ad AFTER DELETE ON projects_comment BEGIN
+        INSERT INTO projects_comment_fts(projects_comment_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_comment_fts_au AFTER UPDATE OF description ON projects_comment
+    WHEN old.description IS NOT new.description BEGIN
+        INSERT INTO projects_comment_fts(projects_comment_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO projects_comment_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    # Indexation des lignes existantes
+    "INSERT INTO projects_issue_fts(projects_issue_fts) VALUES ('rebuild')",
+    "INSERT INTO projects_comment_fts(projects_comment_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS projects_issue_fts_ai",
+    "DROP TRIGGER IF EXISTS projects_issue_fts_ad",
+    "DROP TRIGGER IF EXISTS projects_issue_fts_au",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS projects_comment_fts_au",
+    "DROP TABLE IF EXISTS projects_issue_fts",
+    "DROP TABLE IF EXISTS projects_comment_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 n'existe que sous SQLite ; les autres bases se passent d'index
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_SEARCH_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_SEARCH_INDEX:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
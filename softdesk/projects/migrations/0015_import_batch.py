@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkpoint', models.CharField(db_index=True, help_text='Nom du point de reprise (par défaut, le fichier importé).', max_length=255)),
+                ('entry', models.JSONField(help_text='Position atteinte et ids créés par le lot.')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+    ]
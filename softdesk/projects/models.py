@@ -2,7 +2,30 @@ from django.db import models
 from users.models import User
 
 
-class Project(models.Model):
+class CountedModel(models.Model):
+    """
+    Modèle portant des compteurs dénormalisés.
+
+    Les compteurs ne sont écrits qu'avec des expressions F() (projects/counters.py) :
+    une sauvegarde complète d'une instance existante les exclut pour ne pas écraser
+    une valeur modifiée entre-temps par une autre requête.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            excluded = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in excluded and field.name not in excluded
+            ]
+        super().save(*args, **kwargs)
+
+
+class Project(CountedModel):
     """Project model."""
 
     PROJECT_TYPE_CHOICES = [
@@ -35,6 +58,23 @@ class Project(models.Model):
         auto_now_add=True,
         help_text="Date de création du projet."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Date de dernière modification du projet."
+    )
+    # Compteurs dénormalisés, maintenus par projects/counters.py
+    issue_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Nombre d'issues du projet."
+    )
+    contributor_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Nombre de contributeurs du projet."
+    )
+
+    counter_fields = ('issue_count', 'contributor_count')
 
     class Meta:
         ordering = ["pk"]
@@ -54,12 +94,19 @@ class Contributor(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # L'index unique (user, project) sert aussi la recherche des projets d'un utilisateur
         unique_together = (
             "user",
             "project",
         )
+        indexes = [
+            models.Index(fields=["project", "user"], name="contributor_project_user_idx"),
+            # Dernière modification, pour les ETag (config/conditional.py)
+            models.Index(fields=["project", "updated_at"], name="contributor_updated_idx"),
+        ]
         ordering = ["user_id"]
 
     def __str__(self):
@@ -67,7 +114,7 @@ class Contributor(models.Model):
         return f"user: {self.user}, project: {self.project}"
 
 
-class Issue(models.Model):
+class Issue(CountedModel):
     """Issue model."""
 
     ISSUE_TAG = [
@@ -123,9 +170,36 @@ class Issue(models.Model):
         related_name="Issue_assigned_user",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Compteur dénormalisé, maintenu par projects/counters.py
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Nombre de commentaires de l'issue."
+    )
+
+    counter_fields = ('comment_count',)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Issues d'un projet, les plus récentes d'abord (liste et pagination par curseur)
+            models.Index(fields=["project", "-created_at", "-id"], name="issue_project_created_idx"),
+            # Filtres et tris des listes d'issues (projects/filters.py) ; les index triés
+            # par priorité sont croissants pour servir 'priority' comme '-priority'
+            models.Index(fields=["project", "status", "-created_at", "-id"], name="issue_project_status_idx"),
+            models.Index(fields=["project", "priority", "created_at", "id"], name="issue_project_priority_idx"),
+            models.Index(fields=["project", "tag", "-created_at", "-id"], name="issue_project_tag_idx"),
+            models.Index(fields=["project", "assigned_user", "-created_at", "-id"], name="issue_project_assigned_idx"),
+            models.Index(
+                fields=["project", "status", "priority", "created_at", "id"],
+                name="issue_project_status_prio_idx"
+            ),
+            # Dernière modification, pour les ETag (config/conditional.py)
+            models.Index(fields=["project", "updated_at"], name="issue_project_updated_idx"),
+            # Issues assignées à un utilisateur
+            models.Index(fields=["assigned_user", "-created_at"], name="issue_assigned_created_idx"),
+        ]
 
     def __str__(self):
         """String for representing the Model object."""
@@ -149,9 +223,16 @@ class Comment(models.Model):
         on_delete=models.CASCADE
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Commentaires d'une issue, les plus récents d'abord
+            models.Index(fields=["issue", "-created_at", "-id"], name="comment_issue_created_idx"),
+            # Dernière modification, pour les ETag (config/conditional.py)
+            models.Index(fields=["issue", "updated_at"], name="comment_issue_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.id}; issue: {self.issue}"
@@ -160,3 +241,22 @@ class Comment(models.Model):
     def comment_id(self):
         """Return pk attribut of the object."""
         return self.pk
+
+
+class ImportBatch(models.Model):
+    """
+    Lot validé d'un import en masse (projects/imports.py), enregistré dans la
+    transaction du lot : son point de reprise.
+    """
+    checkpoint = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="Nom du point de reprise (par défaut, le fichier importé)."
+    )
+    entry = models.JSONField(help_text="Position atteinte et ids créés par le lot.")
+
+    class Meta:
+        ordering = ["pk"]
+
+    def __str__(self):
+        return f"{self.checkpoint} : ligne {self.entry.get('line')}"
@@ -3,7 +3,7 @@ Custom permissions.
 """
 from rest_framework.permissions import BasePermission
 from rest_framework import permissions
-from projects.models import Contributor
+from projects.context import get_request_context
 
 
 class IsAdmin(permissions.BasePermission):
@@ -17,6 +17,14 @@ class IsAdmin(permissions.BasePermission):
         return request.user.is_superuser
 
 
+class IsAdminOrMetricsCollector(permissions.BasePermission):
+    """
+    Permission réservée aux super administrateurs et au collecteur de métriques (METRICS_TOKEN).
+    """
+    def has_permission(self, request, view):
+        return request.auth == 'metrics' or request.user.is_superuser
+
+
 class IsAuthor(permissions.BasePermission):
     """
     Permission vérifiant si l'utilisateur est l'auteur de la ressource.
@@ -36,30 +44,21 @@ class IsProjectContributor(permissions.BasePermission):
     message = "Vous devez être contributeur pour accéder à ce projet."
 
     def has_permission(self, request, view):
-        if 'project_pk' in view.kwargs:
-            project_id = view.kwargs['project_pk']
-        elif 'pk' in view.kwargs:
-            project_id = view.kwargs['pk']
-        else:
+        context = get_request_context(request, view)
+        if context.project_pk is None:
             return False
 
-        return Contributor.objects.filter(
-            user=request.user,
-            project_id=project_id
-        ).exists()
+        return context.is_contributor
 
-    def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'project'):
-            project = obj.project
-        elif hasattr(obj, 'issue'):
-            project = obj.issue.project
-        else:
-            project = obj
+    async def ahas_permission(self, request, view):
+        # Vues async : appartenances lues par le cache et l'ORM async, puis même test
+        context = get_request_context(request, view)
+        if context.project_pk is not None:
+            await context.aproject_ids()
+        return self.has_permission(request, view)
 
-        return Contributor.objects.filter(
-            user=request.user,
-            project=project
-        ).exists()
+    def has_object_permission(self, request, view, obj):
+        return get_request_context(request, view).is_contributor_of(obj)
 
 
 class IsProjectContributorOrIsAdmin(BasePermission):
@@ -72,15 +71,24 @@ class IsProjectContributorOrIsAdmin(BasePermission):
         return (
             request.user
             and (
-                IsProjectContributor().has_permission(request, view)
-                or IsAdmin().has_permission(request, view)
+                IsAdmin().has_permission(request, view)
+                or IsProjectContributor().has_permission(request, view)
+            )
+        )
+
+    async def ahas_permission(self, request, view):
+        return bool(
+            request.user
+            and (
+                IsAdmin().has_permission(request, view)
+                or await IsProjectContributor().ahas_permission(request, view)
             )
         )
 
     def has_object_permission(self, request, view, obj):
         return (
-            IsProjectContributor().has_object_permission(request, view, obj)
-            or IsAdmin().has_object_permission(request, view, obj)
+            IsAdmin().has_object_permission(request, view, obj)
+            or IsProjectContributor().has_object_permission(request, view, obj)
         )
 
 
@@ -97,6 +105,6 @@ class IsAuthorOrIsAdmin(BasePermission):
     def has_object_permission(self, request, view, obj):
         # Vérifie si l'utilisateur est l'auteur de l'objet OU est admin
         return (
-            obj.author_user == request.user  # Vérifie directement si l'utilisateur est l'auteur
-            or request.user.is_superuser     # Vérifie si l'utilisateur est admin
+            request.user.is_superuser  # Vérifie si l'utilisateur est admin
+            or get_request_context(request, view).is_author_of(obj)
         )
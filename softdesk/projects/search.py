@@ -0,0 +1,240 @@
+"""
+Recherche plein texte dans les issues et les commentaires.
+
+Sous SQLite, deux tables virtuelles FTS5 à contenu externe indexent
+projects_issue (title, description) et projects_comment (description) ;
+des déclencheurs SQL les tiennent à jour pour toute écriture, ORM ou non.
+Les résultats sont classés par bm25 et limités aux projets de l'utilisateur.
+Les autres bases se rabattent sur une recherche icontains, sans classement.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Contributor, Issue, Comment
+
+ISSUE_FTS = 'projects_issue_fts'
+COMMENT_FTS = 'projects_comment_fts'
+
+# Poids bm25 des colonnes de l'index des issues : (title, description)
+ISSUE_WEIGHTS = (10.0, 1.0)
+SNIPPET_TOKENS = 12
+
+SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {ISSUE_FTS} USING fts5(
+        title, description,
+        content='projects_issue', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_FTS} USING fts5(
+        description,
+        content='projects_comment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    # Issues
+    f"""CREATE TRIGGER IF NOT EXISTS {ISSUE_FTS}_ai AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO {ISSUE_FTS}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {ISSUE_FTS}_ad AFTER DELETE ON projects_issue BEGIN
+        INSERT INTO {ISSUE_FTS}({ISSUE_FTS}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {ISSUE_FTS}_au AFTER UPDATE OF title, description ON projects_issue
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        INSERT INTO {ISSUE_FTS}({ISSUE_FTS}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {ISSUE_FTS}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    # Commentaires
+    f"""CREATE TRIGGER IF NOT EXISTS {COMMENT_FTS}_ai AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO {COMMENT_FTS}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {COMMENT_FTS}_ad AFTER DELETE ON projects_comment BEGIN
+        INSERT INTO {COMMENT_FTS}({COMMENT_FTS}, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {COMMENT_FTS}_au AFTER UPDATE OF description ON projects_comment
+    WHEN old.description IS NOT new.description BEGIN
+        INSERT INTO {COMMENT_FTS}({COMMENT_FTS}, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO {COMMENT_FTS}(rowid, description) VALUES (new.id, new.description);
+    END""",
+]
+
+DROP_SEARCH_SCHEMA = [
+    f"DROP TRIGGER IF EXISTS {ISSUE_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {ISSUE_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {ISSUE_FTS}_au",
+    f"DROP TRIGGER IF EXISTS {COMMENT_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {COMMENT_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {COMMENT_FTS}_au",
+    f"DROP TABLE IF EXISTS {ISSUE_FTS}",
+    f"DROP TABLE IF EXISTS {COMMENT_FTS}",
+]
+
+
+def uses_fts(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def install_search_index(conn=None):
+    """
+    Crée les tables FTS5 et leurs déclencheurs s'ils n'existent pas.
+    Appelé après chaque migrate : SQLite supprime les déclencheurs d'une
+    table que Django reconstruit (AlterField, AddField...).
+    """
+    conn = conn or connection
+    if not uses_fts(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in SEARCH_SCHEMA:
+            cursor.execute(statement)
+
+
+def drop_search_triggers(conn=None):
+    """
+    Supprime les déclencheurs (pas les index) avant un import massif ;
+    rebuild_search_index() les recrée et réindexe tout ensuite.
+    """
+    conn = conn or connection
+    if not uses_fts(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in DROP_SEARCH_SCHEMA:
+            if statement.startswith('DROP TRIGGER'):
+                cursor.execute(statement)
+
+
+def rebuild_search_index(conn=None):
+    """Réindexe entièrement les issues et les commentaires."""
+    conn = conn or connection
+    if not uses_fts(conn):
+        return False
+    install_search_index(conn)
+    with conn.cursor() as cursor:
+        for table in (ISSUE_FTS, COMMENT_FTS):
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return True
+
+
+def build_match_query(text):
+    """
+    Transforme la saisie de l'utilisateur en requête FTS5 sûre : chaque mot
+    est cité (la syntaxe FTS5 n'est pas interprétée), tous doivent être présents,
+    et le dernier est un préfixe pour la recherche au fil de la frappe.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _scope(user, project_id, column):
+    """Restriction aux projets de l'utilisateur (et au projet demandé)."""
+    clauses, params = [], []
+    if not user.is_superuser:
+        clauses.append(f"{column} IN (SELECT project_id FROM projects_contributor WHERE user_id = %s)")
+        params.append(user.pk)
+    if project_id is not None:
+        clauses.append(f"{column} = %s")
+        params.append(project_id)
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def search_issues(user, text, limit=20, project_id=None):
+    match = build_match_query(text)
+    if not match:
+        return []
+    if not uses_fts():
+        return _search_issues_orm(user, text, limit, project_id)
+
+    scope, scope_params = _scope(user, project_id, 'i.project_id')
+    weights = ', '.join(str(weight) for weight in ISSUE_WEIGHTS)
+    sql = f"""
+        SELECT i.id, i.project_id AS project, i.title, i.status, i.priority,
+               snippet({ISSUE_FTS}, -1, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25({ISSUE_FTS}, {weights}) AS bm25_score
+        FROM {ISSUE_FTS}
+        JOIN projects_issue i ON i.id = {ISSUE_FTS}.rowid
+        WHERE {ISSUE_FTS} MATCH %s{scope}
+        ORDER BY bm25_score, i.id DESC
+        LIMIT %s
+    """
+    return _with_score(_fetch(sql, [match, *scope_params, limit]))
+
+
+def search_comments(user, text, limit=20, project_id=None):
+    match = build_match_query(text)
+    if not match:
+        return []
+    if not uses_fts():
+        return _search_comments_orm(user, text, limit, project_id)
+
+    scope, scope_params = _scope(user, project_id, 'i.project_id')
+    sql = f"""
+        SELECT c.id, c.issue_id AS issue, i.project_id AS project,
+               snippet({COMMENT_FTS}, 0, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25({COMMENT_FTS}) AS bm25_score
+        FROM {COMMENT_FTS}
+        JOIN projects_comment c ON c.id = {COMMENT_FTS}.rowid
+        JOIN projects_issue i ON i.id = c.issue_id
+        WHERE {COMMENT_FTS} MATCH %s{scope}
+        ORDER BY bm25_score, c.id DESC
+        LIMIT %s
+    """
+    return _with_score(_fetch(sql, [match, *scope_params, limit]))
+
+
+def _with_score(rows):
+    # bm25 renvoie un score négatif, d'autant plus bas que le résultat est pertinent
+    for row in rows:
+        row['score'] = round(-row.pop('bm25_score'), 4)
+    return rows
+
+
+def _orm_scope(queryset, user, project_id, field):
+    if not user.is_superuser:
+        queryset = queryset.filter(**{
+            f'{field}__in': Contributor.objects.filter(user=user).values('project_id')
+        })
+    if project_id is not None:
+        queryset = queryset.filter(**{field: project_id})
+    return queryset
+
+
+def _search_issues_orm(user, text, limit, project_id):
+    queryset = Issue.objects.order_by('-created_at')
+    for term in re.findall(r'\w+', text):
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    queryset = _orm_scope(queryset, user, project_id, 'project_id')
+    return [
+        {
+            'id': issue.id, 'project': issue.project_id, 'title': issue.title,
+            'status': issue.status, 'priority': issue.priority,
+            'snippet': issue.title, 'score': None,
+        }
+        for issue in queryset.only('id', 'project', 'title', 'status', 'priority')[:limit]
+    ]
+
+
+def _search_comments_orm(user, text, limit, project_id):
+    queryset = Comment.objects.select_related('issue').order_by('-created_at')
+    for term in re.findall(r'\w+', text):
+        queryset = queryset.filter(description__icontains=term)
+    queryset = _orm_scope(queryset, user, project_id, 'issue__project_id')
+    return [
+        {
+            'id': comment.id, 'issue': comment.issue_id, 'project': comment.issue.project_id,
+            'snippet': comment.description[:200], 'score': None,
+        }
+        for comment in queryset.only('id', 'issue__project', 'description')[:limit]
+    ]
@@ -3,7 +3,9 @@ Provides application serializers
 """
 from rest_framework import serializers
 from .models import User, Project, Contributor, Issue, Comment
-from django.shortcuts import get_object_or_404
+from .context import get_request_context
+from .services import NOT_FOUND, add_contributors, replace_contributors
+from config.writer import write_atomic
 
 
 class ContributorSerializer(serializers.ModelSerializer):
@@ -50,38 +52,20 @@ class ContributorSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         contributors_usernames = validated_data.pop('contributors', [])
         # Récupérer le projet depuis l'URL de la requête
-        project_pk = self.context['view'].kwargs['project_pk']
-        project = Project.objects.get(pk=project_pk)
-
-        created_contributors = []
-        error_messages = []
-
-        for username in contributors_usernames:
-            try:
-                # Vérifier si l'utilisateur avec ce username existe
-                user = User.objects.get(username=username)
-
-                # Vérifier si l'utilisateur est déjà un contributeur pour ce projet
-                if not Contributor.objects.filter(user=user, project=project).exists():
-                    # S'il n'est pas encore un contributeur, on l'ajoute au projet
-                    contributor = Contributor.objects.create(user=user, project=project)
-                    created_contributors.append(contributor)
-                else:
-                    # Si l'utilisateur est déjà contributeur, ajouter un message d'erreur
-                    error_messages.append(f"L'utilisateur '{username}' est déjà contributeur du projet.")
-            except User.DoesNotExist:
-                # Si l'utilisateur n'existe pas, ajouter un message d'erreur
-                error_messages.append(f"L'utilisateur '{username}' n'existe pas.")
-            except Exception as e:
-                # En cas d'autre erreur (ex : erreur de base de données), ajouter un message d'erreur
-                error_messages.append(f"Erreur lors de l'ajout de l'utilisateur '{username}' : {str(e)}")
-
-        # Si des erreurs sont présentes et aucun contributeur n'a été créé, lever une exception
-        if error_messages and not created_contributors:
-            raise serializers.ValidationError({"errors": error_messages})
-
-        # Retourner la liste des contributeurs crées ou rien
-        return created_contributors or None
+        project = get_request_context(
+            self.context['request'],
+            self.context['view']
+        ).get_project_or_404()
+
+        # Résultat par username, repris par la vue pour sa réponse
+        self.changes = add_contributors(project, contributors_usernames)
+
+        # Si des usernames ont été refusés et aucun ajouté, lever une exception avec le détail
+        # (une liste vide ne change rien, sans erreur)
+        if self.changes.results and not self.changes.created:
+            raise serializers.ValidationError({"errors": self.changes.messages()})
+
+        return self.changes.created
 
 
 class ContributorIdSerializer(serializers.ModelSerializer):
@@ -109,20 +93,14 @@ class CommentSerializer(serializers.ModelSerializer):
             self.fields.pop('created_at', None)
 
     def validate(self, data):
-        if self.instance:  # En mise à jour
-            issue = self.instance.issue
-        else:  # En création
-            view = self.context['view']
-            project = get_object_or_404(Project, pk=view.kwargs['project_pk'])
-            issue = get_object_or_404(
-                Issue,
-                pk=view.kwargs['issue_pk'],
-                project=project
-            )
+        context = get_request_context(self.context['request'], self.context['view'])
+        # L'issue de l'URL, déjà chargée avec son projet
+        issue = context.get_issue_or_404()
 
-        project_pk = self.context['view'].kwargs['project_pk']
+        if self.instance and self.instance.issue_id != issue.pk:  # En mise à jour
+            raise serializers.ValidationError("Le commentaire ne correspond pas à l'issue.")
 
-        if issue.project.id != int(project_pk):
+        if issue.project_id != context.project_pk:
             raise serializers.ValidationError("L'issue ne correspond pas au projet.")
         return data
 
@@ -166,19 +144,60 @@ class IssueSerializer(serializers.ModelSerializer):
             instance = self.instance if hasattr(self, 'instance') else None
             if instance:
                 # Supprimer les champs si vides ou non attribués
-                if not getattr(instance, 'assigned_user', None):  # Vérifie si assigned_user est défini
+                if not instance.assigned_user_id:  # Vérifie si assigned_user est défini
                     self.fields.pop('assigned_user', None)
-                if instance.comment_set.count() == 0:
+                if instance.comment_count == 0:
                     self.fields.pop('comments', None)
 
     def get_comments(self, obj):
-        comments = Comment.objects.filter(issue=obj)
         # Récupérer uniquement les IDs des commentaires liés à l'issue actuelle
-        return list(comments.values_list('id', flat=True))
+        return [comment.pk for comment in obj.comment_set.all()]
         # Récupérer tous les commentaires liés à l'issue actuelle
         # return CommentSerializer(comments, many=True).data
 
 
+class IssueBatchItemSerializer(serializers.ModelSerializer):
+    """
+    Un élément d'un lot d'issues (voir IssueViewSet.batch).
+    assigned_user est un simple id : son existence est vérifiée pour tout le lot en une requête.
+    """
+    id = serializers.IntegerField(required=False)
+    assigned_user = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Issue
+        fields = [
+            'id',
+            'title',
+            'description',
+            'tag',
+            'priority',
+            'status',
+            'assigned_user'
+        ]
+        extra_kwargs = {
+            'tag': {'default': "TÂCHE"},
+            'priority': {'default': "MOYENNE"},
+            'status': {'default': "À FAIRE"},
+        }
+
+
+class IssueBatchSerializer(serializers.Serializer):
+    """Lot d'issues : {"create": [...], "update": [{"id": ..., ...}, ...]}."""
+    max_items = 500
+
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+
+    def validate(self, data):
+        total = len(data['create']) + len(data['update'])
+        if not total:
+            raise serializers.ValidationError("Le lot est vide.")
+        if total > self.max_items:
+            raise serializers.ValidationError(f"Un lot est limité à {self.max_items} éléments.")
+        return data
+
+
 class ProjectSerializer(serializers.ModelSerializer):
     contributors = serializers.ListField(
         child=serializers.CharField(),
@@ -218,75 +237,43 @@ class ProjectSerializer(serializers.ModelSerializer):
         else:
             instance = self.instance if hasattr(self, 'instance') else None
             if instance:
-                if instance.contributor_set.count() == 0:
+                if instance.contributor_count == 0:
                     self.fields.pop('project_contributors', None)
-                if instance.issue_set.count() == 0:
+                if instance.issue_count == 0:
                     self.fields.pop('issues', None)
 
     def get_issues(self, obj):
-        return list(Issue.objects.filter(project=obj).values_list('id', flat=True))
+        return [issue.pk for issue in obj.issue_set.all()]
 
-    def _manage_contributors(self, project, usernames, author_user):
+    def _manage_contributors(self, project, usernames):
         """
         Méthode pour gérer les contributeurs d'un projet
         """
-        # Créer/Vérifier le contributeur auteur
-        try:
-            Contributor.objects.get_or_create(
-                user=author_user,
-                project=project
-            )
-        except Exception as e:
+        changes = replace_contributors(project, usernames)
+        not_found = changes.usernames(NOT_FOUND)
+        if not_found:
             raise serializers.ValidationError(
-                f"Erreur lors de la gestion du contributeur auteur : {str(e)}"
+                f"Utilisateur non trouvé : {', '.join(not_found)}"
             )
 
-        # Gérer les autres contributeurs
-        current_contributors = set(project.contributor_set.values_list('user__username', flat=True))
-        new_contributors = set(usernames)
-
-        # Ajouter les nouveaux contributeurs
-        for username in new_contributors - current_contributors:
-            try:
-                user = User.objects.get(username=username)
-                if user != author_user:
-                    Contributor.objects.get_or_create(
-                        user=user,
-                        project=project
-                    )
-            except User.DoesNotExist:
-                raise serializers.ValidationError(
-                    f"Utilisateur non trouvé : {username}"
-                )
-            except Exception as e:
-                raise serializers.ValidationError(
-                    f"Erreur lors de l'ajout du contributeur {username} : {str(e)}"
-                )
-
-        # Supprimer les contributeurs retirés (sauf l'auteur)
-        contributors_to_remove = current_contributors - new_contributors - {author_user.username}
-        if contributors_to_remove:
-            Contributor.objects.filter(
-                project=project,
-                user__username__in=contributors_to_remove
-            ).delete()
-
+    @write_atomic()
     def create(self, validated_data):
         contributors = validated_data.pop('contributors', [])
         try:
             project = Project.objects.create(**validated_data)
-            self._manage_contributors(project, contributors, validated_data['author_user'])
+            self._manage_contributors(project, contributors)
             return project
         except Exception as e:
             raise serializers.ValidationError(f"Erreur lors de la création du projet : {str(e)}")
 
+    @write_atomic()
     def update(self, instance, validated_data):
         contributors = validated_data.pop('contributors', [])
         try:
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
             instance.save()
-            self._manage_contributors(instance, contributors, instance.author_user)
+            self._manage_contributors(instance, contributors)
             return instance
         except Exception as e:
             raise serializers.ValidationError(f"Erreur lors de la mise à jour du projet : {str(e)}")
@@ -0,0 +1,208 @@
+"""
+Opérations en masse sur les contributeurs et les issues d'un projet.
+
+Chaque opération tient en quelques requêtes quel que soit le nombre
+d'éléments (bulk_create, bulk_update, un seul delete), dans une seule
+transaction d'écriture (BEGIN IMMEDIATE sur SQLite).
+"""
+from django.utils import timezone
+
+from config.writer import write_atomic
+from .cache import bump_project_versions, invalidate_memberships
+from .counters import adjust_counter, recount
+from .models import User, Project, Contributor, Issue
+
+# Résultat par username
+ADDED = 'added'
+REMOVED = 'removed'
+ALREADY_CONTRIBUTOR = 'already_contributor'
+NOT_CONTRIBUTOR = 'not_contributor'
+AUTHOR = 'author'
+NOT_FOUND = 'not_found'
+
+MESSAGES = {
+    ADDED: "Le contributeur '{username}' a bien été ajouté au projet {project}.",
+    REMOVED: "Le contributeur '{username}' a été retiré du projet {project}.",
+    ALREADY_CONTRIBUTOR: "L'utilisateur '{username}' est déjà contributeur du projet.",
+    NOT_CONTRIBUTOR: "L'utilisateur '{username}' n'est pas contributeur du projet.",
+    AUTHOR: "Le contributeur '{username}' est l'auteur du projet.",
+    NOT_FOUND: "Utilisateur '{username}' non trouvé.",
+}
+
+
+class ContributorChanges:
+    """Résultat d'une opération : statut de chaque username et contributeurs créés."""
+
+    def __init__(self, project):
+        self.project = project
+        self.results = {}
+        self.created = []
+        self.removed_ids = []
+
+    def usernames(self, result):
+        return [username for username, status in self.results.items() if status == result]
+
+    def messages(self):
+        return [
+            MESSAGES[status].format(username=username, project=self.project.pk)
+            for username, status in self.results.items()
+        ]
+
+
+# Contributeurs : les usernames sont résolus en une requête (username__in),
+# les contributeurs actuels lus en une autre.
+
+def _resolve(usernames):
+    """Dédoublonne les usernames et retourne {username: user_id} en une requête."""
+    usernames = list(dict.fromkeys(usernames))
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+    return usernames, user_ids
+
+
+def _insert(changes, user_ids):
+    if not user_ids:
+        return
+    # bulk_create n'envoie pas post_save : compteur et cache sont mis à jour ici
+    changes.created = Contributor.objects.bulk_create(
+        [Contributor(project=changes.project, user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True
+    )
+    recount(Project, changes.project.pk, 'contributor_count')
+    invalidate_memberships(user_ids)
+    bump_project_versions([changes.project.pk])
+
+
+def _delete(changes, user_ids):
+    if not user_ids:
+        return
+    # Les signaux post_delete invalident le cache des appartenances
+    Contributor.objects.filter(project=changes.project, user_id__in=user_ids).delete()
+    recount(Project, changes.project.pk, 'contributor_count')
+    changes.removed_ids = list(user_ids)
+
+
+@write_atomic()
+def add_contributors(project, usernames):
+    """Ajoute les utilisateurs nommés au projet."""
+    changes = ContributorChanges(project)
+    usernames, user_ids = _resolve(usernames)
+    current = set(
+        Contributor.objects
+        .filter(project=project, user_id__in=user_ids.values())
+        .values_list('user_id', flat=True)
+    )
+
+    to_add = []
+    for username in usernames:
+        user_id = user_ids.get(username)
+        if user_id is None:
+            changes.results[username] = NOT_FOUND
+        elif user_id == project.author_user_id:
+            changes.results[username] = AUTHOR
+        elif user_id in current:
+            changes.results[username] = ALREADY_CONTRIBUTOR
+        else:
+            changes.results[username] = ADDED
+            to_add.append(user_id)
+
+    _insert(changes, to_add)
+    return changes
+
+
+@write_atomic()
+def remove_contributors(project, usernames):
+    """Retire les utilisateurs nommés du projet (jamais son auteur)."""
+    changes = ContributorChanges(project)
+    usernames, user_ids = _resolve(usernames)
+    current = set(
+        Contributor.objects
+        .filter(project=project, user_id__in=user_ids.values())
+        .values_list('user_id', flat=True)
+    )
+
+    to_remove = []
+    for username in usernames:
+        user_id = user_ids.get(username)
+        if user_id is None:
+            changes.results[username] = NOT_FOUND
+        elif user_id == project.author_user_id:
+            changes.results[username] = AUTHOR
+        elif user_id not in current:
+            changes.results[username] = NOT_CONTRIBUTOR
+        else:
+            changes.results[username] = REMOVED
+            to_remove.append(user_id)
+
+    _delete(changes, to_remove)
+    return changes
+
+
+@write_atomic()
+def replace_contributors(project, usernames):
+    """
+    Fait des utilisateurs nommés les contributeurs du projet : ajoute les
+    nouveaux et retire les autres. L'auteur du projet est toujours contributeur.
+    """
+    changes = ContributorChanges(project)
+    usernames, user_ids = _resolve(usernames)
+    current = dict(
+        Contributor.objects
+        .filter(project=project)
+        .values_list('user_id', 'user__username')
+    )
+
+    wanted = set()
+    if project.author_user_id is not None:
+        wanted.add(project.author_user_id)
+    for username in usernames:
+        user_id = user_ids.get(username)
+        if user_id is None:
+            changes.results[username] = NOT_FOUND
+        elif user_id == project.author_user_id:
+            changes.results[username] = AUTHOR
+        elif user_id in current:
+            changes.results[username] = ALREADY_CONTRIBUTOR
+        else:
+            changes.results[username] = ADDED
+        if user_id is not None:
+            wanted.add(user_id)
+
+    to_remove = [user_id for user_id in current if user_id not in wanted]
+    for user_id in to_remove:
+        changes.results[current[user_id]] = REMOVED
+
+    _delete(changes, to_remove)
+    _insert(changes, [user_id for user_id in wanted if user_id not in current])
+    return changes
+
+
+@write_atomic()
+def apply_issue_batch(project, author_user, creates, updates):
+    """
+    Crée les issues décrites par creates (dicts de champs validés) et applique
+    updates ([(issue, champs)]) : un bulk_create et un bulk_update.
+    Retourne les issues créées, dans l'ordre de creates.
+    """
+    created = Issue.objects.bulk_create(
+        [Issue(project=project, author_user=author_user, **fields) for fields in creates]
+    )
+    adjust_counter(Project, project.pk, 'issue_count', len(created))
+
+    changed = {}
+    updated_fields = set()
+    now = timezone.now()
+    for issue, fields in updates:
+        for name, value in fields.items():
+            setattr(issue, name, value)
+        # bulk_update ne renseigne pas les champs auto_now
+        issue.updated_at = now
+        updated_fields.update(fields)
+        changed[issue.pk] = issue
+    if updated_fields:
+        Issue.objects.bulk_update(list(changed.values()), sorted(updated_fields | {'updated_at'}))
+
+    # Ni bulk_create ni bulk_update n'envoient de signaux
+    if created or changed:
+        bump_project_versions([project.pk])
+
+    return created
@@ -0,0 +1,109 @@
+"""
+Signal handlers of the projects application.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_project_versions, invalidate_memberships
+from .counters import track_user_deleted
+from .models import User, Project, Contributor, Issue, Comment
+from .search import ISSUE_FTS, install_search_index
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def invalidate_contributor_membership(sender, instance, **kwargs):
+    """Un contributeur ajouté, modifié ou retiré invalide le cache de son utilisateur."""
+    invalidate_memberships([instance.user_id])
+
+
+@receiver(pre_delete, sender=Project)
+def collect_project_members(sender, instance, **kwargs):
+    """Mémorise les membres d'un projet avant sa suppression (et celle de ses contributeurs)."""
+    instance._member_ids = list(instance.contributor_set.values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_project_memberships(sender, instance, **kwargs):
+    """Un projet supprimé invalide le cache de tous ses anciens membres."""
+    invalidate_memberships(getattr(instance, '_member_ids', ()))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_version(sender, instance, **kwargs):
+    """Un projet créé, modifié ou supprimé change sa version et celle de la liste des projets."""
+    bump_project_versions([instance.pk], projects_list=True)
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Issue)
+def bump_parent_project_version(sender, instance, origin=None, **kwargs):
+    """Un contributeur ou une issue modifié change la version de son projet."""
+    if isinstance(origin, Project):
+        # Suppression en cascade : le projet lui-même change déjà la version
+        return
+    bump_project_versions([instance.project_id])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_project_version(sender, instance, origin=None, **kwargs):
+    """Un commentaire modifié change la version du projet de son issue."""
+    if isinstance(origin, (Project, Issue)):
+        # Suppression en cascade : l'issue ou le projet change déjà la version
+        return
+    if Comment.issue.is_cached(instance):
+        project_id = instance.issue.project_id
+    else:
+        project_id = Issue.objects.filter(pk=instance.issue_id).values_list('project_id', flat=True).first()
+    bump_project_versions([project_id])
+
+
+@receiver(pre_delete, sender=User)
+def bump_user_project_versions(sender, instance, **kwargs):
+    """
+    Les champs auteur et assigné passent à NULL sans signal ni nouvel
+    updated_at à la suppression d'un utilisateur : les lignes concernées sont
+    redatées ici (validateurs des détails) et leurs projets changent de version
+    (validateurs et cache des listes).
+
+    Les UPDATE passent avant les lectures : ce signal ouvre la transaction de
+    la suppression, qui prend ainsi le verrou d'écriture avant de lire, même
+    hors de write_atomic() (admin, shell).
+    """
+    projects = Project.objects.filter(author_user=instance)
+    issues = Issue.objects.filter(Q(author_user=instance) | Q(assigned_user=instance))
+    comments = Comment.objects.filter(author_user=instance)
+
+    now = timezone.now()
+    for queryset in (projects, issues, comments):
+        queryset.update(updated_at=now)
+
+    project_ids = set(projects.values_list('pk', flat=True))
+    project_ids.update(issues.values_list('project_id', flat=True).distinct())
+    project_ids.update(comments.values_list('issue__project_id', flat=True).distinct())
+    bump_project_versions(project_ids, projects_list=True)
+
+
+@receiver(pre_delete, sender=User)
+def track_user_contributions(sender, instance, **kwargs):
+    """
+    Les lignes Contributor d'un utilisateur supprimé (CASCADE) quittent le
+    compteur de leur projet, quel que soit le chemin de suppression (API, admin, shell).
+    """
+    track_user_deleted(instance)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """Recrée les déclencheurs FTS5 perdus si une migration a reconstruit projects_issue ou projects_comment."""
+    connection = connections[using]
+    # Seulement si l'index existe (migration 0012 appliquée)
+    if sender.name == 'projects' and ISSUE_FTS in connection.introspection.table_names():
+        install_search_index(connection)
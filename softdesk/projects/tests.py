@@ -1,3 +1,1134 @@
-# from django.test import TestCase
+"""
+Tests de l'API des projets.
+"""
+import datetime
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.http import QueryDict
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.utils import OperationalError, load_backend
+from django.db.models.signals import pre_delete
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.metrics import render_prometheus
+from config.urls import viewset_urls
+from config.writer import Writer, WriteQueueTimeout, stop_writer, write_atomic, writer
+from diagnostics.explain import explain, plan_flags
+from users.models import User
+from .async_views import async_read_urls
+from .cache import get_user_project_ids, membership_cache_stats, response_cache_stats
+from .context import RequestContext
+from .counters import repair_counters
+from .filters import IssueFilterBackend
+from .imports import Checkpoint, Importer
+from .models import Project, Contributor, Issue, Comment
+
+# Caches en mémoire : les tests ne lisent ni n'écrivent le cache fichier partagé
+TEST_CACHES = {
+    name: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{name}'}
+    for name in ('default', 'membership', 'responses')
+}
+
+
+def create_user(username, **extra_fields):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username, dob=datetime.date(1990, 1, 1),
+        password='password', **extra_fields
+    )
+
+
+class SoftDeskFixtures:
+    """
+    Projet d'alice, dont bob est contributeur ; carol n'en est pas membre,
+    admin est super administrateur.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.alice = create_user('alice')
+        self.bob = create_user('bob')
+        self.carol = create_user('carol')
+        self.admin = create_user('admin', is_superuser=True, is_staff=True)
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.post('/softdesk_api/projects/', {
+            'title': "Projet", 'description': "Description", 'type': 'Back-End', 'contributors': ['bob'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.project = Project.objects.get()
+        self.url = f'/softdesk_api/projects/{self.project.pk}/'
+
+    def request(self, method, url, data=None, user=None, **extra):
+        self.client.force_authenticate(user or self.alice)
+        return getattr(self.client, method)(url, data, format='json', **extra)
+
+    def create_issue(self, title="Issue", user=None, **fields):
+        data = {
+            'title': title, 'description': "Description", 'tag': 'BUG', 'priority': 'ÉLEVÉE',
+            'status': 'À FAIRE', **fields,
+        }
+        response = self.request('post', self.url + 'issues/', data, user=user)
+        self.assertEqual(response.status_code, 201, response.content)
+        return Issue.objects.get(pk=response.data['id'])
+
+
+# Hachage rapide des mots de passe : les tests créent plusieurs utilisateurs chacun
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SoftDeskAPITestCase(SoftDeskFixtures, APITestCase):
+    pass
+
+
+class RequestContextTests(SoftDeskAPITestCase):
+    """Résolution du projet, de l'issue et de l'appartenance (projects/context.py)."""
+
+    def context(self, user, kwargs, context_lookup=None):
+        view = SimpleNamespace(kwargs=kwargs, context_lookup=context_lookup)
+        return RequestContext(SimpleNamespace(user=user), view)
+
+    def test_resolves_project_and_issue(self):
+        issue = self.create_issue()
+        context = self.context(self.bob, {'project_pk': str(self.project.pk), 'pk': str(issue.pk)}, 'issue')
+        with self.assertNumQueries(1):
+            self.assertEqual(context.issue, issue)
+            self.assertEqual(context.project, self.project)
+        self.assertTrue(context.is_contributor)
+        self.assertFalse(context.is_project_author)
+
+    def test_resolves_project_from_pk(self):
+        context = self.context(self.alice, {'pk': str(self.project.pk)}, 'project')
+        self.assertEqual(context.get_project_or_404(), self.project)
+        self.assertIsNone(context.issue)
+        self.assertTrue(context.is_project_author)
+
+    def test_issue_of_another_project_is_not_resolved(self):
+        issue = self.create_issue()
+        other = Project.objects.create(title="Autre", description="Description", type='iOs', author_user=self.carol)
+        context = self.context(self.alice, {'project_pk': str(other.pk), 'pk': str(issue.pk)}, 'issue')
+        self.assertIsNone(context.issue)
+        self.assertEqual(context.project, other)
+
+    def test_invalid_pk(self):
+        context = self.context(self.alice, {'project_pk': 'abc'})
+        self.assertIsNone(context.project_pk)
+        self.assertFalse(context.is_contributor)
+
+    def test_member_reads_project_and_issue(self):
+        issue = self.create_issue()
+        self.assertEqual(self.request('get', self.url, user=self.bob).status_code, 200)
+        self.assertEqual(self.request('get', self.url + f'issues/{issue.pk}/', user=self.bob).status_code, 200)
+
+    def test_non_member_is_forbidden(self):
+        issue = self.create_issue()
+        self.assertEqual(self.request('get', self.url, user=self.carol).status_code, 403)
+        self.assertEqual(self.request('get', self.url + 'issues/', user=self.carol).status_code, 403)
+        self.assertEqual(self.request('get', self.url + f'issues/{issue.pk}/', user=self.carol).status_code, 403)
+
+    def test_unknown_project_is_forbidden(self):
+        # Personne n'est contributeur d'un projet inexistant : pas d'indice sur son existence
+        self.assertEqual(self.request('get', '/softdesk_api/projects/9999/issues/').status_code, 403)
+
+    def test_unknown_issue_is_not_found(self):
+        self.assertEqual(self.request('get', self.url + 'issues/9999/').status_code, 404)
+        response = self.request('post', self.url + 'issues/9999/comments/', {'description': "Commentaire"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_bypasses_membership(self):
+        issue = self.create_issue()
+        self.assertFalse(Contributor.objects.filter(project=self.project, user=self.admin).exists())
+        self.assertEqual(self.request('get', self.url, user=self.admin).status_code, 200)
+        self.assertEqual(self.request('get', self.url + 'issues/', user=self.admin).status_code, 200)
+        self.assertEqual(self.request('get', self.url + f'issues/{issue.pk}/', user=self.admin).status_code, 200)
+
+
+class MembershipCacheTests(SoftDeskAPITestCase):
+    """Cache des appartenances, invalidé par les signaux des contributeurs (projects/signals.py)."""
+
+    def test_cached_after_first_read(self):
+        self.assertEqual(get_user_project_ids(self.bob), {self.project.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_project_ids(self.bob), {self.project.pk})
+
+    def test_invalidated_on_contributor_save(self):
+        self.assertEqual(get_user_project_ids(self.carol), frozenset())
+        Contributor.objects.create(project=self.project, user=self.carol)
+        self.assertEqual(get_user_project_ids(self.carol), {self.project.pk})
+        self.assertEqual(self.request('get', self.url, user=self.carol).status_code, 200)
+
+    def test_invalidated_on_contributor_delete(self):
+        self.assertEqual(self.request('get', self.url, user=self.bob).status_code, 200)
+        Contributor.objects.get(project=self.project, user=self.bob).delete()
+        self.assertEqual(get_user_project_ids(self.bob), frozenset())
+        self.assertEqual(self.request('get', self.url, user=self.bob).status_code, 403)
+
+    def test_invalidated_on_project_delete(self):
+        self.assertEqual(get_user_project_ids(self.bob), {self.project.pk})
+        self.project.delete()
+        self.assertEqual(get_user_project_ids(self.bob), frozenset())
+
+    def test_stats_are_not_stored_in_shared_cache(self):
+        caches['membership'].clear()
+        stats = membership_cache_stats()
+        get_user_project_ids(self.bob)
+        get_user_project_ids(self.bob)
+        current = membership_cache_stats()
+        self.assertEqual(current['misses'] - stats['misses'], 1)
+        self.assertEqual(current['hits'] - stats['hits'], 1)
+        # Seule l'appartenance de bob est dans le cache partagé
+        self.assertEqual(list(caches['membership']._cache), [caches['membership'].make_key(f'projects:{self.bob.pk}')])
+
+
+class CounterTests(SoftDeskAPITestCase):
+    """Compteurs dénormalisés (projects/counters.py)."""
+
+    def assertCounts(self, issues, contributors):
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.issue_count, self.project.contributor_count), (issues, contributors))
+        self.assertEqual(repair_counters(dry_run=True), {'projects': 0, 'issues': 0})
+
+    def test_create(self):
+        self.assertCounts(0, 2)
+        issue = self.create_issue()
+        self.request('post', self.url + 'contributors/', {'contributors': ['carol']})
+        for _ in range(2):
+            self.request('post', self.url + f'issues/{issue.pk}/comments/', {'description': "Commentaire"})
+        self.assertCounts(1, 3)
+        issue.refresh_from_db()
+        self.assertEqual(issue.comment_count, 2)
+
+    def test_delete(self):
+        issue = self.create_issue()
+        self.create_issue()
+        response = self.request('post', self.url + f'issues/{issue.pk}/comments/', {'description': "Commentaire"})
+        self.request('delete', self.url + f'issues/{issue.pk}/comments/{response.data["id"]}/')
+        issue.refresh_from_db()
+        self.assertEqual(issue.comment_count, 0)
+
+        self.assertEqual(self.request('delete', self.url + f'issues/{issue.pk}/').status_code, 204)
+        contributor = Contributor.objects.get(project=self.project, user=self.bob)
+        self.assertEqual(self.request('delete', self.url + f'contributors/{contributor.pk}/').status_code, 200)
+        self.assertCounts(1, 1)
+
+    def test_move(self):
+        issue = self.create_issue()
+        other = Project.objects.create(title="Autre", description="Description", type='iOs', author_user=self.alice)
+        issue.project = other
+        admin.site._registry[Issue].save_model(None, issue, None, change=True)
+        self.assertCounts(0, 2)
+        other.refresh_from_db()
+        self.assertEqual(other.issue_count, 1)
+
+    def test_user_delete(self):
+        self.bob.delete()
+        self.assertCounts(0, 1)
+
+
+class QueryCountTests(SoftDeskAPITestCase):
+    """Les listes font autant de requêtes SQL pour une ligne que pour plusieurs (query_plans des viewsets)."""
+
+    def get(self, url):
+        # Caches vidés : chaque mesure relit l'appartenance et recalcule la réponse
+        for cache in caches.all():
+            cache.clear()
+        response = self.request('get', url, user=self.bob)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        return len(queries)
+
+    def assertConstantQueries(self, url, grow, rows):
+        """Autant de requêtes pour url après grow(), qui porte la liste à rows éléments."""
+        expected = self.count(url)
+        grow()
+        with self.assertNumQueries(expected):
+            response = self.get(url)
+        self.assertEqual(response.data['count'], rows)
+
+    def test_project_list(self):
+        def grow():
+            for number in range(4):
+                self.request('post', '/softdesk_api/projects/', {
+                    'title': f"Projet {number}", 'description': "Description", 'type': 'iOs',
+                    'contributors': ['bob', 'carol'],
+                }, user=self.admin)
+        self.assertConstantQueries('/softdesk_api/projects/', grow, 5)
+
+    def test_contributor_list(self):
+        def grow():
+            users = ['carol'] + [create_user(f'user{number}').username for number in range(3)]
+            self.request('post', self.url + 'contributors/', {'contributors': users})
+        self.assertConstantQueries(self.url + 'contributors/', grow, 6)
+
+    def test_issue_list(self):
+        self.create_issue("Première")
+
+        def grow():
+            for number in range(5):
+                issue = self.create_issue(f"Issue {number}", user=self.bob, assigned_user=self.alice.pk)
+                self.request('post', self.url + f'issues/{issue.pk}/comments/', {'description': "Commentaire"})
+        self.assertConstantQueries(self.url + 'issues/', grow, 6)
+
+    def test_comment_list(self):
+        issue = self.create_issue()
+        url = self.url + f'issues/{issue.pk}/comments/'
+        self.request('post', url, {'description': "Premier"})
+
+        def grow():
+            for number, user in enumerate([self.alice, self.bob] * 2 + [self.alice]):
+                self.request('post', url, {'description': f"Commentaire {number}"}, user=user)
+        self.assertConstantQueries(url, grow, 6)
+
+
+class PaginationTests(SoftDeskAPITestCase):
+    """Pagination par numéro de page par défaut, par curseur sur demande (config/pagination.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.issues = [self.create_issue(f"Issue {i}") for i in range(7)]
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.request('get', url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def ids(self, page):
+        return [issue['id'] for issue in page['results']]
+
+    def test_page_number_by_default(self):
+        response = self.request('get', self.url + 'issues/')
+        self.assertEqual(response.data['count'], 7)
+        self.assertIn('page=2', response.data['next'])
+
+    def test_cursor_round_trip(self):
+        pages = self.walk(self.url + 'issues/?mode=cursor')
+        self.assertNotIn('count', pages[0])
+        expected = [issue.pk for issue in reversed(self.issues)]
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], expected)
+
+        # Le lien previous de la dernière page redonne l'avant-dernière
+        response = self.request('get', pages[-1]['previous'])
+        self.assertEqual(self.ids(response.data), self.ids(pages[-2]))
+
+    def test_cursor_tie_on_created_at(self):
+        # Mêmes created_at : la clé primaire départage, sans doublon ni omission
+        created_at = self.issues[0].created_at
+        Issue.objects.filter(pk__in=[issue.pk for issue in self.issues[:5]]).update(created_at=created_at)
+        pages = self.walk(self.url + 'issues/?mode=cursor&page_size=2')
+        ids = [pk for page in pages for pk in self.ids(page)]
+        self.assertEqual(ids, [issue.pk for issue in reversed(self.issues)])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.request('get', self.url + 'issues/?cursor=invalide').status_code, 404)
+
+
+class SearchTests(SoftDeskAPITestCase):
+    """Recherche plein texte FTS5 dans les issues et les commentaires (projects/search.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_issue("Échec de la synchronisation", description="Le serveur répond trop tard")
+        self.request('post', self.url + f'issues/{self.issue.pk}/comments/', {'description': "Délai dépassé"})
+
+    def search(self, text, user=None):
+        response = self.request('get', '/softdesk_api/search/', {'q': text}, user=user)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def issue_ids(self, text, user=None):
+        return [issue['id'] for issue in self.search(text, user)['issues']]
+
+    def test_accent_insensitive(self):
+        self.assertEqual(self.issue_ids("echec"), [self.issue.pk])
+        self.assertEqual(self.issue_ids("REPOND"), [self.issue.pk])
+        self.assertEqual(len(self.search("delai depasse")['comments']), 1)
+
+    def test_prefix(self):
+        self.assertEqual(self.issue_ids("synchro"), [self.issue.pk])
+        # Seul le dernier mot est un préfixe
+        self.assertEqual(self.issue_ids("synchro serveur"), [])
+
+    def test_fts_syntax_is_not_interpreted(self):
+        for text in ['"', '*', 'echec OR', 'NEAR(echec', 'echec" OR "x', '-echec', 'title:echec', '^', '()']:
+            with self.subTest(text=text):
+                self.search(text)
+        self.assertEqual(self.issue_ids('NEAR(echec'), [])
+        self.assertEqual(self.issue_ids('"echec"'), [self.issue.pk])
+
+    def test_non_member_gets_no_hits(self):
+        self.assertEqual(self.search("echec", user=self.carol), {'query': "echec", 'issues': [], 'comments': []})
+        self.assertEqual(self.issue_ids("echec", user=self.bob), [self.issue.pk])
+        self.assertEqual(self.issue_ids("echec", user=self.admin), [self.issue.pk])
+
+    def test_index_follows_title_change(self):
+        response = self.request('patch', self.url + f'issues/{self.issue.pk}/', {'title': "Panne du cache"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.issue_ids("synchronisation"), [])
+        self.assertEqual(self.issue_ids("panne"), [self.issue.pk])
+        # La description, inchangée, reste indexée
+        self.assertEqual(self.issue_ids("serveur"), [self.issue.pk])
+
+
+class IssueFilterTests(SoftDeskAPITestCase):
+    """Filtres et tris des issues, limités aux combinaisons indexées (projects/filters.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_issue("i0", status='À FAIRE', priority='FAIBLE', tag='BUG')
+        self.create_issue("i1", status='EN COURS', priority='ÉLEVÉE', tag='TÂCHE', assigned_user=self.bob.pk)
+        self.create_issue("i2", status='À FAIRE', priority='ÉLEVÉE', tag='BUG')
+
+    def titles(self, query):
+        response = self.request('get', self.url + 'issues/?page_size=20&' + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [issue['title'] for issue in response.data['results']]
+
+    def test_indexed_combinations(self):
+        self.assertEqual(self.titles('status=À FAIRE'), ['i2', 'i0'])
+        self.assertEqual(self.titles('status=À FAIRE&priority=ÉLEVÉE'), ['i2'])
+        self.assertEqual(self.titles(f'assigned_user={self.bob.pk}'), ['i1'])
+        self.assertEqual(self.titles('ordering=-priority'), ['i2', 'i1', 'i0'])
+
+    def test_unindexed_combination(self):
+        response = self.request('get', self.url + 'issues/?status=À FAIRE&tag=BUG')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_values(self):
+        self.assertEqual(self.request('get', self.url + 'issues/?status=inconnu').status_code, 400)
+        self.assertEqual(self.request('get', self.url + 'issues/?ordering=title').status_code, 400)
+
+    def test_multiple_values(self):
+        for query in ('status=À FAIRE,EN COURS&ordering=created_at', 'status=À FAIRE&status=EN COURS'):
+            response = self.request('get', self.url + 'issues/?' + query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('status', response.data)
+
+    def plan(self, query):
+        backend = IssueFilterBackend()
+        request = SimpleNamespace(query_params=QueryDict(query), user=self.alice)
+        queryset = backend.filter_queryset(request, Issue.objects.filter(project=self.project), view=None)
+        return plan_flags(explain(DEFAULT_DB_ALIAS, *queryset.query.sql_with_params()))
+
+    def test_accepted_combinations_need_no_sort(self):
+        values = {'status': 'À FAIRE', 'priority': 'ÉLEVÉE', 'tag': 'BUG', 'assigned_user': self.bob.pk}
+        combinations = IssueFilterBackend().supported_combinations()
+        self.assertTrue(combinations)
+        for combination in combinations:
+            for key in combination['tri']:
+                for ordering in (key, '-' + key):
+                    query = '&'.join([f"{field}={values[field]}" for field in combination['filtres']]
+                                     + [f'ordering={ordering}'])
+                    # Aucun USE TEMP B-TREE : l'index donne directement l'ordre demandé
+                    self.assertEqual(self.plan(query), [], query)
+        # Une liste IN suivie d'un tri, elle, n'est pas servie par issue_project_status_idx : soit un tri
+        # temporaire, soit un parcours de toutes les issues du projet par issue_project_created_idx
+        queryset = Issue.objects.filter(project=self.project, status__in=['À FAIRE', 'EN COURS']).order_by(
+            'created_at', 'pk')
+        lines = explain(DEFAULT_DB_ALIAS, *queryset.query.sql_with_params())
+        self.assertTrue('temp_sort' in plan_flags(lines) or 'issue_project_status_idx' not in ' '.join(lines), lines)
+
+
+class ContributorTests(SoftDeskAPITestCase):
+    """Ajout de contributeurs en masse (projects/services.py)."""
+
+    def add(self, usernames, user=None):
+        return self.request('post', self.url + 'contributors/', {'contributors': usernames}, user=user)
+
+    def test_add(self):
+        response = self.add(['carol', 'inconnu', 'bob'])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.data['details']), 3)
+        self.assertTrue(Contributor.objects.filter(project=self.project, user=self.carol).exists())
+
+    def test_nothing_added(self):
+        response = self.add(['bob', 'inconnu'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 2)
+
+    def test_empty_list_is_a_no_op(self):
+        response = self.add([])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['details'], [])
+        self.assertEqual(Contributor.objects.filter(project=self.project).count(), 2)
+
+    def test_only_author_adds(self):
+        self.assertEqual(self.add(['carol'], user=self.bob).status_code, 403)
+
+
+class IssueBatchTests(SoftDeskAPITestCase):
+    """Créations et modifications d'issues par lots (IssueViewSet.batch)."""
+
+    def test_mixed_statuses(self):
+        mine = self.create_issue("alice")
+        theirs = self.create_issue("bob", user=self.bob)
+        response = self.request('post', self.url + 'issues/batch/', {
+            'create': [
+                {'title': "Nouvelle", 'description': "Description"},
+                {'title': "Invalide", 'description': "Description", 'status': 'inconnu'},
+            ],
+            'update': [
+                {'id': mine.pk, 'status': 'TERMINÉ'},
+                {'id': 9999, 'status': 'TERMINÉ'},
+                {'id': theirs.pk, 'status': 'TERMINÉ'},
+            ],
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([item['status'] for item in response.data['create']], [201, 400])
+        self.assertEqual([item['status'] for item in response.data['update']], [200, 404, 403])
+
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual((mine.status, theirs.status), ('TERMINÉ', 'À FAIRE'))
+        self.assertTrue(Issue.objects.filter(pk=response.data['create'][0]['id'], author_user=self.alice).exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issue_count, 3)
+
+    def test_non_member_is_forbidden(self):
+        response = self.request('post', self.url + 'issues/batch/', {'create': [{'title': "x", 'description': "y"}]},
+                                user=self.carol)
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTests(SoftDeskAPITestCase):
+    """ETag et 304 des listes et des détails (config/conditional.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_issue(assigned_user=self.bob.pk)
+        self.urls = [
+            '/softdesk_api/projects/',
+            self.url,
+            self.url + 'issues/',
+            self.url + f'issues/{self.issue.pk}/',
+            self.url + f'issues/{self.issue.pk}/comments/',
+        ]
+
+    def get(self, url, etag=None, user=None):
+        extra = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.request('get', url, user=user, **extra)
+
+    def test_not_modified(self):
+        for url in self.urls:
+            etag = self.get(url)['ETag']
+            response = self.get(url, etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_list_validator_without_sql(self):
+        url = self.url + 'issues/'
+        etag = self.get(url)['ETag']
+        # Permissions et version des projets : lues dans le cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url, etag).status_code, 304)
+
+    def test_etag_changes_after_write(self):
+        etags = {url: self.get(url)['ETag'] for url in self.urls}
+        self.request('post', self.url + f'issues/{self.issue.pk}/comments/', {'description': "Commentaire"})
+        self.request('patch', self.url, {'title': "Renommé"})
+        for url, etag in etags.items():
+            self.assertEqual(self.get(url, etag).status_code, 200, url)
+
+    def test_etag_changes_after_user_deletion(self):
+        # author_user et assigned_user passent à NULL sans signal (SET_NULL)
+        urls = [self.url + 'issues/', self.url + f'issues/{self.issue.pk}/']
+        etags = {url: self.get(url)['ETag'] for url in urls}
+        self.bob.delete()
+        for url, etag in etags.items():
+            self.assertEqual(self.get(url, etag).status_code, 200, url)
+
+    def test_etag_depends_on_user(self):
+        url = self.url + 'issues/'
+        self.assertNotEqual(self.get(url)['ETag'], self.get(url, user=self.bob)['ETag'])
+
+
+class ResponseCacheTests(SoftDeskAPITestCase):
+    """Cache des réponses des listes, indexé par la version des projets (projects/cache.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_issue()
+
+    def test_hit_then_invalidated_by_write(self):
+        url = self.url + 'issues/'
+        stats = response_cache_stats()
+        first = self.request('get', url)
+        with self.assertNumQueries(0):
+            second = self.request('get', url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        current = response_cache_stats()
+        self.assertEqual(current['hits'] - stats['hits'], 1)
+        self.assertGreater(current['bytes_served'], stats['bytes_served'])
+
+        self.create_issue("Nouvelle", user=self.bob)
+        response = self.request('get', url)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_stats_view_is_per_worker(self):
+        self.assertEqual(self.request('get', '/softdesk_api/cache/stats/').status_code, 403)
+        response = self.request('get', '/softdesk_api/cache/stats/', user=self.admin)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['scope'], 'worker')
+        self.assertEqual(response.data['pid'], os.getpid())
+        self.assertEqual(response.data['responses'], response_cache_stats())
+
+    def test_entry_per_user(self):
+        url = self.url + 'issues/'
+        self.request('get', url)
+        stats = response_cache_stats()
+        self.request('get', url, user=self.bob)
+        self.assertEqual(response_cache_stats()['misses'] - stats['misses'], 1)
+
+    def test_projects_list_follows_membership(self):
+        self.assertNotIn('results', self.request('get', '/softdesk_api/projects/', user=self.carol).data)
+        self.request('post', self.url + 'contributors/', {'contributors': ['carol']})
+        response = self.request('get', '/softdesk_api/projects/', user=self.carol)
+        self.assertEqual([project['id'] for project in response.data['results']], [self.project.pk])
+
+
+class ExportTests(SoftDeskAPITestCase):
+    """Export NDJSON d'un projet (projects/exports.py)."""
+
+    def setUp(self):
+        super().setUp()
+        issue = self.create_issue()
+        self.request('post', self.url + f'issues/{issue.pk}/comments/', {'description': "Commentaire"})
+
+    def lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export(self):
+        response = self.request('get', self.url + 'export/', user=self.bob)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        models = [line['model'] for line in self.lines(b''.join(response.streaming_content))]
+        self.assertEqual(models, ['user', 'user', 'project', 'contributor', 'contributor', 'issue', 'comment'])
+
+    def test_non_member_is_forbidden(self):
+        response = self.request('get', self.url + 'export/', user=self.carol)
+        self.assertEqual(response.status_code, 403)
+
+    def test_gzip(self):
+        plain = b''.join(self.request('get', self.url + 'export/').streaming_content)
+        response = self.request('get', self.url + 'export/?compress=gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('project-', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    async def test_async_iterator_under_asgi(self):
+        # Itérateur synchrone : Django le lirait en entier avant d'envoyer la réponse
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.alice)))()
+        response = await self.async_client.get(self.url + 'export/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(self.lines(content)[-1]['description'], "Commentaire")
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True)
+class RequestTimingTests(SoftDeskAPITestCase):
+    """En-tête Server-Timing (config/timing.py)."""
+
+    def test_server_timing_counts_queries(self):
+        self.create_issue()
+        self.client.force_authenticate(self.bob)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url + 'issues/')
+        self.assertEqual(response.status_code, 200)
+        entries = [entry.strip() for entry in response['Server-Timing'].split(',')]
+        self.assertRegex(entries[0], r'^db;dur=\d+\.\d{2};desc="(\d+) queries"$')
+        self.assertEqual(entries[0].split('"')[1], f'{len(queries)} queries')
+        self.assertGreater(len(queries), 0)
+        self.assertTrue(entries[-1].startswith('total;dur='))
+
+    def test_disabled_by_default(self):
+        with self.settings(REQUEST_TIMING_ENABLED=False):
+            # Client neuf : il charge les middlewares avec ce réglage
+            self.client = self.client_class()
+            self.assertNotIn('Server-Timing', self.request('get', self.url))
+
+
+class MetricsTests(SoftDeskAPITestCase):
+    """Métriques Prometheus (config/metrics.py)."""
+
+    def setUp(self):
+        # Réglages en place avant la première requête : le client charge alors les middlewares
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=directory.name, METRICS_TOKEN='collector-token'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+    def metrics(self, authorization):
+        self.client.force_authenticate(None)
+        return self.client.get('/softdesk_api/metrics/', HTTP_AUTHORIZATION=authorization)
+
+    def test_token_is_accepted(self):
+        self.request('get', '/softdesk_api/projects/')
+        response = self.metrics('Bearer collector-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'softdesk_http_requests_total{route="projects",method="GET",status="200"} ', response.content.decode()
+        )
+
+    def test_wrong_token_is_rejected(self):
+        self.assertEqual(self.metrics('Bearer wrong-token').status_code, 401)
+        self.assertEqual(self.metrics('').status_code, 401)
+
+    def test_reserved_to_admins(self):
+        self.assertEqual(self.request('get', '/softdesk_api/metrics/', user=self.bob).status_code, 403)
+        self.assertEqual(self.request('get', '/softdesk_api/metrics/', user=self.admin).status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        # Une requête de 3 ms, deux de 30 ms, une de 20 s (au-delà du dernier intervalle)
+        durations = [1, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 1, 20.063]
+        metrics = SimpleNamespace(requests={}, throttled={}, durations={('projects', 'GET'): durations}, queries={})
+        lines = render_prometheus(metrics).splitlines()
+        labels = 'route="projects",method="GET"'
+        buckets = [line for line in lines if line.startswith('softdesk_http_request_duration_seconds_bucket')]
+        self.assertEqual(buckets[0], f'softdesk_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1')
+        self.assertEqual(buckets[2], f'softdesk_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 1')
+        self.assertEqual(buckets[3], f'softdesk_http_request_duration_seconds_bucket{{{labels},le="0.05"}} 3')
+        self.assertEqual(buckets[-2], f'softdesk_http_request_duration_seconds_bucket{{{labels},le="10.0"}} 3')
+        self.assertEqual(buckets[-1], f'softdesk_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4')
+        self.assertIn(f'softdesk_http_request_duration_seconds_sum{{{labels}}} 20.063', lines)
+        self.assertIn(f'softdesk_http_request_duration_seconds_count{{{labels}}} 4', lines)
+
+
+class AsyncReadURLConf:
+    """URLs des viewsets avec ASYNC_READ_VIEWS (config/urls.py), sans relire le module."""
+    urlpatterns = [path('softdesk_api/', include(async_read_urls(viewset_urls)))]
+
+
+class AsyncReadViewTests(SoftDeskAPITestCase):
+    """Les vues async de ASYNC_READ_VIEWS répondent comme les viewsets synchrones (projects/async_views.py)."""
+
+    async def get(self, url, user, urlconf=None):
+        for cache in caches.all():
+            await cache.aclear()
+        token = await sync_to_async(lambda: str(AccessToken.for_user(user)))()
+        if urlconf is None:
+            return await self.async_client.get(url, headers={'Authorization': f'Bearer {token}'})
+        with override_settings(ROOT_URLCONF=urlconf):
+            self.assertTrue(iscoroutinefunction(resolve(url).func))
+            return await self.async_client.get(url, headers={'Authorization': f'Bearer {token}'})
+
+    async def assertSameResponse(self, url, user):
+        expected = await self.get(url, user)
+        response = await self.get(url, user, AsyncReadURLConf)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    async def test_list(self):
+        for title in ("Première", "Deuxième"):
+            await sync_to_async(self.create_issue)(title)
+        response = await self.assertSameResponse(self.url + 'issues/', self.bob)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([issue['title'] for issue in response.json()['results']], ["Deuxième", "Première"])
+
+    async def test_retrieve(self):
+        issue = await sync_to_async(self.create_issue)()
+        response = await self.assertSameResponse(self.url + f'issues/{issue.pk}/', self.bob)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], issue.pk)
+
+    async def test_non_member_is_forbidden(self):
+        response = await self.assertSameResponse(self.url + 'issues/', self.carol)
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class GenerateDatasetTests(TestCase):
+    """Jeu de données synthétique (commande generate_dataset, projects/datasets.py)."""
+    options = {'users': 12, 'projects': 3, 'issues': 20, 'comments': 40, 'max_contributors': 4, 'seed': 7}
+
+    def generate(self, **options):
+        call_command('generate_dataset', stdout=io.StringIO(), **{**self.options, **options})
+
+    def snapshot(self):
+        return {
+            'users': list(User.objects.order_by('username').values_list('username', 'email', 'dob')),
+            'projects': list(Project.objects.order_by('title').values_list(
+                'title', 'description', 'type', 'author_user__username', 'created_at', 'issue_count',
+                'contributor_count',
+            )),
+            'contributors': list(Contributor.objects.order_by('project__title', 'user__username').values_list(
+                'project__title', 'user__username',
+            )),
+            'issues': list(Issue.objects.order_by('created_at', 'title').values_list(
+                'project__title', 'title', 'description', 'author_user__username', 'assigned_user__username',
+                'tag', 'priority', 'status', 'created_at', 'comment_count',
+            )),
+            'comments': list(Comment.objects.order_by('created_at', 'description').values_list(
+                'issue__title', 'author_user__username', 'description', 'created_at',
+            )),
+        }
+
+    def test_same_seed_same_data(self):
+        with transaction.atomic():
+            self.generate()
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        self.assertEqual(User.objects.count(), 0)
+
+        self.generate()
+        self.assertEqual(
+            {model: len(rows) for model, rows in first.items()},
+            {'users': 12, 'projects': 3, 'contributors': len(first['contributors']), 'issues': 20, 'comments': 40},
+        )
+        self.assertTrue(3 <= len(first['contributors']) <= 12)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_other_seed_other_data(self):
+        with transaction.atomic():
+            self.generate()
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        self.generate(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_projects_need_a_contributor(self):
+        with self.assertRaisesMessage(CommandError, '--max-contributors'):
+            self.generate(max_contributors=0)
+        self.assertEqual(Project.objects.count(), 0)
+
+
+class ImportTests(SoftDeskAPITestCase):
+    """Import en masse par lots, avec point de reprise (projects/imports.py)."""
+
+    records = [
+        {'model': 'project', 'id': 1, 'title': "Importé", 'type': 'iOs', 'author_user': 'alice'},
+        {'model': 'contributor', 'user': 1, 'username': 'alice'},
+        {'model': 'contributor', 'user': 2, 'username': 'bob'},
+        {'model': 'contributor', 'user': 2, 'username': 'bob'},
+        {'model': 'issue', 'id': 10, 'title': "Première", 'author_user': 'bob'},
+        {'model': 'issue', 'id': 11, 'title': "Seconde", 'author_user': 'bob'},
+        {'model': 'comment', 'issue': 10, 'description': "Commentaire"},
+        {'model': 'comment', 'issue': 11, 'description': "Commentaire"},
+    ]
+
+    def run_import(self, checkpoint):
+        importer = Importer(checkpoint, batch_size=1)
+        importer.run(self.records)
+        importer.finish()
+        return importer
+
+    def imported(self):
+        return Project.objects.get(title="Importé")
+
+    def test_import(self):
+        importer = self.run_import(Checkpoint('import'))
+        self.assertEqual(importer.created, {'user': 0, 'project': 1, 'contributor': 2, 'issue': 2, 'comment': 2})
+        project = self.imported()
+        self.assertEqual((project.contributor_count, project.issue_count), (2, 2))
+
+    def test_existing_contributor_is_not_counted(self):
+        project = Project.objects.create(title="Cible", description="", type='iOs', author_user=self.alice)
+        Contributor.objects.create(project=project, user=self.bob)
+        checkpoint = Checkpoint('import')
+        checkpoint.apply({'line': 1, 'ids': {'project': [['1', project.pk]]}, 'project': '1'})
+        importer = Importer(checkpoint)
+        importer.run(self.records[:4])
+        self.assertEqual(importer.created['contributor'], 1)
+        self.assertEqual(Contributor.objects.filter(project=project).count(), 2)
+
+    def test_resume_after_failed_batch(self):
+        save = Checkpoint.save
+
+        def fail_on_comments(checkpoint, entry):
+            if entry['line'] >= 7:
+                raise OSError("disque plein")
+            save(checkpoint, entry)
+
+        with mock.patch.object(Checkpoint, 'save', fail_on_comments):
+            with self.assertRaises(OSError):
+                self.run_import(Checkpoint('import'))
+        # Le lot du point de reprise manqué est annulé avec lui
+        self.assertFalse(Comment.objects.filter(issue__project=self.imported()).exists())
+
+        checkpoint = Checkpoint('import')
+        checkpoint.load()
+        self.assertEqual(checkpoint.line, 6)
+        importer = self.run_import(checkpoint)
+        self.assertEqual(importer.created['comment'], 2)
+        self.assertEqual(Issue.objects.filter(project=self.imported()).count(), 2)
+        self.assertEqual(Comment.objects.filter(issue__project=self.imported()).count(), 2)
+
+
+# Le thread écrivain a sa propre connexion : les tests ne tournent pas dans une transaction
+@override_settings(
+    CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], WRITE_QUEUE_ENABLED=True,
+)
+class WriteQueueTests(SoftDeskFixtures, APITransactionTestCase):
+    """File d'écriture (config/writer.py)."""
+
+    def tearDown(self):
+        stop_writer()
+
+    def test_failing_write_rolled_back_alone(self):
+        # Attente longue : les trois écritures, en file avant le premier lot, sont validées ensemble
+        queued = Writer(max_wait=1.0)
+        self.addCleanup(queued.stop)
+
+        def comment(description):
+            return Comment.objects.create(issue=issue, author_user=self.alice, description=description)
+
+        def failing():
+            comment("Annulé")
+            raise ValueError("Écriture refusée")
+
+        issue = self.create_issue()
+        futures = [Future() for _ in range(3)]
+        for future, (function, args) in zip(futures, [(comment, ("Premier",)), (failing, ()), (comment, ("Dernier",))]):
+            queued.queue.put((future, function, args))
+
+        self.assertEqual(futures[0].result(5).description, "Premier")
+        with self.assertRaisesMessage(ValueError, "Écriture refusée"):
+            futures[1].result(5)
+        self.assertEqual(futures[2].result(5).description, "Dernier")
+        self.assertEqual(queued.batches, 1)
+        self.assertEqual(
+            sorted(Comment.objects.values_list('description', flat=True)), ["Dernier", "Premier"]
+        )
+
+    def test_writer_survives_an_error(self):
+        queued = writer()
+        with mock.patch.object(Writer, 'commit', side_effect=RuntimeError("Lot")), \
+                self.assertLogs('softdesk.writer', 'ERROR'):
+            with self.assertRaisesMessage(RuntimeError, "Lot"):
+                queued.submit(lambda: None)
+        self.assertIs(writer(), queued)
+        self.assertEqual(queued.submit(lambda: 42), 42)
+
+    def test_dead_writer_is_replaced(self):
+        queued = writer()
+        queued.stop()
+        self.assertIsNot(writer(), queued)
+        self.assertTrue(writer().alive())
+
+    @override_settings(WRITE_QUEUE_TIMEOUT=0.1)
+    def test_timeout_is_503(self):
+        release = threading.Event()
+        blocker = threading.Thread(target=writer().submit, args=(release.wait,))
+        blocker.start()
+        self.addCleanup(blocker.join)
+        self.addCleanup(release.set)
+
+        response = self.request('post', self.url + 'issues/', {
+            'title': "Issue", 'description': "Description", 'tag': 'BUG', 'priority': 'ÉLEVÉE', 'status': 'À FAIRE',
+        })
+        self.assertEqual(response.status_code, 503, response.content)
+        release.set()
+        blocker.join()
+        # Annulée avant d'avoir commencé : rien n'est écrit
+        self.assertFalse(Issue.objects.exists())
+        self.assertEqual(response.data['detail'].code, WriteQueueTimeout.default_code)
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConcurrentWriteTests(SoftDeskFixtures, APITransactionTestCase):
+    """
+    Écritures de deux connexions sur une copie WAL de la base de test
+    (config/sqlite, write_atomic()) : la base de test en mémoire n'a pas les verrous du WAL.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_issue("Supprimée")
+        self.other_issue = self.create_issue("Commentée")
+
+        directory = tempfile.TemporaryDirectory(prefix='softdesk-tests-')
+        self.addCleanup(directory.cleanup)
+        self.database = str(Path(directory.name) / 'db.sqlite3')
+        target = sqlite3.connect(self.database)
+        connections['default'].connection.backup(target)
+        target.close()
+
+        database = connections.configure_settings(
+            {'default': {**settings.DATABASES['default'], 'NAME': self.database}}
+        )['default']
+        # Les requêtes de l'API passent par une connexion à la copie
+        test_connection = connections['default']
+        connections['default'] = load_backend(database['ENGINE']).DatabaseWrapper(database, DEFAULT_DB_ALIAS)
+        self.addCleanup(setattr, connections._connections, 'default', test_connection)
+        self.addCleanup(connections['default'].close)
+
+    def comment_from_other_connection(self, results):
+        # Autre processus : sqlite3 seul, qui attend le verrou d'écriture comme busy_timeout
+        other = sqlite3.connect(self.database, timeout=5)
+        try:
+            with other:
+                other.execute(
+                    "INSERT INTO projects_comment (description, author_user_id, issue_id, created_at, updated_at)"
+                    " VALUES ('Concurrent', ?, ?, datetime('now'), datetime('now'))",
+                    [self.bob.pk, self.other_issue.pk]
+                )
+            results.append("ok")
+        except sqlite3.Error as e:
+            results.append(e)
+        finally:
+            other.close()
+
+    def test_delete_survives_concurrent_insert(self):
+        results = []
+        writers = []
+
+        def concurrent_insert(sender, origin=None, **kwargs):
+            # Entre les lectures de la suppression (cascade) et son premier DELETE
+            if sender is Issue and not writers:
+                writer_thread = threading.Thread(target=self.comment_from_other_connection, args=(results,))
+                writers.append(writer_thread)
+                writer_thread.start()
+                writer_thread.join(0.2)
+
+        pre_delete.connect(concurrent_insert)
+        self.addCleanup(pre_delete.disconnect, concurrent_insert)
+
+        response = self.request('delete', self.url + f'issues/{self.issue.pk}/')
+        writers[0].join()
+        self.assertEqual(response.status_code, 204, response.content)
+        # L'autre écrivain a attendu la fin de la suppression, puis a validé
+        self.assertEqual(results, ["ok"])
+        self.assertFalse(Issue.objects.filter(pk=self.issue.pk).exists())
+        self.assertTrue(Comment.objects.filter(issue=self.other_issue, description="Concurrent").exists())
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    """Pragmas, relance sur « database is locked », BEGIN IMMEDIATE et contrôle du fichier (config/sqlite)."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory(prefix='softdesk-tests-')
+        self.addCleanup(directory.cleanup)
+        self.database = str(Path(directory.name) / 'db.sqlite3')
+        with sqlite3.connect(self.database) as setup:
+            setup.execute('CREATE TABLE item (name TEXT)')
+        setup.close()
+
+    def connection(self, **options):
+        """Connexion du backend à la base temporaire, OPTIONS des settings complétées par options."""
+        database = connections.configure_settings({'default': {
+            **settings.DATABASES['default'],
+            'NAME': self.database,
+            'OPTIONS': {**settings.DATABASES['default']['OPTIONS'], **options},
+        }})['default']
+        wrapper = load_backend(database['ENGINE']).DatabaseWrapper(database, 'sqlite_backend_tests')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def lock(self):
+        """Autre connexion qui tient le verrou d'écriture ; retourne la fonction qui le libère."""
+        other = sqlite3.connect(self.database, timeout=0, isolation_level=None)
+        other.execute('BEGIN IMMEDIATE')
+        self.addCleanup(other.close)
+        return lambda *args: other.execute('COMMIT')
+
+    def test_pragmas_on_new_connection(self):
+        pragmas = settings.DATABASES['default']['OPTIONS']['pragmas']
+        with self.connection().cursor() as cursor:
+            values = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+        levels = {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3}
+        self.assertEqual(values, {
+            'journal_mode': 'wal',
+            'synchronous': levels[str(pragmas['synchronous']).upper()],
+            'busy_timeout': pragmas['busy_timeout'],
+        })
+
+    def test_busy_statement_is_retried(self):
+        wrapper = self.connection(busy_retries=3, busy_backoff=0.001, pragmas={'busy_timeout': 0})
+        wrapper.ensure_connection()
+        # Le verrou est libéré pendant la première attente : la deuxième tentative passe
+        with mock.patch('config.sqlite.base.time.sleep', side_effect=self.lock()) as sleep:
+            with wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES ('relancé')")
+        self.assertEqual(sleep.call_count, 1)
+        with wrapper.cursor() as cursor:
+            self.assertEqual(cursor.execute('SELECT name FROM item').fetchall(), [('relancé',)])
+
+    def test_busy_statement_gives_up(self):
+        wrapper = self.connection(busy_retries=2, busy_backoff=0.001, pragmas={'busy_timeout': 0})
+        wrapper.ensure_connection()
+        self.lock()
+        with mock.patch('config.sqlite.base.time.sleep') as sleep:
+            with self.assertRaisesMessage(OperationalError, 'database is locked'), wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES ('refusé')")
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_busy_statement_in_transaction_is_not_retried(self):
+        wrapper = self.connection(busy_retries=3, busy_backoff=0.001, pragmas={'busy_timeout': 0})
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT * FROM item')
+            self.lock()
+            with mock.patch('config.sqlite.base.time.sleep') as sleep:
+                with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                    cursor.execute("INSERT INTO item VALUES ('refusé')")
+            cursor.execute('ROLLBACK')
+        sleep.assert_not_called()
+
+    def test_begin_immediate_takes_the_write_lock(self):
+        connections['sqlite_backend_tests'] = self.connection(pragmas={'busy_timeout': 0})
+        self.addCleanup(connections.__delitem__, 'sqlite_backend_tests')
+        other = sqlite3.connect(self.database, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+
+        # Transaction différée : l'autre connexion peut encore écrire
+        with transaction.atomic(using='sqlite_backend_tests'):
+            other.execute("INSERT INTO item VALUES ('atomic')")
+
+        with write_atomic(using='sqlite_backend_tests'):
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute("INSERT INTO item VALUES ('write_atomic')")
+        self.assertFalse(connections['sqlite_backend_tests'].begin_immediate)
+
+    def test_replaced_database_file_is_not_usable(self):
+        wrapper = self.connection()
+        wrapper.ensure_connection()
+        self.assertTrue(wrapper.is_usable())
+
+        restored = self.database + '.restored'
+        sqlite3.connect(restored).close()
+        os.replace(restored, self.database)
+        self.assertFalse(wrapper.is_usable())
+        wrapper.close()
+
+        wrapper.ensure_connection()
+        self.assertTrue(wrapper.is_usable())
+        os.remove(self.database)
+        self.assertFalse(wrapper.is_usable())
@@ -1,32 +1,78 @@
+import os
+
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
 from .models import User, Project, Contributor, Issue, Comment
 from .serializers import (
     ProjectSerializer,
     ContributorSerializer,
     IssueSerializer,
+    IssueBatchSerializer,
+    IssueBatchItemSerializer,
     CommentSerializer
 )
 from .permissions import (
+    IsAdmin,
+    IsAdminOrMetricsCollector,
     IsAuthorOrIsAdmin,
     IsProjectContributorOrIsAdmin
 )
+from .context import RequestContextMixin
+from .cache import (
+    ResponseCacheMixin,
+    aget_project_versions_token,
+    get_project_versions_token,
+    membership_cache_stats,
+    response_cache_stats
+)
+from .search import search_issues, search_comments
+from .filters import IssueFilterBackend
+from .counters import track_created, track_deleted
+from .services import apply_issue_batch
+from .exports import aiter_chunks, export_project
+from config.query_plans import QueryPlan, QueryPlanMixin
+from config.conditional import ConditionalGetMixin, latest_update, most_recent
+from config.metrics import (
+    CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE,
+    MetricsTokenAuthentication,
+    PrometheusRenderer,
+    collect,
+    render_prometheus,
+)
+from config.timing import PhaseTimingMixin
+from config.writer import submit_write, write_atomic
 from config.pagination import (
-    UserPagination,
-    ProjectPagination,
-    IssuePagination,
-    CommentPagination
+    EmptyListMessageMixin,
+    ProjectHybridPagination,
+    ContributorHybridPagination,
+    IssueHybridPagination,
+    CommentHybridPagination
 )
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(PhaseTimingMixin, RequestContextMixin, QueryPlanMixin, ResponseCacheMixin,
+                     ConditionalGetMixin, EmptyListMessageMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
-    pagination_class = ProjectPagination
+    pagination_class = ProjectHybridPagination
+    context_lookup = 'project'
+    empty_list_message = "Vous n'êtes contributeur d'aucun projet pour l'instant."
+    query_plans = {
+        'list': QueryPlan(only=['id', 'title', 'type', 'author_user']),
+        'default': QueryPlan(prefetch_related=[
+            Prefetch('contributor_set', queryset=Contributor.objects.only('id', 'project')),
+            Prefetch('issue_set', queryset=Issue.objects.only('id', 'project')),
+        ]),
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -37,7 +83,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['list', 'create']:
             permission_classes = [IsAuthenticated]
-        elif self.action in ['retrieve']:
+        elif self.action in ['retrieve', 'export']:
             permission_classes = [IsAuthenticated, IsProjectContributorOrIsAdmin]
         elif self.action in ['update', 'destroy']:
             permission_classes = [IsAuthenticated, IsAuthorOrIsAdmin]
@@ -46,27 +92,96 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        user = self.request.user
+        context = self.request_context
         # Si admin, tous les projets
-        if user.is_superuser:
-            return Project.objects.all()
+        if context.is_admin:
+            queryset = Project.objects.all()
         # Autrement, ne lister que les projets où ils sont contributeurs
-        return Project.objects.filter(contributor__user=user).distinct()
+        else:
+            queryset = Project.objects.filter(pk__in=context.project_ids)
+        return self.apply_query_plan(queryset)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return Response({"message": "Vous n'êtes contributeur d'aucun projet pour l'instant."})
-        return super().list(request, *args, **kwargs)
+    def get_object(self):
+        # Le projet a déjà été chargé par le contexte lors des permissions
+        context = self.request_context
+        project = context.project
+        if project is None or not (context.is_admin or context.is_contributor):
+            raise Http404
+        self.check_object_permissions(self.request, project)
+        return project
+
+    def get_list_version(self):
+        context = self.request_context
+        # L'admin voit tous les projets ; les autres, ceux dont ils sont contributeurs
+        if context.is_admin:
+            return get_project_versions_token([], projects_list=True)
+        return get_project_versions_token(context.project_ids)
+
+    async def aget_list_version(self):
+        context = self.request_context
+        if context.is_admin:
+            return await aget_project_versions_token([], projects_list=True)
+        return await aget_project_versions_token(context.project_ids)
+
+    def _detail_validator_dates(self, project):
+        # Les ids des contributeurs et des issues font partie de la représentation
+        return Project.objects.filter(pk=project.pk).values_list(
+            latest_update(Contributor, 'project'),
+            latest_update(Issue, 'project'),
+        )
+
+    def _detail_validator(self, project, contributors, issues):
+        return (
+            most_recent(project.updated_at, contributors, issues),
+            [project.pk, project.contributor_count, project.issue_count, contributors, issues]
+        )
+
+    def get_detail_validator(self, project):
+        return self._detail_validator(project, *self._detail_validator_dates(project).get())
+
+    async def aget_detail_validator(self, project):
+        return self._detail_validator(project, *await self._detail_validator_dates(project).aget())
 
     def perform_create(self, serializer):
         serializer.save(author_user=self.request.user)
 
+    def perform_destroy(self, instance):
+        # Contributeurs, issues et commentaires sont lus puis supprimés en cascade
+        with write_atomic():
+            instance.delete()
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        """
+        Exporte le projet, ses contributeurs, ses issues et leurs commentaires
+        en NDJSON, au fil de l'eau. ?compress=gzip compresse l'export.
+        """
+        project = self.get_object()
+        compression = request.query_params.get('compress')
+        if compression not in (None, '', 'gzip'):
+            raise ValidationError({"compress": "Valeur possible : gzip."})
+        compress = compression == 'gzip'
+
+        filename = f"project-{project.pk}.ndjson" + (".gz" if compress else "")
+        chunks = export_project(project, compress=compress)
+        if isinstance(request._request, ASGIRequest):
+            # Itérateur async : servi au fil de l'eau, sans être lu d'abord en mémoire
+            chunks = aiter_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks,
+            content_type='application/gzip' if compress else 'application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-class ContributorViewSet(viewsets.ModelViewSet):
+
+class ContributorViewSet(PhaseTimingMixin, RequestContextMixin, QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = ContributorSerializer
     queryset = Contributor.objects.all()
-    pagination_class = UserPagination
+    pagination_class = ContributorHybridPagination
+    query_plans = {
+        'default': QueryPlan(select_related=['user']),
+    }
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -88,75 +203,49 @@ class ContributorViewSet(viewsets.ModelViewSet):
         Retourne les contributeurs d'un projet spécifique.
         Seuls les contributeurs du projet ou l'administrateur peuvent voir cette liste.
         """
-        project_pk = self.kwargs['project_pk']
-
-        if self.request.user.is_superuser:
-            return Contributor.objects.filter(project_id=project_pk)
+        context = self.request_context
 
-        is_contributor = Contributor.objects.filter(
-            project_id=project_pk,
-            user=self.request.user
-        ).exists()
-
-        if is_contributor:
-            return Contributor.objects.filter(project_id=project_pk)
+        if context.is_admin or context.is_contributor:
+            return self.apply_query_plan(Contributor.objects.filter(project_id=context.project_pk))
 
         # Si l'utilisateur n'est ni contributeur ni admin, aucune permission
         raise PermissionDenied("Vous devez être contributeur du projet pour accéder à ces informations.")
 
-    def perform_create(self, serializer):
-        project = get_object_or_404(Project, pk=self.kwargs['project_pk'])
-
-        # Vérifie si l'utilisateur est l'auteur du projet ou un administrateur
-        if not (self.request.user == project.author_user or self.request.user.is_superuser):
-            raise PermissionDenied("Vous devez être l'auteur du projet pour ajouter des contributeurs.")
-
-        # Sauvegarde le contributeur
-        serializer.save(project=project)
-
-        # Liste des utilisateurs à ajouter
-        contributors_usernames = self.request.data.get('contributors', [])
-
-        messages = []
-
-        for username in contributors_usernames:
-            try:
-                user = User.objects.get(username=username)
-                if user != serializer.validated_data['author_user']:
-                    Contributor.objects.create(
-                        user=user,
-                        project=serializer.validated_data['project']
-                    )
-                    messages.append(
-                        f"Le contributeur '{username}' a bien été ajouté au projet "
-                        f"{serializer.validated_data['project'].id}."
-                    )
-                else:
-                    messages.append(f"Le contributeur '{username}' est déjà l'auteur du projet.")
-            except User.DoesNotExist:
-                messages.append(f"Utilisateur '{username}' non trouvé.")
-            except Exception as e:
-                messages.append(f"Erreur lors de l'ajout du contributeur '{username}': {str(e)}")
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
 
-        # Retourne les messages et les données
+        # Retourne le résultat de chaque username
         return Response(
             {
                 "message": "Contributeurs ajoutés avec succès.",
-                "details": messages,
+                "details": serializer.changes.messages(),
             },
             status=status.HTTP_201_CREATED
         )
 
+    def perform_create(self, serializer):
+        context = self.request_context
+        project = context.get_project_or_404()
+
+        # Vérifie si l'utilisateur est l'auteur du projet ou un administrateur
+        if not (context.is_project_author or context.is_admin):
+            raise PermissionDenied("Vous devez être l'auteur du projet pour ajouter des contributeurs.")
+
+        # Ajoute les contributeurs en une seule transaction (projects/services.py)
+        serializer.save(project=project)
+
     def destroy(self, request, *args, **kwargs):
         # Récupérer l'objet Contributeur
         contributor = self.get_object()
 
         # Vérifier si l'utilisateur actuel est l'auteur du projet
-        if contributor.project.author_user != request.user:
+        if not self.request_context.is_author_of(contributor):
             raise PermissionDenied("Seul l'auteur du projet peut supprimer des contributeurs.")
 
         # Empêcher la suppression de l'auteur lui-même
-        if contributor.user == request.user:
+        if contributor.user_id == request.user.pk:
             raise PermissionDenied("Vous ne pouvez pas vous retirer en tant qu'auteur du projet.")
 
         # Effectuer la suppression
@@ -168,11 +257,27 @@ class ContributorViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    def perform_destroy(self, instance):
+        with write_atomic():
+            instance.delete()
+            track_deleted(instance)
+
 
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(PhaseTimingMixin, RequestContextMixin, QueryPlanMixin, ResponseCacheMixin,
+                   ConditionalGetMixin, EmptyListMessageMixin, viewsets.ModelViewSet):
     serializer_class = IssueSerializer
     permission_classes = [IsAuthenticated, IsProjectContributorOrIsAdmin]
-    pagination_class = IssuePagination
+    pagination_class = IssueHybridPagination
+    filter_backends = [IssueFilterBackend]
+    context_lookup = 'issue'
+    empty_list_message = "Il n'y a pas d'issue ici."
+    query_plans = {
+        # priority : clé de tri possible, lue par la pagination par curseur
+        'list': QueryPlan(only=['id', 'title', 'status', 'priority', 'author_user', 'project', 'created_at']),
+        'default': QueryPlan(prefetch_related=[
+            Prefetch('comment_set', queryset=Comment.objects.only('id', 'issue')),
+        ]),
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -181,7 +286,8 @@ class IssueViewSet(viewsets.ModelViewSet):
         return context
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'create']:
+        # batch : les droits d'auteur sont vérifiés élément par élément
+        if self.action in ['list', 'retrieve', 'create', 'batch']:
             permission_classes = [IsAuthenticated, IsProjectContributorOrIsAdmin]
         elif self.action in ['destroy']:
             permission_classes = [IsAuthenticated, IsAuthorOrIsAdmin]
@@ -190,47 +296,146 @@ class IssueViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        project_pk = self.kwargs['project_pk']
-        # Si admin, toutes les issues, sinon vérifier
-        if self.request.user.is_superuser:
-            return Issue.objects.filter(project_id=project_pk)
-
-        return Issue.objects.filter(
-            project_id=project_pk,
-            project__contributor__user=self.request.user
-        )
+        context = self.request_context
+        # Si admin ou contributeur, toutes les issues du projet
+        if context.is_admin or context.is_contributor:
+            return self.apply_query_plan(Issue.objects.filter(project_id=context.project_pk))
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return Response(
-                {"message": "Il n'y a pas d'issue ici."},
-                status=200
-            )
-        return super().list(request, *args, **kwargs)
+        return Issue.objects.none()
+
+    def get_object(self):
+        # L'issue a déjà été chargée (avec son projet) par le contexte
+        context = self.request_context
+        issue = context.issue
+        if issue is None or not (context.is_admin or context.is_contributor):
+            raise Http404
+        self.check_object_permissions(self.request, issue)
+        return issue
+
+    def get_list_version(self):
+        return get_project_versions_token([self.request_context.project_pk])
+
+    async def aget_list_version(self):
+        return await aget_project_versions_token([self.request_context.project_pk])
+
+    def _detail_validator_dates(self, issue):
+        # Les ids des commentaires font partie de la représentation
+        return Issue.objects.filter(pk=issue.pk).values_list(latest_update(Comment, 'issue'), flat=True)
+
+    def get_detail_validator(self, issue):
+        comments = self._detail_validator_dates(issue).get()
+        return most_recent(issue.updated_at, comments), [issue.pk, issue.comment_count, comments]
+
+    async def aget_detail_validator(self, issue):
+        comments = await self._detail_validator_dates(issue).aget()
+        return most_recent(issue.updated_at, comments), [issue.pk, issue.comment_count, comments]
 
     def perform_create(self, serializer):
-        project = get_object_or_404(Project, pk=self.kwargs['project_pk'])
-        serializer.save(
-            project=project,
-            author_user=self.request.user
-        )
+        # Projet lu ici : seule l'écriture passe par la file d'écriture (config/writer.py)
+        submit_write(self._create_issue, serializer, self.request_context.get_project_or_404())
+
+    def _create_issue(self, serializer, project):
+        issue = serializer.save(project=project, author_user=self.request.user)
+        track_created(issue)
+
+    def perform_destroy(self, instance):
+        # Les commentaires sont supprimés en cascade avec l'issue
+        with write_atomic():
+            instance.delete()
+            track_deleted(instance)
 
     def update(self, request, *args, **kwargs):
         # Seul l'auteur de l'issue ou l'admin peut modifier
         instance = self.get_object()
-        if not (request.user.is_superuser or instance.author_user == request.user):
+        if not (request.user.is_superuser or instance.author_user_id == request.user.pk):
             return Response(
                 {"detail": "Vous n'êtes pas autorisé à modifier cette issue."},
                 status=status.HTTP_403_FORBIDDEN
             )
         return super().update(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request, *args, **kwargs):
+        """
+        Crée et modifie des issues par lots :
+        {"create": [{...}, ...], "update": [{"id": ..., "status": "TERMINÉ"}, ...]}.
+        Les éléments valides sont appliqués dans une seule transaction ; la réponse
+        donne le statut de chaque élément, dans l'ordre de la requête.
+        """
+        context = self.request_context
+        project = context.get_project_or_404()
+        batch = IssueBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        results = {'create': [], 'update': []}
+        valid = {'create': [], 'update': []}
+        for operation in ('create', 'update'):
+            for item in batch.validated_data[operation]:
+                serializer = IssueBatchItemSerializer(data=item, partial=(operation == 'update'))
+                if not serializer.is_valid():
+                    results[operation].append({"status": 400, "errors": serializer.errors})
+                    continue
+                fields = dict(serializer.validated_data)
+                issue_id = fields.pop('id', None)
+                if operation == 'update' and issue_id is None:
+                    results[operation].append({"status": 400, "errors": {"id": ["Ce champ est obligatoire."]}})
+                    continue
+                if 'assigned_user' in fields:
+                    fields['assigned_user_id'] = fields.pop('assigned_user')
+                results[operation].append(None)
+                valid[operation].append((len(results[operation]) - 1, issue_id, fields))
+
+        # Utilisateurs assignés et issues à modifier : une requête chacun pour tout le lot
+        assigned_ids = {
+            fields['assigned_user_id']
+            for items in valid.values() for _, _, fields in items
+            if fields.get('assigned_user_id') is not None
+        }
+        known_users = set(User.objects.filter(pk__in=assigned_ids).values_list('pk', flat=True))
+        issues = Issue.objects.filter(project=project).in_bulk(
+            [issue_id for _, issue_id, _ in valid['update']]
+        )
+
+        creates, updates = [], []
+        for operation in ('create', 'update'):
+            for index, issue_id, fields in valid[operation]:
+                assigned = fields.get('assigned_user_id')
+                if assigned is not None and assigned not in known_users:
+                    results[operation][index] = {
+                        "status": 400, "errors": {"assigned_user": ["Utilisateur non trouvé."]}
+                    }
+                elif operation == 'create':
+                    creates.append((index, fields))
+                elif issue_id not in issues:
+                    results[operation][index] = {"status": 404, "id": issue_id}
+                elif not (context.is_admin or issues[issue_id].author_user_id == request.user.pk):
+                    results[operation][index] = {"status": 403, "id": issue_id}
+                else:
+                    updates.append((index, issues[issue_id], fields))
+
+        created = apply_issue_batch(
+            project,
+            request.user,
+            [fields for _, fields in creates],
+            [(issue, fields) for _, issue, fields in updates]
+        )
+        for (index, _), issue in zip(creates, created):
+            results['create'][index] = {"status": 201, "id": issue.pk}
+        for index, issue, _ in updates:
+            results['update'][index] = {"status": 200, "id": issue.pk}
+
+        return Response(results, status=status.HTTP_200_OK)
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(PhaseTimingMixin, RequestContextMixin, QueryPlanMixin, ConditionalGetMixin,
+                     EmptyListMessageMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsProjectContributorOrIsAdmin]
-    pagination_class = CommentPagination
+    pagination_class = CommentHybridPagination
+    empty_list_message = "Il n'y a pas de commentaire ici."
+    query_plans = {
+        'list': QueryPlan(only=['id', 'description', 'author_user', 'issue', 'created_at']),
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -248,25 +453,21 @@ class CommentViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        project = get_object_or_404(Project, pk=self.kwargs['project_pk'])
-        issue = get_object_or_404(Issue, pk=self.kwargs['issue_pk'])
-        base_queryset = Comment.objects.select_related('issue', 'issue__project')
-
-        if self.request.user.is_superuser:
-            print("Utilisateur est superuser")
-            queryset = base_queryset.filter(
-                issue=issue,
-                issue__project=project
-            )
-        else:
-            print("Utilisateur est contributeur")
-            queryset = base_queryset.filter(
-                issue=issue,
-                issue__project=project,
-                issue__project__contributor__user=self.request.user
-            )
+        context = self.request_context
+        # L'issue est résolue dans le projet de l'URL, sinon 404
+        issue = context.get_issue_or_404()
+
+        if not (context.is_admin or context.is_contributor):
+            return Comment.objects.none()
 
-        return queryset
+        return self.apply_query_plan(Comment.objects.filter(issue=issue))
+
+    def get_list_version(self):
+        # Un commentaire écrit change la version du projet de son issue (projects/signals.py)
+        return get_project_versions_token([self.request_context.project_pk])
+
+    async def aget_list_version(self):
+        return await aget_project_versions_token([self.request_context.project_pk])
 
     def get_object(self):
         queryset = self.get_queryset()
@@ -280,33 +481,87 @@ class CommentViewSet(viewsets.ModelViewSet):
         self.check_object_permissions(self.request, obj)
         return obj
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return Response(
-                {"message": "Il n'y a pas de commentaire ici."},
-                status=200
-            )
-        return super().list(request, *args, **kwargs)
-
     def perform_create(self, serializer):
-        project = get_object_or_404(Project, pk=self.kwargs['project_pk'])
-        issue = get_object_or_404(
-            Issue,
-            pk=self.kwargs['issue_pk'],
-            project=project
-        )
-        serializer.save(
-            issue=issue,
-            author_user=self.request.user
-        )
+        # Issue lue ici : seule l'écriture passe par la file d'écriture (config/writer.py)
+        submit_write(self._create_comment, serializer, self.request_context.get_issue_or_404())
+
+    def _create_comment(self, serializer, issue):
+        comment = serializer.save(issue=issue, author_user=self.request.user)
+        track_created(comment)
+
+    def perform_destroy(self, instance):
+        with write_atomic():
+            instance.delete()
+            track_deleted(instance)
 
     def update(self, request, *args, **kwargs):
         # Seul l'auteur du commentaire ou l'admin peut modifier
         instance = self.get_object()
-        if not (request.user.is_superuser or instance.author_user == request.user):
+        if not (request.user.is_superuser or instance.author_user_id == request.user.pk):
             return Response(
                 {"detail": "Vous n'êtes pas autorisé à modifier ce commentaire."},
                 status=status.HTTP_403_FORBIDDEN
             )
         return super().update(request, *args, **kwargs)
+
+
+class CacheStatsView(PhaseTimingMixin, APIView):
+    """
+    Compteurs des caches applicatifs du worker qui répond, réservés aux administrateurs.
+    Ils sont tenus en mémoire par chaque processus : "pid" identifie le worker, et
+    deux appels successifs peuvent être servis par deux workers différents.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response({
+            "scope": "worker",
+            "pid": os.getpid(),
+            "membership": membership_cache_stats(),
+            "responses": response_cache_stats(),
+        })
+
+
+class MetricsView(PhaseTimingMixin, APIView):
+    """
+    Métriques de tous les workers au format Prometheus, réservées aux
+    administrateurs et au collecteur muni de METRICS_TOKEN. Non limitées en débit.
+    """
+    authentication_classes = [MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [IsAdminOrMetricsCollector]
+    renderer_classes = [PrometheusRenderer]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response(render_prometheus(collect()), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class SearchView(PhaseTimingMixin, APIView):
+    """
+    Recherche plein texte dans les issues et les commentaires des projets
+    dont l'utilisateur est contributeur (tous les projets pour un admin).
+
+    Paramètres : q (obligatoire), project (facultatif), limit (défaut 20, max 50).
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 50
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({"q": "Ce paramètre est obligatoire."})
+
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+            project_id = request.query_params.get('project')
+            project_id = int(project_id) if project_id else None
+        except ValueError:
+            raise ValidationError({"detail": "Les paramètres limit et project doivent être des entiers."})
+        limit = max(1, min(limit, self.max_limit))
+
+        return Response({
+            "query": text,
+            "issues": search_issues(request.user, text, limit, project_id),
+            "comments": search_comments(request.user, text, limit, project_id),
+        })
@@ -1,3 +1,44 @@
-# from django.test import TestCase
+"""
+Tests de l'API des utilisateurs.
+"""
+from django.test import override_settings
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from projects.models import Project, Contributor
+from projects.tests import TEST_CACHES, create_user
+from .models import User
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserDeletionTests(APITestCase):
+    """Suppression d'un utilisateur contributeur de projets."""
+
+    def setUp(self):
+        self.alice = create_user('alice')
+        self.bob = create_user('bob')
+        self.project = Project.objects.create(
+            title="Projet", description="Description", type='Back-End', author_user=self.alice, contributor_count=2
+        )
+        Contributor.objects.bulk_create([
+            Contributor(project=self.project, user=self.alice),
+            Contributor(project=self.project, user=self.bob),
+        ])
+
+    def test_delete_self_updates_contributor_count(self):
+        self.client.force_authenticate(self.bob)
+        response = self.client.delete(f'/softdesk_api/users/{self.bob.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.contributor_count, 1)
+
+    def test_delete_outside_api_updates_contributor_count(self):
+        # Admin, shell : même signal que l'API
+        User.objects.filter(pk=self.bob.pk).delete()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.contributor_count, 1)
+
+    def test_cannot_delete_other_user(self):
+        self.client.force_authenticate(self.alice)
+        response = self.client.delete(f'/softdesk_api/users/{self.bob.pk}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(User.objects.filter(pk=self.bob.pk).exists())
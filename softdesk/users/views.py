@@ -9,13 +9,19 @@ from .models import User
 from .serializers import UserDetailSerializer, UserCreateSerializer, UserListSerializer
 from .permissions import IsAdminOrSelf, IsAdminOrUnauthenticated
 from config.pagination import UserPagination
+from config.query_plans import QueryPlan, QueryPlanMixin
+from config.timing import PhaseTimingMixin
+from config.writer import write_atomic
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PhaseTimingMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les opérations CRUD sur les utilisateurs.
     """
     pagination_class = UserPagination
+    query_plans = {
+        'list': QueryPlan(only=['id', 'username']),
+    }
 
     def get_permissions(self):
         if self.action == 'create':
@@ -31,7 +37,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserDetailSerializer
 
     def get_queryset(self):
-        return User.objects.all()
+        return self.apply_query_plan(User.objects.all())
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -71,6 +77,11 @@ class UserViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def perform_destroy(self, instance):
+        # Les signaux pre_delete (projects/signals.py) lisent puis modifient les lignes de l'utilisateur
+        with write_atomic():
+            instance.delete()
+
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
         """Endpoint supplémentaire pour voir le profil"""